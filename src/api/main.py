@@ -2,9 +2,9 @@ import gc
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
-from sqlmodel import SQLModel
 
-from src.infra.db.session import engine
+from src.infra.db.session import async_engine
+from src.infra.registry import get_registry
 from src.utils.logging import setup_logging
 
 from .router import router
@@ -13,9 +13,13 @@ from .router import router
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     setup_logging()
-    SQLModel.metadata.create_all(engine)
+    registry = get_registry()
+    # Load models and clients once, before the first request arrives.
+    registry.warm_up()
     yield
 
+    registry.shutdown()
+    await async_engine.dispose()
     gc.collect()
 
 
@@ -1,25 +1,36 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+import json
+import uuid
+
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List
 
-from src.infra.db.session import get_session
+from src.infra.db.session import get_async_request_session, get_request_session
+from src.infra.registry import get_registry
+from src.ingestion.jobs import JobStore
 from src.orchestrator.service import OrchestratorService
-from src.api.schemas import ChatRequest, ChatResponse, IngestResponse, DocumentResponse
-from src.documents.service import DocumentService
-from src.conversation.manager import ConversationManager
-from src.retrieval.service import RetrievalService
-from src.infra.llm import OllamaLLM
-from src.config.settings import LLM_MODEL_NAME
+from src.api.schemas import (
+    BatchIngestResponse,
+    ChatRequest,
+    ChatResponse,
+    DocumentResponse,
+    DocumentUpdateResponse,
+    IngestionJobResponse,
+    IngestResponse,
+)
 from src.utils.exceptions import ServiceException, ResourceNotFoundException, InvalidRequestException
 
 router = APIRouter()
 
-def get_orchestrator(session: Session = Depends(get_session)) -> OrchestratorService:
-    doc_service = DocumentService(session)
-    conv_manager = ConversationManager(session)
-    llm = OllamaLLM(model=LLM_MODEL_NAME)
-    retrieval_service = RetrievalService(llm)
-    return OrchestratorService(session, doc_service, conv_manager, retrieval_service, llm)
+def get_orchestrator(
+    session: Session = Depends(get_request_session),
+    async_session: AsyncSession = Depends(get_async_request_session),
+) -> OrchestratorService:
+    # Models and clients come from the process-wide registry; only the
+    # sessions and the thin services around them are built per request.
+    return get_registry().build_orchestrator(session, async_session)
 
 @router.post("/ingest", response_model=IngestResponse)
 async def ingest_document(
@@ -30,37 +41,147 @@ async def ingest_document(
         raise HTTPException(status_code=400, detail="File must have a filename.")
 
     try:
-        result = orchestrator.ingest_file(file.file, file.filename)
+        result = await orchestrator.aingest_file(file.file, file.filename)
         return IngestResponse(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         file.file.close()
 
+@router.post("/ingest/batch", response_model=BatchIngestResponse)
+def ingest_batch(files: List[UploadFile] = File(...)):
+    """
+    Queue many files for background ingestion and return immediately.
+
+    Poll `/ingest/batches/{batch_id}` or `/ingest/jobs/{job_id}` for progress.
+    """
+    if any(not f.filename for f in files):
+        raise HTTPException(status_code=400, detail="Every file must have a filename.")
+
+    pipeline = get_registry().ingestion_pipeline()
+    batch_id = uuid.uuid4().hex
+    jobs = []
+    try:
+        for f in files:
+            jobs.append(pipeline.submit(f.file, f.filename, batch_id))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        for f in files:
+            f.file.close()
+
+    return BatchIngestResponse(
+        batch_id=batch_id,
+        jobs=[IngestionJobResponse.model_validate(j, from_attributes=True) for j in jobs],
+    )
+
+
+@router.get("/ingest/jobs/{job_id}", response_model=IngestionJobResponse)
+def get_ingestion_job(job_id: int):
+    job = JobStore().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job {job_id} not found.")
+    return IngestionJobResponse.model_validate(job, from_attributes=True)
+
+
+@router.get("/ingest/batches/{batch_id}", response_model=BatchIngestResponse)
+def get_ingestion_batch(batch_id: str):
+    jobs = JobStore().list_batch(batch_id)
+    if not jobs:
+        raise HTTPException(status_code=404, detail=f"Ingestion batch {batch_id} not found.")
+    return BatchIngestResponse(
+        batch_id=batch_id,
+        jobs=[IngestionJobResponse.model_validate(j, from_attributes=True) for j in jobs],
+    )
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
     orchestrator: OrchestratorService = Depends(get_orchestrator)
 ):
     try:
-        result = orchestrator.chat(request.message, request.conversation_id)
+        result = await orchestrator.achat(
+            request.message, request.conversation_id, request.retrieval_options()
+        )
         return ChatResponse(**result)
     except InvalidRequestException as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    
-    
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Stream the answer as it is generated.
+
+    Emits NDJSON (one event per line) by default, or Server-Sent Events when
+    the client sends `Accept: text/event-stream`. The first event carries the
+    sources, then one event per token, then a final `done` event.
+    """
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+
+    def _encode(event: dict) -> str:
+        payload = json.dumps(event, default=str)
+        return f"data: {payload}\n\n" if use_sse else f"{payload}\n"
+
+    async def event_stream():
+        # The session lives inside the generator so it stays open for the
+        # whole stream rather than only until the route function returns.
+        registry = get_registry()
+        with registry.session_scope() as session:
+            async with registry.async_session_scope() as async_session:
+                orchestrator = registry.build_orchestrator(session, async_session)
+                try:
+                    async for event in orchestrator.chat_stream(
+                        request.message, request.conversation_id, request.retrieval_options()
+                    ):
+                        yield _encode(event)
+                except Exception as e:
+                    yield _encode({"type": "error", "detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+    )
+
+
+# Plain `def` routes: FastAPI runs them in its threadpool, keeping the
+# blocking SQLite / Chroma calls off the event loop.
 @router.get("/documents", response_model=List[DocumentResponse])
-async def list_documents(orchestrator: OrchestratorService = Depends(get_orchestrator)):
+def list_documents(orchestrator: OrchestratorService = Depends(get_orchestrator)):
     try:
         return orchestrator.list_documents()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
+@router.put("/documents/{doc_id}", response_model=DocumentUpdateResponse)
+async def update_document(
+    doc_id: int,
+    file: UploadFile = File(...),
+    orchestrator: OrchestratorService = Depends(get_orchestrator),
+):
+    """Upload a new version of a document; only changed chunks are re-embedded."""
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="File must have a filename.")
+
+    try:
+        result = await orchestrator.aupdate_file(doc_id, file.file, file.filename)
+        return DocumentUpdateResponse(**result)
+    except ResourceNotFoundException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidRequestException as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        file.file.close()
+
+
 @router.delete("/documents/{doc_id}")
-async def delete_document(doc_id: int, orchestrator: OrchestratorService = Depends(get_orchestrator)):
+def delete_document(doc_id: int, orchestrator: OrchestratorService = Depends(get_orchestrator)):
     try:
         filename = orchestrator.delete_document(doc_id)
         return {
@@ -71,4 +192,16 @@ async def delete_document(doc_id: int, orchestrator: OrchestratorService = Depen
     except ResourceNotFoundException as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/system/registry")
+async def registry_stats():
+    """Load times and memory footprint of the shared models and clients."""
+    return get_registry().stats()
+
+
+@router.get("/system/caches")
+async def cache_stats():
+    """Hit/miss counters of the in-process caches."""
+    return get_registry().cache_stats()
@@ -1,22 +1,54 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import datetime
 
 class ChatRequest(BaseModel):
     message: str
     conversation_id: Optional[int] = None
+    # Per-request retrieval stage sizes; settings defaults when omitted.
+    coarse_k: Optional[int] = Field(None, ge=1, le=5000, description="Reduced-dimension shortlist size.")
+    limit: Optional[int] = Field(None, ge=1, le=500, description="Candidates scored on full vectors.")
+    top_k: Optional[int] = Field(None, ge=1, le=50, description="Chunks kept after reranking.")
+
+    def retrieval_options(self) -> Dict[str, int]:
+        options = {"coarse_k": self.coarse_k, "limit": self.limit, "top_k": self.top_k}
+        return {k: v for k, v in options.items() if v is not None}
 
 class ChatResponse(BaseModel):
     conversation_id: int
     response: str
     sources: List[Dict[str, Any]]
+    # True when the answer was served from the semantic answer cache.
+    cached: bool = False
 
 class IngestResponse(BaseModel):
     document_id: int
     chunks_processed: int
     status: str
     
+class DocumentUpdateResponse(BaseModel):
+    document_id: int
+    status: str
+    chunks_added: int = 0
+    chunks_removed: int = 0
+    chunks_unchanged: int = 0
+
 class DocumentResponse(BaseModel):
     id: int
     filename: str
-    created_at: datetime.datetime
\ No newline at end of file
+    created_at: datetime.datetime
+
+class IngestionJobResponse(BaseModel):
+    id: int
+    batch_id: str
+    filename: str
+    status: str
+    document_id: Optional[int] = None
+    chunks_processed: int = 0
+    error: Optional[str] = None
+    created_at: datetime.datetime
+    updated_at: datetime.datetime
+
+class BatchIngestResponse(BaseModel):
+    batch_id: str
+    jobs: List[IngestionJobResponse]
@@ -1,34 +1,67 @@
-from sqlmodel import SQLModel
+import asyncio
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
 
-from src.infra.db.session import get_session, engine
-from src.orchestrator.service import OrchestratorService
-from src.documents.service import DocumentService
-from src.conversation.manager import ConversationManager
-from src.retrieval.service import RetrievalService
-from src.infra.llm import OllamaLLM
-from src.config.settings import LLM_MODEL_NAME
+from src.infra.registry import get_registry
+from src.utils.concurrency import get_background_loop
 
 
 class ResearchAssistant:
-    def __init__(self) -> None:
-        SQLModel.metadata.create_all(engine)
-        
+    """
+    In-process facade used by the Gradio and Streamlit front ends.
+
+    Shares the process-wide service registry, so models are loaded once
+    per process and every call only opens a fresh DB session.
+    """
+
+    def __init__(self, warm_up: bool = True) -> None:
+        self._registry = get_registry()
+        if warm_up:
+            self._registry.warm_up()
+
+    def chat_stream(
+        self,
+        message: str,
+        conversation_id: Optional[int] = None,
+        retrieval_options: Optional[Dict[str, int]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Synchronous view over `OrchestratorService.chat_stream` for the UIs.
+
+        The async generator is driven on the shared background event loop,
+        so callers on any UI worker thread can simply iterate the events.
+        """
+        loop = get_background_loop()
+        stream = self._achat_stream(message, conversation_id, retrieval_options)
+        try:
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(
+                        stream.__anext__(), loop
+                    ).result()
+                except StopAsyncIteration:
+                    break
+        finally:
+            asyncio.run_coroutine_threadsafe(stream.aclose(), loop).result()
+
+    async def _achat_stream(
+        self,
+        message: str,
+        conversation_id: Optional[int],
+        retrieval_options: Optional[Dict[str, int]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        # Sessions stay open for the lifetime of the stream.
+        with self._registry.session_scope() as session:
+            async with self._registry.async_session_scope() as async_session:
+                service = self._registry.build_orchestrator(session, async_session)
+                async for event in service.chat_stream(
+                    message, conversation_id, retrieval_options
+                ):
+                    yield event
 
     def __getattr__(self, name):
         def wrapper(*args, **kwargs):
-            with get_session() as session:
-                doc_service = DocumentService(session)
-                conv_manager = ConversationManager(session)
-                llm = OllamaLLM(model=LLM_MODEL_NAME)
-                retrieval_service = RetrievalService(llm)
-                
-                service = OrchestratorService(
-                    session=session,
-                    doc_service=doc_service,
-                    conv_manager=conv_manager,
-                    retrieval_service=retrieval_service,
-                    llm=llm
-                )
+            with self._registry.session_scope() as session:
+                service = self._registry.build_orchestrator(session)
 
                 method = getattr(service, name)
 
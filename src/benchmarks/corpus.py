@@ -0,0 +1,220 @@
+"""
+Deterministic synthetic corpus for the benchmarks.
+
+Documents look like the scientific papers the app is used with: headed
+sections of prose, LaTeX (inline and display), markdown tables, numbered
+lists, and a boilerplate paragraph repeated across documents (exercises
+deduplication and the embedding cache). The same seed always produces
+byte-identical files, so results from different commits are comparable.
+"""
+import random
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+TOPICS = [
+    "Gradient Descent", "Attention Mechanisms", "Bayesian Inference",
+    "Graph Neural Networks", "Reinforcement Learning", "Kernel Methods",
+    "Variational Autoencoders", "Optimal Transport", "Contrastive Learning",
+    "Diffusion Models", "Sparse Coding", "Causal Inference",
+]
+
+SECTIONS = [
+    "Introduction", "Background", "Method", "Theoretical Analysis",
+    "Experimental Setup", "Results", "Ablation Study", "Limitations",
+    "Related Work", "Conclusion",
+]
+
+TERMS = [
+    "convergence rate", "learning rate", "loss surface", "regularization",
+    "posterior distribution", "likelihood", "prior", "embedding space",
+    "attention weights", "softmax temperature", "batch size", "gradient norm",
+    "spectral radius", "kernel bandwidth", "latent variable", "evidence bound",
+    "transport plan", "negative samples", "noise schedule", "sparsity penalty",
+    "confounder", "treatment effect", "message passing", "value function",
+    "policy gradient", "reward shaping", "feature map", "Lipschitz constant",
+]
+
+WORDS = (
+    "model data training objective estimate bound theorem lemma proof result "
+    "parameter sample error variance bias dataset benchmark baseline accuracy "
+    "distribution function operator matrix vector norm space dimension layer "
+    "network signal representation inference algorithm iteration step update "
+    "scale rate constant approximation analysis property condition assumption "
+    "experiment evaluation metric robustness stability efficiency complexity"
+).split()
+
+FORMULAS = [
+    r"\theta_{t+1} = \theta_t - \eta \nabla_\theta \mathcal{L}(\theta_t)",
+    r"\mathrm{Attention}(Q, K, V) = \mathrm{softmax}\left(\frac{QK^\top}{\sqrt{d_k}}\right) V",
+    r"p(\theta \mid x) = \frac{p(x \mid \theta)\, p(\theta)}{p(x)}",
+    r"\mathcal{L}_{\mathrm{ELBO}} = \mathbb{E}_{q(z)}[\log p(x \mid z)] - \mathrm{KL}(q(z) \,\|\, p(z))",
+    r"W_2(\mu, \nu)^2 = \inf_{\gamma \in \Pi(\mu, \nu)} \int \|x - y\|^2 \, d\gamma(x, y)",
+    r"k(x, y) = \exp\left(-\frac{\|x - y\|^2}{2\sigma^2}\right)",
+]
+
+BOILERPLATE = (
+    "This work was carried out on a shared compute cluster. The authors thank "
+    "the anonymous reviewers for their comments. All code and data needed to "
+    "reproduce the experiments are available from the authors on request."
+)
+
+
+def _sentence(rng: random.Random, terms: Sequence[str]) -> str:
+    words = rng.choices(WORDS, k=rng.randint(8, 18))
+    words.insert(rng.randrange(len(words)), rng.choice(terms))
+    if rng.random() < 0.3:
+        words.insert(rng.randrange(len(words)), f"$x_{{{rng.randint(1, 9)}}}$")
+    text = " ".join(words)
+    return text[0].upper() + text[1:] + "."
+
+
+def _paragraph(rng: random.Random, terms: Sequence[str]) -> str:
+    return " ".join(_sentence(rng, terms) for _ in range(rng.randint(3, 7)))
+
+
+def _table(rng: random.Random) -> str:
+    rows = ["| Method | Accuracy | Time (s) |", "|---|---|---|"]
+    for name in ("Baseline", "Ours", "Ours + tuning"):
+        rows.append(f"| {name} | {rng.uniform(60, 99):.1f} | {rng.uniform(0.1, 30):.2f} |")
+    return "\n".join(rows)
+
+
+def make_document(index: int, sections: int = 6, paragraphs: int = 3, seed: int = 0) -> Tuple[str, str]:
+    """
+    The `index`-th synthetic paper.
+
+    Returns:
+        (title, markdown text)
+    """
+    rng = random.Random(seed * 100_003 + index)
+    topic = TOPICS[index % len(TOPICS)]
+    title = f"{topic}: Study {index + 1}"
+    terms = rng.sample(TERMS, 6)
+
+    parts = [f"# {title}"]
+    for n, section in enumerate(rng.sample(SECTIONS, min(sections, len(SECTIONS)))):
+        parts.append(f"## {section}")
+        for _ in range(paragraphs):
+            parts.append(_paragraph(rng, terms))
+        if n % 3 == 1:
+            parts.append(f"$$\n{rng.choice(FORMULAS)}\n$$")
+        if n % 3 == 2:
+            parts.append(_table(rng))
+        if n % 4 == 3:
+            parts.append("\n".join(f"{i}. {_sentence(rng, terms)}" for i in range(1, 4)))
+    parts.append("## Acknowledgements")
+    parts.append(BOILERPLATE)
+    return title, "\n\n".join(parts) + "\n"
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, text: str, line_chars: int = 90, lines_per_page: int = 56) -> None:
+    """
+    Write `text` as a minimal text-only PDF (Helvetica, no compression).
+
+    Only the subset of the format a text PDF needs is written, without
+    timestamps or ids, so the output is deterministic.
+    """
+    lines: List[str] = []
+    for paragraph in text.splitlines():
+        words, current = paragraph.split(), ""
+        for word in words:
+            if current and len(current) + 1 + len(word) > line_chars:
+                lines.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+        lines.append(current)
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then (page, content) pairs.
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page_lines in pages:
+        page_number = len(objects) + 1
+        kids.append(f"{page_number} 0 R")
+        stream = "BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(
+            f"({_pdf_escape(line.encode('latin-1', 'replace').decode('latin-1'))}) Tj T*"
+            for line in page_lines
+        ) + " ET"
+        data = stream.encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_number + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def generate_corpus(
+    out_dir: Path,
+    documents: int = 24,
+    pdf_documents: int = 2,
+    sections: int = 6,
+    paragraphs: int = 3,
+    seed: int = 0,
+) -> List[Path]:
+    """
+    Write `documents` markdown papers and `pdf_documents` PDF renderings of
+    the first ones into `out_dir`.
+
+    Returns:
+        The written paths (markdown first).
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths: List[Path] = []
+    texts: List[str] = []
+    for index in range(documents):
+        _, text = make_document(index, sections, paragraphs, seed)
+        path = out_dir / f"paper_{index:03d}.md"
+        path.write_text(text, encoding="utf-8")
+        paths.append(path)
+        texts.append(text)
+    for index in range(min(pdf_documents, documents)):
+        path = out_dir / f"paper_{index:03d}.pdf"
+        write_pdf(path, texts[index])
+        paths.append(path)
+    return paths
+
+
+def make_queries(count: int, documents: int = 24, seed: int = 0) -> List[str]:
+    """
+    User-like questions about the corpus: topical questions, questions
+    naming a file and section (exercise filter extraction), and light
+    rephrasings of earlier ones (exercise the caches).
+    """
+    rng = random.Random(seed + 7)
+    queries: List[str] = []
+    while len(queries) < count:
+        kind = rng.random()
+        if kind < 0.5 or not queries:
+            queries.append(
+                f"How does the {rng.choice(TERMS)} affect the {rng.choice(TERMS)} "
+                f"in {rng.choice(TOPICS).lower()}?"
+            )
+        elif kind < 0.8:
+            queries.append(
+                f"What does the {rng.choice(SECTIONS).lower()} section in "
+                f"paper_{rng.randrange(documents):03d}.md say about the {rng.choice(TERMS)}?"
+            )
+        else:
+            queries.append(rng.choice(queries).replace("How does", "In what way does"))
+    return queries
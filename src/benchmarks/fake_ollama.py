@@ -0,0 +1,225 @@
+"""
+In-process stand-in for the Ollama HTTP API.
+
+Serves the endpoints the app uses (/api/tags, /api/version, /api/generate,
+/api/chat) with a fixed prefill delay and a per-token delay, so LLM-bound
+stages can be timed offline and the client-side overhead (connection
+handling, LangChain, parsing) separated from "model" time:
+
+    with FakeOllamaServer(token_latency_ms=5, first_token_ms=50) as server:
+        llm = OllamaLLM(model=server.model, base_url=server.base_url)
+
+Query-analysis prompts get a JSON filter object back, everything else a
+deterministic filler answer of `response_tokens` tokens.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_FILENAME = re.compile(r"\b[\w-]+\.(?:pdf|md|txt|docx)\b")
+_FILLER = (
+    "Based on the context , the method converges when the learning rate is "
+    "below the inverse Lipschitz constant $L$ , as shown in [1] . "
+).split(" ")
+
+
+def _filter_json(prompt: str) -> str:
+    match = _FILENAME.search(prompt)
+    return json.dumps({"filename": match.group(0)}) if match else "{}"
+
+
+class FakeOllamaServer:
+    """Threaded HTTP server on 127.0.0.1 imitating Ollama (see module docstring)."""
+
+    def __init__(
+        self,
+        model: str = "fake-model",
+        token_latency_ms: float = 5.0,
+        first_token_ms: float = 50.0,
+        response_tokens: int = 64,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """
+        Args:
+            model:            Model name reported by /api/tags.
+            token_latency_ms: Delay between streamed tokens.
+            first_token_ms:   Delay before the first token (prompt processing).
+            response_tokens:  Length of generated answers.
+            host:             Bind address.
+            port:             Bind port (0 picks a free one).
+        """
+        self.model = model
+        self.token_latency_ms = token_latency_ms
+        self.first_token_ms = first_token_ms
+        self.response_tokens = response_tokens
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._httpd.serve_forever, name="fake-ollama", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def expected_ms(self, tokens: Optional[int] = None) -> float:
+        """Server-side time of one generation of `tokens` tokens."""
+        tokens = self.response_tokens if tokens is None else tokens
+        return self.first_token_ms + max(0, tokens - 1) * self.token_latency_ms
+
+    # ------------------------------------------------------------------ #
+    #  Responses                                                           #
+    # ------------------------------------------------------------------ #
+
+    def _count(self, path: str) -> None:
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def _answer(self, messages: List[Dict[str, Any]], max_tokens: Optional[int]) -> List[str]:
+        system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        user = next(
+            (m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), ""
+        )
+        if "metadata filters" in system:
+            return [_filter_json(user)]
+        count = self.response_tokens if max_tokens is None else min(max_tokens, self.response_tokens)
+        return [_FILLER[i % len(_FILLER)] + " " for i in range(count)]
+
+    def _tokens(self, tokens: List[str]) -> Iterator[str]:
+        time.sleep(self.first_token_ms / 1000)
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(self.token_latency_ms / 1000)
+            yield token
+
+    def _final(self, tokens: List[str], started: float) -> Dict[str, Any]:
+        return {
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((time.perf_counter() - started) * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": 0,
+            "prompt_eval_duration": int(self.first_token_ms * 1e6),
+            "eval_count": len(tokens),
+            "eval_duration": int(len(tokens) * self.token_latency_ms * 1e6),
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Tokens are small writes; Nagle would hold them back for the ACK.
+            disable_nagle_algorithm = True
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug(format % args)
+
+            def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, parts: Iterator[Dict[str, Any]]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for part in parts:
+                    line = json.dumps(part).encode("utf-8") + b"\n"
+                    self.wfile.write(b"%X\r\n%s\r\n" % (len(line), line))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _read_json(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_GET(self) -> None:
+                server._count(self.path)
+                if self.path == "/api/tags":
+                    self._send_json(
+                        {"models": [{"name": server.model, "model": server.model, "size": 0}]}
+                    )
+                elif self.path == "/api/version":
+                    self._send_json({"version": "0.0.0-fake"})
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+            def do_POST(self) -> None:
+                server._count(self.path)
+                body = self._read_json()
+                if self.path == "/api/chat":
+                    self._generate(body, body.get("messages") or [], chat=True)
+                elif self.path == "/api/generate":
+                    if not body.get("prompt"):
+                        # Empty prompt: Ollama only loads the model.
+                        self._send_json(
+                            {**self._header(body), "response": "", "done": True, "done_reason": "load"}
+                        )
+                        return
+                    self._generate(body, [{"role": "user", "content": body["prompt"]}], chat=False)
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+            def _header(self, body: Dict[str, Any]) -> Dict[str, Any]:
+                return {
+                    "model": body.get("model", server.model),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                }
+
+            def _chunk(self, body: Dict[str, Any], text: str, chat: bool) -> Dict[str, Any]:
+                if chat:
+                    return {**self._header(body), "message": {"role": "assistant", "content": text}}
+                return {**self._header(body), "response": text}
+
+            def _generate(self, body: Dict[str, Any], messages: List[Dict[str, Any]], chat: bool) -> None:
+                started = time.perf_counter()
+                max_tokens = (body.get("options") or {}).get("num_predict")
+                tokens = server._answer(messages, max_tokens)
+                if body.get("stream", True):
+
+                    def parts() -> Iterator[Dict[str, Any]]:
+                        for token in server._tokens(tokens):
+                            yield {**self._chunk(body, token, chat), "done": False}
+                        yield {**self._chunk(body, "", chat), **server._final(tokens, started)}
+
+                    self._send_stream(parts())
+                else:
+                    text = "".join(server._tokens(tokens))
+                    self._send_json({**self._chunk(body, text, chat), **server._final(tokens, started)})
+
+        return Handler
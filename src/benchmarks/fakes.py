@@ -0,0 +1,77 @@
+"""
+Model stand-ins for offline runs without the HuggingFace checkpoints.
+
+They keep the interfaces and the data shapes of the real models (1024-d
+unit vectors, one relevance score per pair) with a cheap deterministic
+computation, so every stage around the model can still be timed. Timings
+of the model calls themselves are only meaningful with the real models.
+"""
+import hashlib
+import re
+from typing import Any, List, Sequence, Tuple
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+class HashEmbedding(BaseEmbedding):
+    """
+    Signed feature hashing of words and word bigrams into `dim` dimensions.
+
+    Texts sharing vocabulary get similar vectors, which keeps nearest
+    neighbour results and cache behaviour realistic enough for timing.
+    """
+
+    dim: int = 1024
+
+    def __init__(self, dim: int = 1024, **kwargs: Any) -> None:
+        super().__init__(dim=dim, model_name=f"hash-embedding-{dim}", **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashEmbedding"
+
+    def _vector(self, text: str) -> List[float]:
+        words = _words(text)
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if features:
+            digests = [hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest() for f in features]
+            codes = np.frombuffer(b"".join(digests), dtype=np.uint64)
+            signs = np.where(codes & np.uint64(1), 1.0, -1.0).astype(np.float32)
+            np.add.at(vector, (codes >> np.uint64(1)) % np.uint64(self.dim), signs)
+        norm = float(np.linalg.norm(vector))
+        return (vector / norm if norm else vector).tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._vector(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._vector(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._vector(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(t) for t in texts]
+
+
+class OverlapCrossEncoder:
+    """Cross-encoder stand-in: query-term coverage of the passage as the score."""
+
+    model_name = "overlap-cross-encoder"
+
+    def predict(
+        self, pairs: Sequence[Tuple[str, str]], batch_size: int = 32, show_progress_bar: bool = False
+    ) -> np.ndarray:
+        scores = []
+        for query, passage in pairs:
+            terms = set(_words(query))
+            scores.append(len(terms & set(_words(passage))) / len(terms) if terms else 0.0)
+        return np.asarray(scores, dtype=np.float32)
@@ -0,0 +1,214 @@
+"""
+Per-stage benchmark suite, offline and on CPU.
+
+    python -m src.benchmarks.run                                   # every stage
+    python -m src.benchmarks.run --stages chunking reranking --repeat 10
+    python -m src.benchmarks.run --models fake --vectors 5000      # no model checkpoints needed
+    python -m src.benchmarks.run --token-latency-ms 20 --first-token-ms 400
+    python -m src.benchmarks.run --compare data/benchmarks/old.json data/benchmarks/new.json
+
+Runs on a deterministic synthetic corpus (see corpus.py) in a temporary
+directory; LLM stages talk to an in-process fake Ollama (fake_ollama.py).
+HuggingFace models are only read from the local cache; with `--models
+auto` a missing checkpoint falls back to the stand-ins in fakes.py, which
+the results record. Each run writes one JSON file stamped with the git
+commit, so two commits are compared with `--compare`.
+"""
+import os
+
+# Must be set before torch / transformers are imported (via the settings).
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import platform  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+from datetime import datetime, timezone  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import Any, Dict, List, Optional, Tuple  # noqa: E402
+
+from src.config import settings  # noqa: E402
+
+# Modules read DEVICE when they are imported; pin it before they are.
+settings.DEVICE = "cpu"
+
+from src.utils.logging import setup_logging  # noqa: E402
+from .stages import STAGES, BenchContext  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=settings.PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metadata(ctx: BenchContext) -> Dict[str, Any]:
+    import numpy as np
+
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    versions = {"numpy": np.__version__}
+    for name in ("torch", "transformers", "sentence_transformers", "llama_index.core", "chromadb"):
+        module = sys.modules.get(name)
+        if module is not None:
+            versions[name] = getattr(module, "__version__", "unknown")
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "branch": _git("rev-parse", "--abbrev-ref", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+        "models": dict(ctx.model_info),
+        "config": ctx.config(),
+    }
+
+
+def run(ctx: BenchContext, stages: List[str]) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name in stages:
+        logger.info(f"Benchmark stage '{name}'...")
+        start = time.perf_counter()
+        try:
+            results[name] = STAGES[name](ctx)
+        except Exception as e:
+            logger.warning(f"Stage '{name}' skipped: {e}")
+            results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+        results[name]["stage_seconds"] = round(time.perf_counter() - start, 2)
+    return {"meta": _metadata(ctx), "stages": results}
+
+
+# ---------------------------------------------------------------------- #
+#  Comparison                                                              #
+# ---------------------------------------------------------------------- #
+
+def _flatten(value: Any, prefix: str = "") -> Dict[str, float]:
+    if isinstance(value, dict):
+        flat: Dict[str, float] = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    return {}
+
+
+def _direction(key: str) -> int:
+    """+1 if higher is better, -1 if lower is better, 0 if not a performance number."""
+    leaf = key.rsplit(".", 1)[-1]
+    if leaf.endswith("_per_sec") or leaf.startswith("recall@"):
+        return 1
+    if leaf.endswith("_ms") or leaf == "seconds":
+        return -1
+    return 0
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> Tuple[List[str], int]:
+    """
+    Report lines for every performance number present in both runs, and
+    the number of regressions worse than `threshold` (relative).
+    """
+    before, after = _flatten(old["stages"]), _flatten(new["stages"])
+    lines = [
+        f"old: {(old['meta'].get('commit') or '?')[:10]} ({old['meta'].get('timestamp')})",
+        f"new: {(new['meta'].get('commit') or '?')[:10]} ({new['meta'].get('timestamp')})",
+        "",
+        f"{'metric':<58} {'old':>12} {'new':>12} {'change':>9}",
+    ]
+    regressions = 0
+    for key in sorted(before.keys() & after.keys()):
+        sign = _direction(key)
+        if sign == 0 or key.endswith("stage_seconds"):
+            continue
+        a, b = before[key], after[key]
+        change = (b - a) / a if a else 0.0
+        flag = ""
+        if sign * change < -threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif sign * change > threshold:
+            flag = "  improved"
+        lines.append(f"{key:<58} {a:>12.3f} {b:>12.3f} {change:>+8.1%}{flag}")
+    return lines, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-stage RAG benchmarks (offline, CPU).")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--documents", type=int, default=24, help="Synthetic papers in the corpus.")
+    parser.add_argument("--queries", type=int, default=40)
+    parser.add_argument("--vectors", type=int, default=20_000, help="Vectors for vector_search.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per throughput number.")
+    parser.add_argument("--models", choices=["auto", "real", "fake"], default="auto")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--token-latency-ms", type=float, default=5.0)
+    parser.add_argument("--first-token-ms", type=float, default=50.0)
+    parser.add_argument("--response-tokens", type=int, default=64)
+    parser.add_argument("--llm-requests", type=int, default=10)
+    parser.add_argument("--output", type=Path, default=None, help="Result file (default: data/benchmarks/).")
+    parser.add_argument(
+        "--compare", type=Path, nargs=2, metavar=("OLD", "NEW"),
+        help="Compare two result files instead of running.",
+    )
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change flagged by --compare.")
+    parser.add_argument(
+        "--fail-on-regression", action="store_true",
+        help="With --compare, exit with status 1 if anything regressed.",
+    )
+    args = parser.parse_args()
+    setup_logging()
+
+    if args.compare:
+        old, new = (json.loads(path.read_text()) for path in args.compare)
+        lines, regressions = compare(old, new, args.threshold)
+        print("\n".join(lines))
+        print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}.")
+        if regressions and args.fail_on_regression:
+            raise SystemExit(1)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as work_dir:
+        ctx = BenchContext(
+            Path(work_dir),
+            documents=args.documents,
+            queries=args.queries,
+            vectors=args.vectors,
+            repeat=args.repeat,
+            models=args.models,
+            seed=args.seed,
+            token_latency_ms=args.token_latency_ms,
+            first_token_ms=args.first_token_ms,
+            response_tokens=args.response_tokens,
+            llm_requests=args.llm_requests,
+        )
+        try:
+            report = run(ctx, args.stages)
+        finally:
+            ctx.close()
+
+    output = args.output
+    if output is None:
+        commit = (report["meta"]["commit"] or "nogit")[:10]
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = settings.BENCHMARK_RESULTS_DIR / f"{stamp}-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    text = json.dumps(report, indent=2)
+    output.write_text(text)
+    print(text)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,800 @@
+"""
+Per-stage microbenchmarks.
+
+Every stage is a function of a shared `BenchContext` returning a JSON-able
+dict. Latencies are reported as {"runs", "mean_ms", "p50_ms", "p95_ms",
+"min_ms"} and throughputs as "<unit>_per_sec", so `run --compare` can tell
+which direction is better for every number. Heavy dependencies are
+imported inside the stage that needs them; a stage whose dependency or
+model is unavailable is reported as skipped instead of failing the run.
+"""
+import asyncio
+import logging
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .corpus import generate_corpus, make_queries
+from .fake_ollama import FakeOllamaServer
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------- #
+#  Measurement helpers                                                     #
+# ---------------------------------------------------------------------- #
+
+def latency(samples_ms: Sequence[float]) -> Dict[str, Any]:
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "runs": len(samples),
+        "mean_ms": round(float(samples.mean()), 3),
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "min_ms": round(float(samples.min()), 3),
+    }
+
+
+def time_each(fn: Callable[[Any], Any], items: Sequence[Any], warmup: int = 1) -> List[float]:
+    """Milliseconds of `fn(item)` for every item, after `warmup` untimed calls."""
+    for item in items[:warmup]:
+        fn(item)
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def throughput(fn: Callable[[], Any], count: int, repeat: int, unit: str) -> Dict[str, Any]:
+    """Median wall time of `repeat` runs of `fn` (one untimed warm-up) and `count` / time."""
+    fn()
+    runs = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    seconds = statistics.median(runs)
+    return {
+        "runs": len(runs),
+        unit: count,
+        "seconds": round(seconds, 4),
+        f"{unit}_per_sec": round(count / seconds, 1) if seconds else None,
+    }
+
+
+# ---------------------------------------------------------------------- #
+#  Shared inputs                                                           #
+# ---------------------------------------------------------------------- #
+
+class BenchContext:
+    """
+    Inputs shared by the stages, built on first use so a run only pays for
+    what its selected stages need.
+    """
+
+    def __init__(
+        self,
+        work_dir: Path,
+        documents: int = 24,
+        queries: int = 40,
+        vectors: int = 20_000,
+        repeat: int = 5,
+        models: str = "auto",
+        seed: int = 0,
+        token_latency_ms: float = 5.0,
+        first_token_ms: float = 50.0,
+        response_tokens: int = 64,
+        llm_requests: int = 10,
+    ) -> None:
+        """
+        Args:
+            work_dir:         Scratch directory (corpus, vector stores).
+            documents:        Synthetic papers in the corpus.
+            queries:          Queries per latency measurement.
+            vectors:          Vectors in the vector search benchmark.
+            repeat:           Timed runs per throughput measurement.
+            models:           "real" (HuggingFace checkpoints from the local
+                              cache), "fake" (fakes.py) or "auto" (real when
+                              cached, else fake).
+            seed:             Corpus / query seed.
+            token_latency_ms: Fake Ollama delay between tokens.
+            first_token_ms:   Fake Ollama delay before the first token.
+            response_tokens:  Fake Ollama answer length.
+            llm_requests:     Requests per fake-Ollama measurement.
+        """
+        if models not in ("auto", "real", "fake"):
+            raise ValueError(f"Unknown models mode: {models}")
+        self.work_dir = work_dir
+        self.documents = documents
+        self.query_count = queries
+        self.vectors = vectors
+        self.repeat = repeat
+        self.models = models
+        self.seed = seed
+        self.token_latency_ms = token_latency_ms
+        self.first_token_ms = first_token_ms
+        self.response_tokens = response_tokens
+        self.llm_requests = llm_requests
+        self.model_info: Dict[str, str] = {}
+
+        self._files: Optional[List[Path]] = None
+        self._nodes: Optional[List[Any]] = None
+        self._positions: Dict[str, Tuple[int, int]] = {}
+        self._embed_model: Optional[Any] = None
+        self._cross_encoder: Optional[Any] = None
+        self._server: Optional[FakeOllamaServer] = None
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            "documents": self.documents,
+            "queries": self.query_count,
+            "vectors": self.vectors,
+            "repeat": self.repeat,
+            "models": self.models,
+            "seed": self.seed,
+            "fake_ollama": {
+                "token_latency_ms": self.token_latency_ms,
+                "first_token_ms": self.first_token_ms,
+                "response_tokens": self.response_tokens,
+                "requests": self.llm_requests,
+            },
+        }
+
+    # -- corpus -------------------------------------------------------- #
+
+    @property
+    def files(self) -> List[Path]:
+        if self._files is None:
+            self._files = generate_corpus(
+                self.work_dir / "corpus", documents=self.documents, seed=self.seed
+            )
+        return self._files
+
+    @property
+    def markdown_files(self) -> List[Path]:
+        return [p for p in self.files if p.suffix == ".md"]
+
+    def markdown_documents(self) -> List[Any]:
+        from llama_index.core.schema import Document as LlamaDocument
+
+        return [
+            LlamaDocument(text=p.read_text(encoding="utf-8"), metadata={"filename": p.name})
+            for p in self.markdown_files
+        ]
+
+    @property
+    def nodes(self) -> List[Any]:
+        """Chunks of the markdown corpus, as DocumentService produces them."""
+        if self._nodes is None:
+            from llama_index.core.node_parser import MarkdownNodeParser
+
+            from src.documents.chunking import get_chunker
+            from src.documents.service import tag_chunks
+
+            parser, chunker = MarkdownNodeParser(), get_chunker()
+            self._nodes = []
+            for document_id, document in enumerate(self.markdown_documents(), start=1):
+                nodes = chunker.split(parser.get_nodes_from_documents([document]))
+                tag_chunks(document_id, nodes)
+                self._positions.update(
+                    (node.node_id, (document_id, position)) for position, node in enumerate(nodes)
+                )
+                self._nodes.extend(nodes)
+        return self._nodes
+
+    @property
+    def positions(self) -> Dict[str, Tuple[int, int]]:
+        self.nodes
+        return self._positions
+
+    @property
+    def texts(self) -> List[str]:
+        from llama_index.core.schema import MetadataMode
+
+        return [n.get_content(metadata_mode=MetadataMode.EMBED) for n in self.nodes]
+
+    @property
+    def queries(self) -> List[str]:
+        return make_queries(self.query_count, self.documents, self.seed)
+
+    @property
+    def distinct_queries(self) -> List[str]:
+        return list(dict.fromkeys(self.queries))
+
+    # -- models -------------------------------------------------------- #
+
+    def _load(self, kind: str, real: Callable[[], Any], fake: Callable[[], Any]) -> Any:
+        if self.models != "fake":
+            try:
+                model = real()
+                self.model_info[kind] = "real"
+                return model
+            except Exception as e:
+                if self.models == "real":
+                    raise
+                logger.warning(f"No local {kind} model, using the fake one: {e}")
+        self.model_info[kind] = "fake"
+        return fake()
+
+    @property
+    def embed_model(self) -> Any:
+        if self._embed_model is None:
+            from src.infra.embeddings.sentence_transformer import get_embedding_model
+            from .fakes import HashEmbedding
+
+            self._embed_model = self._load(
+                "embedding", lambda: get_embedding_model(device="cpu"), HashEmbedding
+            )
+        return self._embed_model
+
+    @property
+    def cross_encoder(self) -> Any:
+        if self._cross_encoder is None:
+            from src.config.settings import RERANKER_MODEL
+            from .fakes import OverlapCrossEncoder
+
+            def _real() -> Any:
+                from sentence_transformers import CrossEncoder
+
+                return CrossEncoder(RERANKER_MODEL, device="cpu")
+
+            self._cross_encoder = self._load("reranker", _real, OverlapCrossEncoder)
+        return self._cross_encoder
+
+    def reranker(self) -> Any:
+        from src.config.settings import (
+            RERANK_MAX_BATCH,
+            RERANK_MAX_WAIT_MS,
+            RERANK_SCORE_CACHE_SIZE,
+            RERANKER_MODEL,
+        )
+        from src.retrieval.reranker import Reranker
+
+        return Reranker(
+            model_name=RERANKER_MODEL,
+            max_batch_size=RERANK_MAX_BATCH,
+            max_wait_ms=RERANK_MAX_WAIT_MS,
+            score_cache_size=RERANK_SCORE_CACHE_SIZE,
+            model=self.cross_encoder,
+        )
+
+    # -- fake Ollama --------------------------------------------------- #
+
+    def ollama(self) -> FakeOllamaServer:
+        if self._server is None:
+            self._server = FakeOllamaServer(
+                token_latency_ms=self.token_latency_ms,
+                first_token_ms=self.first_token_ms,
+                response_tokens=self.response_tokens,
+            ).start()
+        return self._server
+
+    def llm(self) -> Any:
+        from src.infra.llm.local import OllamaLLM
+
+        server = self.ollama()
+        return OllamaLLM(model=server.model, base_url=server.base_url, keep_alive=None)
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.stop()
+            self._server = None
+
+    # -- retrieval-shaped inputs ---------------------------------------- #
+
+    def candidate_docs(self, count: int = 20) -> List[List[Dict[str, Any]]]:
+        """
+        Per query, `count` retrieval-service result dicts, best first: runs
+        of consecutive chunks from a few documents (what a real top-k looks
+        like; exercises merging) plus occasional repeats (dedup).
+        """
+        rng = random.Random(self.seed + 11)
+        by_document: Dict[str, List[Any]] = {}
+        for node in self.nodes:
+            by_document.setdefault(node.metadata["document_id"], []).append(node)
+        documents = list(by_document.values())
+
+        results = []
+        for _ in self.distinct_queries:
+            picked: List[Any] = []
+            while len(picked) < count:
+                chunks = rng.choice(documents)
+                start = rng.randrange(len(chunks))
+                picked.extend(chunks[start:start + rng.randint(1, 3)])
+                if picked and rng.random() < 0.1:
+                    picked.append(rng.choice(picked))
+            picked = picked[:count]
+            results.append(
+                [
+                    {
+                        "text": node.get_content(),
+                        "metadata": node.metadata,
+                        "score": round(1.0 - rank / count, 4),
+                        "id": node.node_id,
+                    }
+                    for rank, node in enumerate(picked)
+                ]
+            )
+        return results
+
+
+# ---------------------------------------------------------------------- #
+#  Stages                                                                  #
+# ---------------------------------------------------------------------- #
+
+def bench_hashing(ctx: BenchContext) -> Dict[str, Any]:
+    """File dedup hashes, chunk content hashes and cache keys."""
+    from src.documents.service import chunk_hash, compute_hash
+    from src.infra.embeddings.cache import EmbeddingCache
+    from src.retrieval.analysis_cache import QueryAnalysisCache
+
+    files, nodes, texts, queries = ctx.files, ctx.nodes, ctx.texts, ctx.queries
+    total_mb = sum(p.stat().st_size for p in files) / 2**20
+    file_hash = throughput(lambda: [compute_hash(str(p)) for p in files], len(files), ctx.repeat, "files")
+    file_hash["mb_per_sec"] = round(total_mb / file_hash["seconds"], 1)
+    return {
+        "file_hash": file_hash,
+        "chunk_hash": throughput(lambda: [chunk_hash(n) for n in nodes], len(nodes), ctx.repeat, "chunks"),
+        "embedding_cache_key": throughput(
+            lambda: [EmbeddingCache.make_key(t) for t in texts], len(texts), ctx.repeat, "chunks"
+        ),
+        "analysis_cache_key": throughput(
+            lambda: [QueryAnalysisCache.make_key(q, "bench") for q in queries],
+            len(queries), ctx.repeat, "queries",
+        ),
+    }
+
+
+def bench_chunking(ctx: BenchContext) -> Dict[str, Any]:
+    """Markdown parsing and token-bounded splitting of the corpus."""
+    from llama_index.core.node_parser import MarkdownNodeParser
+
+    from src.documents.chunking import get_chunker
+    from src.utils.tokens import count_tokens_batch
+
+    documents = ctx.markdown_documents()
+    parser, chunker = MarkdownNodeParser(), get_chunker()
+    sections = parser.get_nodes_from_documents(documents)
+    chunks = chunker.split(parser.get_nodes_from_documents(documents))
+    total_mb = sum(len(d.text.encode("utf-8")) for d in documents) / 2**20
+
+    parse = throughput(lambda: parser.get_nodes_from_documents(documents), len(sections), ctx.repeat, "sections")
+    full = throughput(
+        lambda: chunker.split(parser.get_nodes_from_documents(documents)), len(chunks), ctx.repeat, "chunks"
+    )
+    full["mb_per_sec"] = round(total_mb / full["seconds"], 2)
+    tokens = count_tokens_batch([c.get_content() for c in chunks], chunker.tokenizer)
+    return {
+        "documents": len(documents),
+        "tokenizer": "model" if chunker.tokenizer is not None else "estimate",
+        "mean_chunk_tokens": round(sum(tokens) / len(tokens), 1) if tokens else 0,
+        "markdown_parse": parse,
+        "parse_and_split": full,
+    }
+
+
+def bench_embedding(ctx: BenchContext) -> Dict[str, Any]:
+    """Document embedding (token-budgeted vs fixed batches) and query embedding."""
+    from src.config.settings import EMBED_MAX_BATCH, EMBED_TOKEN_BUDGET
+    from src.infra.embeddings.cached import CachedEmbedding
+    from src.infra.embeddings.scheduler import EmbeddingScheduler
+
+    model = ctx.embed_model
+    scheduler = EmbeddingScheduler(
+        model, max_tokens_per_batch=EMBED_TOKEN_BUDGET, max_batch_size=EMBED_MAX_BATCH
+    )
+    documents = scheduler.benchmark(ctx.texts)
+
+    queries = ctx.distinct_queries
+    cached = CachedEmbedding(model, cache_size=len(queries) * 2, max_wait_ms=0)
+    cold = time_each(cached.get_query_embedding, queries, warmup=0)
+    warm = time_each(cached.get_query_embedding, queries, warmup=0)
+    return {
+        "model": model.model_name,
+        "documents": documents,
+        "reingest": _reingest(ctx),
+        "query_cold": latency(cold),
+        "query_cached": latency(warm),
+    }
+
+
+def _reingest(ctx: BenchContext, documents: int = 3) -> Dict[str, Any]:
+    """
+    Embed a few documents through the embedding cache, then the same files
+    again under other document ids. Every chunk of the second pass must be
+    a cache hit; anything else fails the stage.
+    """
+    from llama_index.core.node_parser import MarkdownNodeParser
+
+    from src.documents.chunking import get_chunker
+    from src.documents.service import tag_chunks
+    from src.infra.embeddings.cache import EmbeddingCache, embed_nodes
+
+    parser, chunker = MarkdownNodeParser(), get_chunker()
+    cache = EmbeddingCache(ctx.work_dir / "reingest_cache.sqlite")
+
+    def _ingest(first_id: int) -> Tuple[int, int, float]:
+        nodes: List[Any] = []
+        for offset, document in enumerate(ctx.markdown_documents()[:documents]):
+            chunks = chunker.split(parser.get_nodes_from_documents([document]))
+            tag_chunks(first_id + offset, chunks)
+            nodes.extend(chunks)
+        start = time.perf_counter()
+        embedded = embed_nodes(nodes, ctx.embed_model, cache)
+        return len(nodes), embedded, (time.perf_counter() - start) * 1000
+
+    chunks, first_embedded, first_ms = _ingest(1)
+    _, again_embedded, again_ms = _ingest(documents + 1)
+    if again_embedded:
+        raise RuntimeError(
+            f"{again_embedded} of {chunks} chunks missed the embedding cache when "
+            f"re-ingested under new document ids"
+        )
+    return {
+        "chunks": chunks,
+        "embedded": first_embedded,
+        "first_ms": round(first_ms, 2),
+        "cached_ms": round(again_ms, 2),
+    }
+
+
+def _exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = vectors @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _vector_stores(work_dir: Path, embed_model: Any) -> List[Tuple[str, Callable[[], Any]]]:
+    from src.infra.vectorstore.local import LocalVectorStore, hnswlib
+
+    stores: List[Tuple[str, Callable[[], Any]]] = [
+        ("local_flat", lambda: LocalVectorStore(work_dir / "flat", embed_model=embed_model, index="flat")),
+        (
+            "local_int8",
+            lambda: LocalVectorStore(
+                work_dir / "int8", embed_model=embed_model, index="flat", quantization="int8"
+            ),
+        ),
+    ]
+    if hnswlib is not None:
+        stores.append(
+            ("local_hnsw", lambda: LocalVectorStore(work_dir / "hnsw", embed_model=embed_model, index="hnsw"))
+        )
+
+    def _chroma() -> Any:
+        import chromadb
+        from chromadb.config import Settings
+
+        from src.infra.vectorstore.chroma import ChromaVectorStore
+
+        client = chromadb.EphemeralClient(Settings(anonymized_telemetry=False))
+        return ChromaVectorStore(collection_name="bench", client=client, embed_model=embed_model)
+
+    stores.append(("chroma", _chroma))
+    return stores
+
+
+def bench_vector_search(ctx: BenchContext, top_k: int = 20) -> Dict[str, Any]:
+    """Insert throughput, query latency and recall@k of every vector store backend."""
+    from llama_index.core.schema import QueryBundle, TextNode
+    from llama_index.core.vector_stores import ExactMatchFilter, MetadataFilters
+
+    from src.infra.vectorstore.benchmark import make_queries as perturbed_queries
+    from src.infra.vectorstore.benchmark import synthetic_vectors
+
+    dim = 1024
+    vectors = synthetic_vectors(ctx.vectors, dim, seed=ctx.seed)
+    queries = perturbed_queries(vectors, ctx.query_count, seed=ctx.seed + 1)
+    truth = [set(_exact_top_k(vectors, q, top_k).tolist()) for q in queries]
+
+    def _nodes() -> List[Any]:
+        return [
+            TextNode(
+                id_=f"v{i}",
+                text=f"synthetic chunk {i}",
+                metadata={"document_id": str(i % 100), "filename": f"paper_{i % 100:03d}.md"},
+                embedding=vector.tolist(),
+            )
+            for i, vector in enumerate(vectors)
+        ]
+
+    results: Dict[str, Any] = {"vectors": ctx.vectors, "dim": dim, "top_k": top_k}
+    with tempfile.TemporaryDirectory(dir=ctx.work_dir) as tmp:
+        for label, factory in _vector_stores(Path(tmp), ctx.embed_model):
+            try:
+                store = factory()
+            except Exception as e:
+                results[label] = {"skipped": f"{type(e).__name__}: {e}"}
+                continue
+            nodes = _nodes()
+            start = time.perf_counter()
+            for offset in range(0, len(nodes), 1000):
+                store.add_nodes(nodes[offset:offset + 1000])
+            insert_seconds = time.perf_counter() - start
+
+            retriever = store.as_retriever(similarity_top_k=top_k)
+            found: List[List[Any]] = []
+
+            def _search(query: np.ndarray) -> None:
+                found.append(retriever.retrieve(QueryBundle(query_str="", embedding=query.tolist())))
+
+            _search(queries[0])
+            found.clear()
+            samples = time_each(_search, list(queries), warmup=0)
+            recall = sum(
+                len(expected & {int(n.node.node_id[1:]) for n in hits}) / top_k
+                for expected, hits in zip(truth, found)
+            ) / len(queries)
+
+            filtered = store.as_retriever(
+                similarity_top_k=top_k,
+                filters=MetadataFilters(filters=[ExactMatchFilter(key="filename", value="paper_007.md")]),
+            )
+            filtered_samples = time_each(
+                lambda q: filtered.retrieve(QueryBundle(query_str="", embedding=q.tolist())), list(queries)
+            )
+            results[label] = {
+                "inserts_per_sec": round(len(nodes) / insert_seconds, 1),
+                "query": latency(samples),
+                f"recall@{top_k}": round(recall, 4),
+                "filtered_query": latency(filtered_samples),
+            }
+            close = getattr(store, "close", None)
+            if close is not None:
+                close()
+    return results
+
+
+def bench_reranking(ctx: BenchContext, candidates: int = 20, top_k: int = 5) -> Dict[str, Any]:
+    """Cross-encoder reranking: cold, score-cache hits, and concurrent requests."""
+    from llama_index.core.schema import NodeWithScore
+
+    rng = random.Random(ctx.seed + 3)
+    nodes = ctx.nodes
+    queries = ctx.distinct_queries
+    pools = {
+        q: [NodeWithScore(node=n, score=0.0) for n in rng.sample(nodes, min(candidates, len(nodes)))]
+        for q in queries
+    }
+    reranker = ctx.reranker()
+    rerank = lambda q: reranker.rerank(q, pools[q], top_k=top_k)  # noqa: E731
+
+    cold = time_each(rerank, queries, warmup=0)
+    warm = time_each(rerank, queries, warmup=0)
+
+    concurrent_queries = [f"{q} (concurrent)" for q in queries]
+    for q, original in zip(concurrent_queries, queries):
+        pools[q] = pools[original]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(rerank, concurrent_queries))
+    seconds = time.perf_counter() - start
+
+    return {
+        "model": ctx.model_info.get("reranker"),
+        "candidates": candidates,
+        "cold": latency(cold),
+        "cached": latency(warm),
+        "concurrent": {
+            "threads": 8,
+            "queries": len(concurrent_queries),
+            "seconds": round(seconds, 4),
+            "queries_per_sec": round(len(concurrent_queries) / seconds, 1),
+        },
+        "batching": reranker.stats()["batching"],
+    }
+
+
+def bench_query_analysis(ctx: BenchContext) -> Dict[str, Any]:
+    """Filter extraction against the fake Ollama: shared vs per-call client, async, cached."""
+    from src.retrieval.analysis_cache import QueryAnalysisCache
+    from src.retrieval.query_analyzer import QueryAnalyzer
+
+    server = ctx.ollama()
+    queries = ctx.distinct_queries[:ctx.llm_requests]
+    analyzer = QueryAnalyzer(ctx.llm())
+    shared = time_each(analyzer.analyze, queries)
+
+    def _fresh_client(query: str) -> None:
+        # What every call paid before clients were kept open.
+        llm = ctx.llm()
+        QueryAnalyzer(llm).analyze(query)
+        llm.close()
+
+    fresh = time_each(_fresh_client, queries)
+
+    async def _gather() -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*(analyzer.aanalyze(q) for q in queries))
+        return time.perf_counter() - start
+
+    concurrent_seconds = asyncio.run(_gather())
+
+    # The catalog only contributes its version to the cache key.
+    cached_analyzer = QueryAnalyzer(
+        ctx.llm(), cache=QueryAnalysisCache(), catalog=SimpleNamespace(version="bench")
+    )
+    for q in queries:
+        cached_analyzer.analyze(q)
+    cached = time_each(cached_analyzer.analyze, queries, warmup=0)
+
+    server_ms = server.expected_ms(1)
+    shared_stats = latency(shared)
+    return {
+        "server_ms": server_ms,
+        "shared_client": shared_stats,
+        "client_overhead_ms": round(shared_stats["mean_ms"] - server_ms, 3),
+        "client_per_call": latency(fresh),
+        "async_concurrent": {
+            "queries": len(queries),
+            "seconds": round(concurrent_seconds, 4),
+            "queries_per_sec": round(len(queries) / concurrent_seconds, 1),
+        },
+        "cached": latency(cached),
+        "filters_found": sum(1 for q in queries if analyzer.analyze(q)),
+    }
+
+
+def bench_context_assembly(ctx: BenchContext) -> Dict[str, Any]:
+    """Context packing (dedup, merge, budget, optional compression) and history assembly."""
+    from src.config.settings import (
+        CONTEXT_COMPRESS_MIN_TOKENS,
+        CONTEXT_COMPRESSION_KEEP_RATIO,
+        CONTEXT_DEDUP_THRESHOLD,
+        CONTEXT_TOKEN_BUDGET,
+        HISTORY_MAX_MESSAGES,
+        HISTORY_SUMMARY_MAX_TOKENS,
+        HISTORY_TOKEN_BUDGET,
+    )
+    from src.conversation.memory import ConversationMemory
+    from src.retrieval.context_packer import ContextPacker
+
+    queries = ctx.distinct_queries
+    docs = dict(zip(queries, ctx.candidate_docs()))
+    positions = ctx.positions
+
+    packer = ContextPacker(token_budget=CONTEXT_TOKEN_BUDGET, dedup_threshold=CONTEXT_DEDUP_THRESHOLD)
+    compressor = ContextPacker(
+        reranker=ctx.reranker(),
+        token_budget=CONTEXT_TOKEN_BUDGET,
+        dedup_threshold=CONTEXT_DEDUP_THRESHOLD,
+        compress=True,
+        keep_ratio=CONTEXT_COMPRESSION_KEEP_RATIO,
+        compress_min_tokens=CONTEXT_COMPRESS_MIN_TOKENS,
+    )
+    spans: List[int] = []
+
+    def _pack(p: ContextPacker) -> Callable[[str], str]:
+        def run(query: str) -> str:
+            # pack() annotates its input dicts, so each run gets fresh copies.
+            packed = p.pack(query, [dict(d) for d in docs[query]], positions)
+            spans.append(len(packed))
+            return p.render(packed)
+
+        return run
+
+    plain = time_each(_pack(packer), queries)
+    plain_spans = round(sum(spans) / len(spans), 1)
+    compressed = time_each(_pack(compressor), queries)
+
+    class _NoSummaryMemory(ConversationMemory):
+        # Summaries are LLM + database work; only the assembly is timed here.
+        def schedule_refresh(self, conversation_id: int) -> None:
+            pass
+
+    memory = _NoSummaryMemory(
+        llm=None,
+        token_budget=HISTORY_TOKEN_BUDGET,
+        summary_max_tokens=HISTORY_SUMMARY_MAX_TOKENS,
+        max_messages=HISTORY_MAX_MESSAGES,
+    )
+    answer = " ".join(ctx.texts[0].split()[:120])
+    messages = [
+        SimpleNamespace(id=i, role="user" if i % 2 else "assistant", content=q if i % 2 else answer)
+        for i, q in enumerate(queries[:HISTORY_MAX_MESSAGES], start=1)
+    ][::-1]
+    conversations = list(range(len(queries)))
+    load = time_each(lambda c: memory.load(c, None, None, messages), conversations)
+    record = time_each(
+        lambda c: memory.record(c, [(1000 + c, "user", queries[c]), (1001 + c, "assistant", answer)]),
+        conversations,
+    )
+    memory.shutdown()
+    return {
+        "chunks_per_query": len(next(iter(docs.values()))),
+        "mean_spans": plain_spans,
+        "pack": latency(plain),
+        "pack_compressed": latency(compressed),
+        "history_load": latency(load),
+        "history_record": latency(record),
+    }
+
+
+def bench_generation(ctx: BenchContext) -> Dict[str, Any]:
+    """RAG answer generation against the fake Ollama: time to first token, streaming, concurrency."""
+    server = ctx.ollama()
+    llm = ctx.llm()
+    llm.warm_up(timeout=10)
+    queries = ctx.distinct_queries[:ctx.llm_requests]
+    context = "\n\n".join(ctx.texts[:6])
+
+    blocking = time_each(lambda q: llm.generate_with_context(q, context), queries)
+
+    async def _stream(query: str) -> Tuple[float, float, int]:
+        start = time.perf_counter()
+        first, chunks = None, 0
+        async for _ in llm.astream_with_context(query, context):
+            if first is None:
+                first = time.perf_counter() - start
+            chunks += 1
+        return (first or 0.0) * 1000, (time.perf_counter() - start) * 1000, chunks
+
+    async def _run() -> Tuple[List[Tuple[float, float, int]], float]:
+        await _stream(queries[0])
+        streamed = [await _stream(q) for q in queries]
+        start = time.perf_counter()
+        await asyncio.gather(*(_stream(q) for q in queries))
+        return streamed, time.perf_counter() - start
+
+    streamed, concurrent_seconds = asyncio.run(_run())
+    total = latency([s[1] for s in streamed])
+    llm.close()
+    return {
+        "server": {
+            "first_token_ms": server.first_token_ms,
+            "token_latency_ms": server.token_latency_ms,
+            "expected_ms": server.expected_ms(),
+        },
+        "blocking": latency(blocking),
+        "stream_first_token": latency([s[0] for s in streamed]),
+        "stream_total": total,
+        "client_overhead_ms": round(total["mean_ms"] - server.expected_ms(), 3),
+        "stream_chunks": streamed[0][2],
+        "concurrent_streams": {
+            "requests": len(queries),
+            "seconds": round(concurrent_seconds, 4),
+            "requests_per_sec": round(len(queries) / concurrent_seconds, 2),
+        },
+    }
+
+
+def bench_parsing(ctx: BenchContext) -> Dict[str, Any]:
+    """Docling conversion of a markdown and a PDF paper (needs the Docling models locally)."""
+    from src.documents.loader import load_document_with_timings
+
+    results: Dict[str, Any] = {}
+    for suffix in (".md", ".pdf"):
+        path = next((p for p in ctx.files if p.suffix == suffix), None)
+        if path is None:
+            continue
+        try:
+            # First conversion loads the pipeline models; not timed.
+            load_document_with_timings(str(path))
+            samples = time_each(lambda p: load_document_with_timings(str(p)), [path] * min(ctx.repeat, 3), warmup=0)
+            results[suffix.lstrip(".")] = {"bytes": path.stat().st_size, **latency(samples)}
+        except Exception as e:
+            results[suffix.lstrip(".")] = {"skipped": f"{type(e).__name__}: {e}"}
+    return results
+
+
+# Run order of `python -m src.benchmarks.run`.
+STAGES: Dict[str, Callable[[BenchContext], Dict[str, Any]]] = {
+    "hashing": bench_hashing,
+    "chunking": bench_chunking,
+    "parsing": bench_parsing,
+    "embedding": bench_embedding,
+    "vector_search": bench_vector_search,
+    "reranking": bench_reranking,
+    "query_analysis": bench_query_analysis,
+    "context_assembly": bench_context_assembly,
+    "generation": bench_generation,
+}
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 import torch
@@ -17,15 +18,40 @@ DOCUMENTS_DIR.mkdir(parents=True, exist_ok=True)
 # Embedding model — BAAI/bge-large-en-v1.5
 # Top MTEB performer, 1024-dim, no trust_remote_code needed, strong on scientific text
 EMBEDDING_MODEL = "BAAI/bge-large-en-v1.5"
+# Prefix for queries (not documents), as LlamaIndex defaults it for BGE models
+EMBEDDING_QUERY_INSTRUCTION = "Represent this question for searching relevant passages: "
 VECTOR_STORE_DIR = DATA_DIR / "vector_store"
 VECTOR_STORE_DIR.mkdir(parents=True, exist_ok=True)
 
+# Staging area for files waiting in the bulk ingestion queue
+INGEST_STAGING_DIR = DATA_DIR / "ingest_staging"
+INGEST_STAGING_DIR.mkdir(parents=True, exist_ok=True)
+
+# Cache Directory (derived data, safe to delete)
+CACHE_DIR = DATA_DIR / "cache"
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
 # Database file
 DATABASE_PATH = DATA_DIR / "documents.db"
 DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+# SQLite connection tuning: WAL lets readers run alongside the single
+# writer, and writers wait up to DB_BUSY_TIMEOUT_MS for the lock instead of
+# failing with "database is locked". Connections are pooled per engine.
+DB_BUSY_TIMEOUT_MS = 10_000
+DB_POOL_SIZE = 8
+DB_MAX_OVERFLOW = 16
+DB_CACHE_SIZE_KB = 32_768  # SQLite page cache per connection
 
 # LLM
 LLM_MODEL_NAME = "gemma4:31b-cloud"
+OLLAMA_BASE_URL = "http://localhost:11434"
+# How long Ollama keeps the model loaded after each request ("-1" = forever);
+# the model is also loaded at startup so the first chat does not wait for it.
+OLLAMA_KEEP_ALIVE = "30m"
+OLLAMA_WARM_UP = True
+# Availability is checked in the background and cached this long.
+OLLAMA_HEALTH_TTL_SECONDS = 15.0
 
 DEVICE = "cpu"
 
@@ -33,3 +59,130 @@ if torch.cuda.is_available():
     DEVICE = "cuda"
 elif torch.backends.mps.is_available():
     DEVICE = "mps"
+
+# Docling
+# One converter per process and option set is cached; the accelerator follows
+# DEVICE. Thread count is per converter (bulk ingestion divides the cores
+# between its worker processes instead).
+DOCLING_NUM_THREADS = min(4, os.cpu_count() or 1)
+DOCLING_DO_OCR = True
+
+# Chunking
+# Markdown sections are bounded to a token window after MarkdownNodeParser:
+# bge-large and the cross-encoder both truncate at 512 tokens.
+CHUNK_MIN_TOKENS = 64
+CHUNK_MAX_TOKENS = 480
+CHUNK_OVERLAP_TOKENS = 48
+
+# Conversation memory: the history sent to the LLM is a rolling summary of
+# older turns plus the newest messages, within HISTORY_TOKEN_BUDGET tokens
+# in total. Summaries are refreshed in the background.
+HISTORY_TOKEN_BUDGET = 1500
+HISTORY_SUMMARY_MAX_TOKENS = 300
+HISTORY_MAX_MESSAGES = 20
+HISTORY_CACHE_SIZE = 1024
+
+# Concurrency
+# Bounded pool for CPU-bound work (embedding, reranking, Docling) offloaded
+# from the event loop, so concurrent requests spread across the cores.
+CPU_WORKERS = max(2, os.cpu_count() or 2)
+
+# Retrieval
+# Run the unfiltered vector search while the LLM query analysis is still in
+# flight, and only re-query when the analysis actually returns filters.
+SPECULATIVE_RETRIEVAL = True
+
+# Retrieval stages (all overridable per chat request): a coarse pass over
+# reduced-dimension vectors fetches RETRIEVAL_COARSE_K candidates, exact
+# scoring on full vectors keeps RETRIEVAL_LIMIT, and the cross-encoder
+# reranks those down to RETRIEVAL_TOP_K. The coarse pass needs the local
+# backend with LOCAL_VECTOR_COARSE_DIM set; otherwise it is skipped.
+RETRIEVAL_COARSE_K = 200
+RETRIEVAL_LIMIT = 20
+RETRIEVAL_TOP_K = 5
+
+# Hybrid retrieval: a local BM25 index (kept in sync with the vector store)
+# is fused with dense results by reciprocal rank fusion before reranking.
+HYBRID_RETRIEVAL = True
+BM25_INDEX_DIR = VECTOR_STORE_DIR / "bm25"
+RRF_K = 60
+
+# Vector store backend: "chroma", or "local" (in-process memory-mapped
+# matrix + SQLite; HNSW via hnswlib when installed, brute force otherwise).
+# Switching backends needs a re-ingest; cached embeddings make it cheap.
+VECTOR_STORE_BACKEND = "chroma"
+LOCAL_VECTOR_STORE_DIR = VECTOR_STORE_DIR / "local"
+LOCAL_VECTOR_DTYPE = "float32"  # or "float16" (half the memory)
+LOCAL_VECTOR_INDEX = "auto"  # "hnsw", "flat" or "auto"
+# Compact mode: scan int8 codes (1 KB per bge-large vector instead of 4 KB)
+# and rescore the best top_k * LOCAL_VECTOR_RESCORE_FACTOR candidates at full
+# precision. Compare trade-offs with `python -m src.infra.vectorstore.benchmark`.
+LOCAL_VECTOR_QUANTIZATION = None  # or "int8"
+LOCAL_VECTOR_RESCORE_FACTOR = 4
+# Dimension of the first-pass vectors stored alongside the full ones
+# (e.g. 256; PCA-projected, since bge-large is not Matryoshka-trained).
+LOCAL_VECTOR_COARSE_DIM = None
+
+# Filename / section → node id pre-index used to resolve analyzer filters
+# (fuzzy and prefix matches) before searching.
+METADATA_INDEX_DB = VECTOR_STORE_DIR / "metadata_index.db"
+
+# Query analysis cache: in-memory LRU + TTL, with an optional SQLite tier
+# shared across processes (set ANALYSIS_CACHE_DB = None to disable it).
+ANALYSIS_CACHE_SIZE = 1024
+ANALYSIS_CACHE_TTL_SECONDS = 3600
+ANALYSIS_CACHE_DB = CACHE_DIR / "query_analysis.db"
+
+# Semantic answer cache: answers to conversation-independent questions are
+# reused for later questions whose embedding is at least
+# ANSWER_CACHE_THRESHOLD similar, until the document set changes.
+# Set ANSWER_CACHE_DB = None to disable it.
+ANSWER_CACHE_DB = CACHE_DIR / "answers.db"
+ANSWER_CACHE_THRESHOLD = 0.95
+ANSWER_CACHE_MAX_ENTRIES = 5000
+ANSWER_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+# Query embedding cache and micro-batching of concurrent query embeddings
+QUERY_EMBED_CACHE_SIZE = 4096
+QUERY_EMBED_MAX_BATCH = 32
+QUERY_EMBED_MAX_WAIT_MS = 5.0
+
+# Persistent document embedding cache, keyed on (model, normalized chunk
+# text hash). ~4 KB per bge-large vector; LRU-evicted past the cap.
+# Set EMBEDDING_CACHE_DB = None to disable it.
+EMBEDDING_CACHE_DB = CACHE_DIR / "embeddings.db"
+EMBEDDING_CACHE_MAX_ENTRIES = 100_000
+
+# Document embedding batches are sized by padded tokens (batch size ×
+# longest chunk) rather than a fixed count; chunks are length-sorted first.
+EMBED_TOKEN_BUDGET = {"cuda": 32_768, "mps": 16_384}.get(DEVICE, 8_192)
+EMBED_MAX_BATCH = 128
+
+# Cross-encoder reranking: micro-batched across requests, with a score cache
+RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_MAX_BATCH = 64
+RERANK_MAX_WAIT_MS = 5.0
+RERANK_SCORE_CACHE_SIZE = 50_000
+
+# Context packing between retrieval and generation: near-duplicate chunks
+# are dropped, adjacent chunks of a document merged, and spans added by
+# relevance up to CONTEXT_TOKEN_BUDGET. With CONTEXT_COMPRESSION, spans
+# longer than CONTEXT_COMPRESS_MIN_TOKENS keep only their most relevant
+# sentences (cross-encoder scored).
+CONTEXT_TOKEN_BUDGET = 3000
+CONTEXT_DEDUP_THRESHOLD = 0.8
+CONTEXT_COMPRESSION = False
+CONTEXT_COMPRESSION_KEEP_RATIO = 0.5
+CONTEXT_COMPRESS_MIN_TOKENS = 160
+
+# Bulk ingestion: Docling runs in worker processes, embedding is batched
+# across files in a separate stage, stages are joined by bounded queues.
+INGEST_PARSE_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+INGEST_QUEUE_SIZE = 4
+INGEST_EMBED_BATCH_NODES = 256
+# A pipeline claims the jobs it works on and renews the claim every third
+# of this; jobs whose claim lapsed (their process died) are taken over.
+INGEST_JOB_LEASE_SECONDS = 60.0
+
+# Benchmark results (python -m src.benchmarks.run), one JSON file per run
+BENCHMARK_RESULTS_DIR = DATA_DIR / "benchmarks"
@@ -1,8 +1,9 @@
 from .schemas import Conversation, Message
-from .manager import ConversationManager
+from .manager import AsyncConversationManager, ConversationManager
 
 __all__ = [
     "Conversation",
     "Message",
     "ConversationManager",
+    "AsyncConversationManager",
 ]
\ No newline at end of file
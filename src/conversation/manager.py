@@ -1,20 +1,90 @@
 import datetime
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+from sqlalchemy import update
 from sqlmodel import Session, desc, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from .memory import ConversationMemory
 from .schemas import Conversation, Message
 
 logger = logging.getLogger(__name__)
 
 
+def _messages_statement(conversation_id: int):
+    return (
+        select(Message)
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.timestamp, Message.id)  # type: ignore[arg-type]
+    )
+
+
+def _window_statement(conversation_id: int, max_messages: int, after_id: int = 0):
+    """
+    The last `max_messages` messages with an id above `after_id`, newest
+    first (served by the composite index).
+    """
+    return (
+        select(Message)
+        .where(Message.conversation_id == conversation_id, Message.id > after_id)
+        .order_by(desc(Message.timestamp), desc(Message.id))
+        .limit(max_messages)
+    )
+
+
+def _touch_statement(conversation_id: int):
+    """Bump `updated_at` without loading the conversation."""
+    return (
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(updated_at=datetime.datetime.now(datetime.timezone.utc))
+    )
+
+
+def _to_context(newest_first: List[Message]) -> List[Dict[str, str]]:
+    return [{"role": msg.role, "content": msg.content} for msg in reversed(newest_first)]
+
+
+def _new_messages(
+    conversation_id: int,
+    user_content: str,
+    assistant_content: str,
+    assistant_metadata: Optional[Dict[str, Any]],
+) -> Tuple[Message, Message]:
+    user = Message(conversation_id=conversation_id, role="user", content=user_content)
+    assistant = Message(
+        conversation_id=conversation_id,
+        role="assistant",
+        content=assistant_content,
+        mes_metadata=assistant_metadata or {},
+    )
+    return user, assistant
+
+
+def _recorded(messages: Sequence[Message]) -> List[Tuple[int, str, str]]:
+    return [(m.id, m.role, m.content) for m in messages]
+
+
 class ConversationManager:
     """Manages conversation lifecycle and message history."""
 
-    def __init__(self, session: Session, max_context_messages: int = 10) -> None:
+    def __init__(
+        self,
+        session: Session,
+        max_context_messages: int = 10,
+        memory: Optional[ConversationMemory] = None,
+    ) -> None:
+        """
+        Args:
+            session:              Request-scoped DB session.
+            max_context_messages: History window when no `memory` is given.
+            memory:               Shared token-budgeted memory; replaces the
+                                  fixed message window when set.
+        """
         self.session = session
         self.max_context_messages = max_context_messages
+        self.memory = memory
 
     # ------------------------------------------------------------------ #
     #  Conversation CRUD                                                   #
@@ -40,6 +110,8 @@ class ConversationManager:
             return False
         self.session.delete(conversation)
         self.session.commit()
+        if self.memory is not None:
+            self.memory.forget(conversation_id)
         return True
 
     def list_conversations(self, limit: int = 50) -> List[Conversation]:
@@ -68,23 +140,36 @@ class ConversationManager:
             mes_metadata=metadata or {},
         )
         self.session.add(message)
-
-        # Bump conversation updated_at
-        conversation = self.get_conversation(conversation_id)
-        if conversation:
-            conversation.updated_at = datetime.datetime.now(datetime.timezone.utc)
-
+        self.session.execute(_touch_statement(conversation_id))
+        self.session.flush()
+        recorded = _recorded([message])
         self.session.commit()
-        self.session.refresh(message)
+        if self.memory is not None:
+            self.memory.record(conversation_id, recorded)
         return message
 
-    def get_messages(self, conversation_id: int) -> List[Message]:
-        statement = (
-            select(Message)
-            .where(Message.conversation_id == conversation_id)
-            .order_by(Message.timestamp)  # type: ignore[arg-type]
+    def add_turn(
+        self,
+        conversation_id: int,
+        user_content: str,
+        assistant_content: str,
+        assistant_metadata: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Message, Message]:
+        """Store a user message and its answer in a single transaction."""
+        messages = _new_messages(
+            conversation_id, user_content, assistant_content, assistant_metadata
         )
-        return list(self.session.exec(statement).all())
+        self.session.add_all(messages)
+        self.session.execute(_touch_statement(conversation_id))
+        self.session.flush()
+        recorded = _recorded(messages)
+        self.session.commit()
+        if self.memory is not None:
+            self.memory.record(conversation_id, recorded)
+        return messages
+
+    def get_messages(self, conversation_id: int) -> List[Message]:
+        return list(self.session.exec(_messages_statement(conversation_id)).all())
 
     # ------------------------------------------------------------------ #
     #  Context window                                                      #
@@ -95,13 +180,116 @@ class ConversationManager:
         Return the most recent messages as a list of role/content dicts
         suitable for passing directly to the LLM.
 
-        Applies a sliding window of `max_context_messages` to keep the
-        context size bounded.
+        With a `memory`, the history is a rolling summary plus the newest
+        messages within its token budget, usually served from its cache.
+        Otherwise a sliding window of `max_context_messages` keeps the
+        context size bounded; only the window is read from the database.
         """
-        messages = self.get_messages(conversation_id)
-        recent = (
-            messages[-self.max_context_messages :]
-            if len(messages) > self.max_context_messages
-            else messages
+        if self.memory is None:
+            statement = _window_statement(conversation_id, self.max_context_messages)
+            return _to_context(list(self.session.exec(statement).all()))
+
+        history = self.memory.get_cached(conversation_id)
+        if history is not None:
+            return history
+        conversation = self.get_conversation(conversation_id)
+        summary = conversation.summary if conversation else None
+        through_id = (conversation.summary_through_id or 0) if conversation else 0
+        statement = _window_statement(conversation_id, self.memory.max_messages, through_id)
+        return self.memory.load(
+            conversation_id, summary, through_id, self.session.exec(statement).all()
+        )
+
+
+class AsyncConversationManager:
+    """
+    Non-blocking counterpart of ConversationManager for the async chat path.
+
+    Covers the operations a chat turn needs; queries are shared with the
+    synchronous manager so both always see the same window.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        max_context_messages: int = 10,
+        memory: Optional[ConversationMemory] = None,
+    ) -> None:
+        self.session = session
+        self.max_context_messages = max_context_messages
+        self.memory = memory
+
+    async def create_conversation(self, title: str = "New Conversation") -> Conversation:
+        conversation = Conversation(title=title)
+        self.session.add(conversation)
+        await self.session.commit()
+        await self.session.refresh(conversation)
+        return conversation
+
+    async def get_conversation(self, conversation_id: int) -> Optional[Conversation]:
+        return await self.session.get(Conversation, conversation_id)
+
+    async def add_message(
+        self,
+        conversation_id: int,
+        role: str,
+        content: str,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Message:
+        message = Message(
+            conversation_id=conversation_id,
+            role=role,
+            content=content,
+            mes_metadata=metadata or {},
+        )
+        self.session.add(message)
+        await self.session.execute(_touch_statement(conversation_id))
+        await self.session.flush()
+        recorded = _recorded([message])
+        await self.session.commit()
+        if self.memory is not None:
+            self.memory.record(conversation_id, recorded)
+        return message
+
+    async def add_turn(
+        self,
+        conversation_id: int,
+        user_content: str,
+        assistant_content: str,
+        assistant_metadata: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Message, Message]:
+        """Async version of `ConversationManager.add_turn`."""
+        messages = _new_messages(
+            conversation_id, user_content, assistant_content, assistant_metadata
+        )
+        self.session.add_all(messages)
+        await self.session.execute(_touch_statement(conversation_id))
+        await self.session.flush()
+        recorded = _recorded(messages)
+        await self.session.commit()
+        if self.memory is not None:
+            self.memory.record(conversation_id, recorded)
+        return messages
+
+    async def get_messages(self, conversation_id: int) -> List[Message]:
+        result = await self.session.exec(_messages_statement(conversation_id))
+        return list(result.all())
+
+    async def get_context(self, conversation_id: int) -> List[Dict[str, str]]:
+        """Async version of `ConversationManager.get_context`."""
+        if self.memory is None:
+            result = await self.session.exec(
+                _window_statement(conversation_id, self.max_context_messages)
+            )
+            return _to_context(list(result.all()))
+
+        history = self.memory.get_cached(conversation_id)
+        if history is not None:
+            return history
+        conversation = await self.get_conversation(conversation_id)
+        summary = conversation.summary if conversation else None
+        through_id = (conversation.summary_through_id or 0) if conversation else 0
+        result = await self.session.exec(
+            _window_statement(conversation_id, self.memory.max_messages, through_id)
         )
-        return [{"role": msg.role, "content": msg.content} for msg in recent]
\ No newline at end of file
+        return self.memory.load(conversation_id, summary, through_id, result.all())
\ No newline at end of file
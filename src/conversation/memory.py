@@ -0,0 +1,285 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import func, update
+from sqlmodel import select
+
+from src.utils.cache import LRUCache
+from src.utils.tokens import count_tokens
+
+from .schemas import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and a "
+    "research assistant. Merge the new messages into the existing summary. "
+    "Keep the questions asked, the answers and conclusions given, document "
+    "names, definitions, numbers and formulas (in LaTeX) that later questions "
+    "may refer to. Drop greetings and repetition. Write compact prose, at "
+    "most {max_words} words, and output only the summary."
+)
+
+# Role/formatting overhead of one chat message in the prompt.
+_MESSAGE_OVERHEAD_TOKENS = 4
+_TRUNCATION_MARK = " …[truncated]"
+
+# (message id, role, content, tokens)
+_Entry = Tuple[int, str, str, int]
+
+
+def _entry(message_id: int, role: str, content: str) -> _Entry:
+    return message_id, role, content, count_tokens(content) + _MESSAGE_OVERHEAD_TOKENS
+
+
+def _fit(newest_first: Sequence[_Entry], budget: int) -> Tuple[List[_Entry], bool]:
+    """
+    Newest messages that fit in `budget` tokens, oldest first, and whether
+    any message was left out. The newest message is always kept, cut down
+    to the budget if it is longer on its own.
+    """
+    kept: List[_Entry] = []
+    used = 0
+    for entry in newest_first:
+        if used + entry[3] > budget:
+            if not kept:
+                chars = max(0, (budget - _MESSAGE_OVERHEAD_TOKENS) * 4 - len(_TRUNCATION_MARK))
+                kept.append((entry[0], entry[1], entry[2][:chars] + _TRUNCATION_MARK, budget))
+            return kept[::-1], True
+        kept.append(entry)
+        used += entry[3]
+    return kept[::-1], False
+
+
+class _MemoryState:
+    """Assembled history of one conversation."""
+
+    __slots__ = ("summary", "summary_through_id", "recent", "history")
+
+    def __init__(self, summary: Optional[str], summary_through_id: int) -> None:
+        self.summary = summary
+        self.summary_through_id = summary_through_id
+        self.recent: List[_Entry] = []
+        self.history: List[Dict[str, str]] = []
+
+
+class ConversationMemory:
+    """
+    Token-budgeted conversation history with a rolling summary.
+
+    The history handed to the LLM is a summary of the older turns followed
+    by the newest messages that fit in `token_budget` (summary included),
+    so the prompt stays the same size however long a conversation runs.
+
+    Messages that fall out of the window are folded into the summary by a
+    background worker (one LLM call per refresh, off the request path); the
+    summary and the id of the last message it covers are persisted on
+    `Conversation`. Until a refresh lands, the dropped messages are simply
+    absent from the prompt.
+
+    Assembled histories are cached per conversation and extended in place
+    when a turn is recorded, so a chat turn does not read its history back
+    from the database.
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        token_budget: int = 1500,
+        summary_max_tokens: int = 300,
+        max_messages: int = 20,
+        cache_size: int = 1024,
+        cache_ttl_seconds: Optional[float] = 3600.0,
+    ) -> None:
+        """
+        Args:
+            llm:                Model used to write summaries (`generate`).
+            token_budget:       Max tokens of summary + recent messages.
+            summary_max_tokens: Target length of the rolling summary.
+            max_messages:       Max recent messages read from the database.
+            cache_size:         Max conversations with a cached history.
+            cache_ttl_seconds:  Age after which a cached history is rebuilt
+                                (picks up turns written by other processes).
+        """
+        if summary_max_tokens >= token_budget:
+            raise ValueError("summary_max_tokens must be below token_budget.")
+        self.llm = llm
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+        self.max_messages = max_messages
+        self._cache: LRUCache[int, _MemoryState] = LRUCache(cache_size, cache_ttl_seconds)
+        self._lock = threading.Lock()
+        self._pending: Set[int] = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-memory")
+        self.summaries_written = 0
+
+    # ------------------------------------------------------------------ #
+    #  Assembly                                                            #
+    # ------------------------------------------------------------------ #
+
+    def _summary_message(self, summary: str) -> Dict[str, str]:
+        return {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}
+
+    def _rebuild(self, state: _MemoryState, truncated_fetch: bool) -> bool:
+        """Re-trim `state` to the budget; True if older messages need summarizing."""
+        budget = self.token_budget
+        history: List[Dict[str, str]] = []
+        if state.summary:
+            summary_message = self._summary_message(state.summary)
+            history.append(summary_message)
+            budget -= count_tokens(summary_message["content"]) + _MESSAGE_OVERHEAD_TOKENS
+        state.recent, dropped = _fit(state.recent[::-1], max(budget, _MESSAGE_OVERHEAD_TOKENS + 1))
+        history.extend({"role": role, "content": content} for _, role, content, _ in state.recent)
+        state.history = history
+        return dropped or truncated_fetch
+
+    def get_cached(self, conversation_id: int) -> Optional[List[Dict[str, str]]]:
+        state = self._cache.get(conversation_id)
+        return list(state.history) if state is not None else None
+
+    def load(
+        self,
+        conversation_id: int,
+        summary: Optional[str],
+        summary_through_id: Optional[int],
+        newest_first: Iterable[Message],
+    ) -> List[Dict[str, str]]:
+        """
+        Assemble (and cache) the history from the persisted summary and the
+        newest messages after it, as read by the conversation manager.
+        """
+        messages = list(newest_first)
+        state = _MemoryState(summary, summary_through_id or 0)
+        state.recent = [_entry(m.id, m.role, m.content) for m in reversed(messages)]
+        if self._rebuild(state, truncated_fetch=len(messages) >= self.max_messages):
+            self.schedule_refresh(conversation_id)
+        self._cache.put(conversation_id, state)
+        return list(state.history)
+
+    def record(self, conversation_id: int, messages: Sequence[Tuple[int, str, str]]) -> None:
+        """Extend the cached history with newly stored (id, role, content) messages."""
+        state = self._cache.get(conversation_id)
+        if state is None:
+            return
+        with self._lock:
+            state.recent.extend(_entry(*m) for m in messages)
+            needs_summary = self._rebuild(state, truncated_fetch=False)
+        if needs_summary:
+            self.schedule_refresh(conversation_id)
+
+    def forget(self, conversation_id: int) -> None:
+        self._cache.pop(conversation_id)
+
+    # ------------------------------------------------------------------ #
+    #  Rolling summary                                                     #
+    # ------------------------------------------------------------------ #
+
+    def schedule_refresh(self, conversation_id: int) -> None:
+        """Fold messages that left the window into the summary, in the background."""
+        with self._lock:
+            if conversation_id in self._pending:
+                return
+            self._pending.add(conversation_id)
+        self._executor.submit(self._refresh_safely, conversation_id)
+
+    def _refresh_safely(self, conversation_id: int) -> None:
+        with self._lock:
+            self._pending.discard(conversation_id)
+        try:
+            self.refresh_summary(conversation_id)
+        except Exception as e:
+            logger.warning(f"Summary refresh failed for conversation {conversation_id}: {e}")
+
+    def _summarize(self, summary: Optional[str], entries: Sequence[_Entry]) -> str:
+        transcript = "\n\n".join(f"{role.upper()}: {content}" for _, role, content, _ in entries)
+        prompt = (
+            f"Existing summary:\n{summary or '(none)'}\n\n"
+            f"New messages:\n{transcript}"
+        )
+        system = SUMMARY_SYSTEM_PROMPT.format(max_words=int(self.summary_max_tokens * 0.75))
+        return self.llm.generate(
+            [{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+            temperature=0.0,
+            max_tokens=self.summary_max_tokens,
+        ).strip()
+
+    def refresh_summary(self, conversation_id: int) -> bool:
+        """
+        Synchronously fold every unsummarized message outside the recent
+        window into the persisted summary.
+
+        Returns:
+            True if a new summary was written.
+        """
+        from src.infra.db.session import get_session
+
+        with get_session() as session:
+            conversation = session.get(Conversation, conversation_id)
+            if conversation is None:
+                return False
+            summary = conversation.summary
+            through_id = conversation.summary_through_id or 0
+            rows = session.exec(
+                select(Message.id, Message.role, Message.content)
+                .where(Message.conversation_id == conversation_id, Message.id > through_id)
+                .order_by(Message.id)
+            ).all()
+
+        entries = [_entry(*row) for row in rows]
+        budget = self.token_budget - self.summary_max_tokens - _MESSAGE_OVERHEAD_TOKENS
+        window, _ = _fit(entries[::-1], budget)
+        folded = [e for e in entries if e[0] < window[0][0]] if window else entries
+        if not folded:
+            return False
+
+        # Bound each LLM call: fold in slices of at most one budget of text.
+        new_summary = summary
+        start = 0
+        while start < len(folded):
+            used, end = 0, start
+            while end < len(folded) and (end == start or used + folded[end][3] <= self.token_budget):
+                used += folded[end][3]
+                end += 1
+            new_summary = self._summarize(new_summary, folded[start:end])
+            start = end
+        new_through = folded[-1][0]
+
+        with get_session() as session:
+            # Another process may have folded the same messages meanwhile.
+            result = session.execute(
+                update(Conversation)
+                .where(
+                    Conversation.id == conversation_id,
+                    func.coalesce(Conversation.summary_through_id, 0) == through_id,
+                )
+                .values(summary=new_summary, summary_through_id=new_through)
+            )
+            session.commit()
+        if result.rowcount == 0:
+            self.forget(conversation_id)
+            return False
+
+        self.summaries_written += 1
+        logger.info(
+            f"Conversation {conversation_id}: folded {len(folded)} messages into the summary."
+        )
+        state = self._cache.get(conversation_id)
+        if state is not None:
+            with self._lock:
+                state.summary = new_summary
+                state.summary_through_id = new_through
+                state.recent = [e for e in state.recent if e[0] > new_through]
+                self._rebuild(state, truncated_fetch=False)
+        return True
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._cache.stats(),
+            "pending_summaries": len(self._pending),
+            "summaries_written": self.summaries_written,
+        }
@@ -1,7 +1,7 @@
 import datetime
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import JSON, Column
+from sqlalchemy import JSON, Column, Index
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -18,6 +18,10 @@ class Conversation(SQLModel, table=True):
     updated_at: datetime.datetime = Field(
         default_factory=lambda: datetime.datetime.now(datetime.timezone.utc)
     )
+    # Rolling summary of the messages up to and including summary_through_id
+    # (maintained by ConversationMemory).
+    summary: Optional[str] = None
+    summary_through_id: Optional[int] = None
 
     messages: List["Message"] = Relationship(
         back_populates="conversation",
@@ -28,7 +32,11 @@ class Conversation(SQLModel, table=True):
 class Message(SQLModel, table=True):
     """Represents a single message in a conversation."""
 
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # Serves the "last N messages of a conversation" window.
+        Index("ix_message_conversation_timestamp", "conversation_id", "timestamp"),
+        {"extend_existing": True},
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     conversation_id: int = Field(foreign_key="conversation.id", index=True)
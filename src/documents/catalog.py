@@ -0,0 +1,107 @@
+import hashlib
+import logging
+import threading
+import time
+from typing import FrozenSet, Optional
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import select
+
+from src.infra.db.session import get_session
+from .schemas import CatalogState, Document
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentCatalog:
+    """
+    Cached, process-wide view of what is in the knowledge base.
+
+    Holds the set of ingested filenames and section headings, plus a version
+    stamp that changes whenever a document is added or removed. The view is
+    reloaded from the `Document` table when it is explicitly invalidated
+    (ingest/delete in this process) or after `refresh_seconds`, which picks
+    up changes made by other processes sharing the database.
+
+    The version also carries a change counter kept in the database
+    (`CatalogState`) and bumped on every invalidation: a Document row is
+    committed before its chunks reach the vector store, so answers cached
+    in between must not stay valid once they do, whichever process
+    inserted the chunks and across restarts.
+    """
+
+    def __init__(self, refresh_seconds: float = 30.0) -> None:
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._filenames: FrozenSet[str] = frozenset()
+        self._sections: FrozenSet[str] = frozenset()
+        self._version = ""
+        self._loaded_at: Optional[float] = None
+
+    def invalidate(self) -> None:
+        """Force a reload on next access and bump the version (call after
+        every change to the indexed nodes)."""
+        with self._lock:
+            self._loaded_at = None
+        statement = insert(CatalogState).values(id=1, generation=1)
+        statement = statement.on_conflict_do_update(
+            index_elements=["id"], set_={"generation": CatalogState.generation + 1}
+        )
+        with get_session() as session:
+            session.exec(statement)
+            session.commit()
+
+    @staticmethod
+    def _generation() -> int:
+        with get_session() as session:
+            state = session.get(CatalogState, 1)
+            return state.generation if state else 0
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        loaded_at = self._loaded_at
+        if loaded_at is not None and now - loaded_at < self.refresh_seconds:
+            return
+
+        with self._lock:
+            if self._loaded_at is not None and now - self._loaded_at < self.refresh_seconds:
+                return
+
+            with get_session() as session:
+                docs = session.exec(select(Document)).all()
+
+            filenames = set()
+            sections = set()
+            digest = hashlib.sha1()
+            for doc in sorted(docs, key=lambda d: d.id or 0):
+                meta = doc.doc_metadata or {}
+                if meta.get("filename"):
+                    filenames.add(meta["filename"])
+                sections.update(meta.get("sections", []))
+                digest.update(f"{doc.id}:{doc.hash};".encode())
+
+            self._filenames = frozenset(filenames)
+            self._sections = frozenset(sections)
+            self._version = digest.hexdigest()[:16]
+            self._loaded_at = time.monotonic()
+            logger.debug(
+                f"Document catalog refreshed: {len(filenames)} files, "
+                f"{len(sections)} sections, version {self._version}."
+            )
+
+    @property
+    def filenames(self) -> FrozenSet[str]:
+        self._ensure_fresh()
+        return self._filenames
+
+    @property
+    def sections(self) -> FrozenSet[str]:
+        self._ensure_fresh()
+        return self._sections
+
+    @property
+    def version(self) -> str:
+        """Opaque stamp that changes whenever the documents or their indexed nodes change."""
+        self._ensure_fresh()
+        # Read every time: other processes bump it too.
+        return f"{self._version}.{self._generation()}"
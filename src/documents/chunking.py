@@ -0,0 +1,219 @@
+import logging
+import re
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+from llama_index.core.schema import MetadataMode, NodeRelationship, TextNode
+
+from src.config.settings import (
+    CHUNK_MAX_TOKENS,
+    CHUNK_MIN_TOKENS,
+    CHUNK_OVERLAP_TOKENS,
+    EMBEDDING_MODEL,
+)
+from src.utils.tokens import count_tokens, count_tokens_batch, get_tokenizer
+
+logger = logging.getLogger(__name__)
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+HEADER_PATH_SEPARATOR = " > "
+
+
+def _within(path: str, ancestor: str) -> bool:
+    return not ancestor or path == ancestor or path.startswith(ancestor + HEADER_PATH_SEPARATOR)
+
+
+def _heading_of(text: str) -> Optional[Tuple[int, str]]:
+    """(level, title) of the markdown heading opening `text`, if any."""
+    match = _HEADING.match(text.lstrip().split("\n", 1)[0])
+    if not match:
+        return None
+    return len(match.group(1)), match.group(2).strip()
+
+
+class TokenBoundedChunker:
+    """
+    Second chunking pass that bounds every node to a token window.
+
+    MarkdownNodeParser splits on headings only, so a section holding a big
+    table or a long appendix becomes one node far beyond the 512-token
+    window of bge-large and the cross-encoder (the tail is silently
+    truncated), while heading-only sections become near-empty nodes. This
+    pass:
+
+      - tags each node with `section` (its own heading) and `header_path`
+        (all enclosing headings, outermost first);
+      - merges undersized nodes into the following node of the same
+        section subtree while the result still fits;
+      - splits oversized nodes at line boundaries (word windows for
+        overlong lines, e.g. huge table rows), packing lines up to the
+        budget and carrying `overlap_tokens` of context into the next part.
+
+    Budgets include the metadata that gets embedded with the text.
+    """
+
+    def __init__(
+        self,
+        min_tokens: int = 64,
+        max_tokens: int = 480,
+        overlap_tokens: int = 48,
+        tokenizer: Optional[Any] = None,
+    ) -> None:
+        """
+        Args:
+            min_tokens:     Nodes below this are merged into a neighbour.
+            max_tokens:     Hard upper bound per node (text + embedded metadata).
+            overlap_tokens: Context repeated at the start of each split part.
+            tokenizer:      HuggingFace tokenizer; estimates are used if None.
+        """
+        if not 0 <= overlap_tokens < max_tokens // 2:
+            raise ValueError("overlap_tokens must be smaller than half of max_tokens.")
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.tokenizer = tokenizer
+
+    def _count(self, text: str) -> int:
+        return count_tokens(text, self.tokenizer)
+
+    def __call__(self, nodes: List[TextNode]) -> List[TextNode]:
+        return self.split(nodes)
+
+    def split(self, nodes: List[TextNode]) -> List[TextNode]:
+        """Annotate, merge and split `nodes` (as produced by MarkdownNodeParser)."""
+        if not nodes:
+            return []
+        self._annotate(nodes)
+        merged = self._merge_small(nodes)
+        result: List[TextNode] = []
+        for node in merged:
+            result.extend(self._split_large(node))
+        logger.debug(
+            f"Token-bounded chunking: {len(nodes)} sections → {len(result)} chunks."
+        )
+        return result
+
+    # ------------------------------------------------------------------ #
+    #  Header paths                                                        #
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def _annotate(nodes: List[TextNode]) -> None:
+        stack: List[Tuple[int, str]] = []
+        for node in nodes:
+            heading = _heading_of(node.get_content())
+            if heading is not None:
+                level, title = heading
+                while stack and stack[-1][0] >= level:
+                    stack.pop()
+                stack.append((level, title))
+            node.metadata["section"] = stack[-1][1] if stack else ""
+            node.metadata["header_path"] = HEADER_PATH_SEPARATOR.join(t for _, t in stack)
+
+    # ------------------------------------------------------------------ #
+    #  Merging                                                             #
+    # ------------------------------------------------------------------ #
+
+    def _metadata_tokens(self, node: TextNode) -> int:
+        return self._count(node.get_metadata_str(mode=MetadataMode.EMBED))
+
+    def _merge_small(self, nodes: List[TextNode]) -> List[TextNode]:
+        texts = [n.get_content() for n in nodes]
+        sizes = count_tokens_batch(texts, self.tokenizer)
+
+        merged: List[TextNode] = []
+        current, current_size = nodes[0], sizes[0]
+        for node, size in zip(nodes[1:], sizes[1:]):
+            path = current.metadata["header_path"]
+            parent = (
+                path.rsplit(HEADER_PATH_SEPARATOR, 1)[0]
+                if HEADER_PATH_SEPARATOR in path
+                else ""
+            )
+            # The next node continues the current subtree (sibling under the
+            # same parent, or a child): a heading-only stub joins its body.
+            same_subtree = _within(node.metadata["header_path"], parent)
+            budget = self.max_tokens - self._metadata_tokens(current)
+            if current_size < self.min_tokens and same_subtree and current_size + size <= budget:
+                current = self._copy(current, f"{current.get_content()}\n\n{node.get_content()}")
+                current_size += size
+            else:
+                merged.append(current)
+                current, current_size = node, size
+        merged.append(current)
+        return merged
+
+    # ------------------------------------------------------------------ #
+    #  Splitting                                                           #
+    # ------------------------------------------------------------------ #
+
+    def _split_large(self, node: TextNode) -> List[TextNode]:
+        text = node.get_content()
+        budget = self.max_tokens - self._metadata_tokens(node)
+        if self._count(text) <= budget:
+            return [node]
+
+        budget = max(budget, self.overlap_tokens * 2 + 1)
+        pieces = self._pieces(text, budget)
+        sizes = count_tokens_batch(pieces, self.tokenizer)
+
+        parts: List[str] = []
+        window: List[Tuple[str, int]] = []
+        window_size = 0
+        for piece, size in zip(pieces, sizes):
+            if window and window_size + size > budget:
+                parts.append("\n".join(p for p, _ in window))
+                # Carry the tail of the previous part over as overlap.
+                carried: List[Tuple[str, int]] = []
+                carried_size = 0
+                for p, s in reversed(window):
+                    if carried_size + s > self.overlap_tokens or carried_size + s + size > budget:
+                        break
+                    carried.insert(0, (p, s))
+                    carried_size += s
+                window, window_size = carried, carried_size
+            window.append((piece, size))
+            window_size += size
+        if window:
+            parts.append("\n".join(p for p, _ in window))
+
+        return [self._copy(node, part) for part in parts]
+
+    def _pieces(self, text: str, budget: int) -> List[str]:
+        """Break text into units that each fit `budget`: lines, then words."""
+        pieces: List[str] = []
+        lines = text.split("\n")
+        for line, size in zip(lines, count_tokens_batch(lines, self.tokenizer)):
+            if size <= budget:
+                pieces.append(line)
+                continue
+            words = line.split(" ")
+            # Word windows sized by this line's own tokens-per-word ratio.
+            per_word = max(1.0, size / max(1, len(words)))
+            step = max(1, int(budget / per_word * 0.9))
+            pieces.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+        return pieces
+
+    @staticmethod
+    def _copy(node: TextNode, text: str) -> TextNode:
+        copy = TextNode(
+            text=text,
+            metadata=dict(node.metadata),
+            excluded_embed_metadata_keys=list(node.excluded_embed_metadata_keys),
+            excluded_llm_metadata_keys=list(node.excluded_llm_metadata_keys),
+        )
+        source = node.relationships.get(NodeRelationship.SOURCE)
+        if source is not None:
+            copy.relationships[NodeRelationship.SOURCE] = source
+        return copy
+
+
+@lru_cache(maxsize=1)
+def get_chunker() -> TokenBoundedChunker:
+    """The process-wide chunker, counting tokens with the embedding tokenizer."""
+    return TokenBoundedChunker(
+        min_tokens=CHUNK_MIN_TOKENS,
+        max_tokens=CHUNK_MAX_TOKENS,
+        overlap_tokens=CHUNK_OVERLAP_TOKENS,
+        tokenizer=get_tokenizer(EMBEDDING_MODEL),
+    )
@@ -1,16 +1,49 @@
 from typing import Any, Dict
 
-from sqlalchemy import Column
+from sqlalchemy import Column, Index
 from sqlalchemy.types import JSON
 from sqlmodel import Field, SQLModel
 
 
 class Document(SQLModel, table=True):
-    __table_args__ = {"extend_existing": True}
+    # Unique so concurrent uploads of the same content cannot both register
+    # (they would share one content-addressed file). Named apart from the
+    # plain `ix_document_hash` of earlier databases so init_db creates it.
+    __table_args__ = (
+        Index("uq_document_hash", "hash", unique=True),
+        {"extend_existing": True},
+    )
     id: int | None = Field(default=None, primary_key=True)
 
     path: str
 
-    hash: str | None = Field(default=None, index=True)
+    hash: str | None = None
 
     doc_metadata: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
+
+
+class CatalogState(SQLModel, table=True):
+    """
+    Single row (id 1) counting changes to the indexed nodes. Shared by every
+    process using the database, and part of the catalog version.
+    """
+
+    __table_args__ = {"extend_existing": True}
+    id: int | None = Field(default=None, primary_key=True)
+
+    generation: int = 0
+
+
+class DocumentChunk(SQLModel, table=True):
+    """Content hash of each stored chunk, used to diff re-ingested documents."""
+
+    __table_args__ = {"extend_existing": True}
+    id: int | None = Field(default=None, primary_key=True)
+
+    document_id: int = Field(foreign_key="document.id", index=True)
+
+    node_id: str = Field(index=True)
+
+    content_hash: str
+
+    position: int
@@ -2,90 +2,328 @@ import datetime
 import hashlib
 import logging
 import os
+import uuid
+from collections import Counter
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from llama_index.core.node_parser import MarkdownNodeParser
-from llama_index.core.schema import TextNode
-from sqlmodel import Session, select
+from llama_index.core.schema import Document as LlamaDocument
+from llama_index.core.schema import MetadataMode, TextNode
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, delete, select
 
-from src.config.settings import DOCUMENTS_DIR
-from .loader import load_document
-from .schemas import Document
-from src.utils.exceptions import ServiceException
+from .chunking import TokenBoundedChunker, get_chunker
+from .loader import load_document_with_timings
+from .schemas import Document, DocumentChunk
+from .storage import COPY_BUFFER_SIZE
+from src.utils.exceptions import ResourceNotFoundException, ServiceException
 
 logger = logging.getLogger(__name__)
 
+# Namespace for chunk node ids; see `assign_chunk_ids`.
+_CHUNK_NAMESPACE = uuid.UUID("5f0c7a52-3c1e-4b8e-9a43-1d2f6e8b7c90")
+
 
 def compute_hash(path: str) -> str:
     """SHA-256 hash of a file for deduplication."""
     h = hashlib.sha256()
     with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
+        for chunk in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
             h.update(chunk)
     return h.hexdigest()
 
 
+def extract_section_headings(nodes: List[TextNode], limit: int = 500) -> List[str]:
+    """Distinct chunk `section` headings, in document order."""
+    headings: List[str] = []
+    seen = set()
+    for node in nodes:
+        heading = node.metadata.get("section")
+        if heading and heading not in seen:
+            seen.add(heading)
+            headings.append(heading)
+            if len(headings) >= limit:
+                break
+    return headings
+
+
+# Per-document metadata kept on every node for filtering and display, but
+# left out of the embedded text.
+_DOCUMENT_KEYS = ("document_id", "filename")
+
+
+def chunk_hash(node: TextNode) -> str:
+    """SHA-256 of exactly what gets embedded for a chunk (text + metadata)."""
+    content = node.get_content(metadata_mode=MetadataMode.EMBED)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def assign_chunk_ids(document_id: int, nodes: List[TextNode]) -> List[str]:
+    """
+    Give each node a deterministic id and return the chunk content hashes.
+
+    The id is uuid5(document_id, chunk hash, occurrence), so a chunk keeps
+    its id across re-ingestions for as long as its content is unchanged;
+    the occurrence counter separates identical chunks within one document.
+    """
+    hashes: List[str] = []
+    seen: Counter = Counter()
+    for node in nodes:
+        h = chunk_hash(node)
+        node.id_ = str(uuid.uuid5(_CHUNK_NAMESPACE, f"{document_id}:{h}:{seen[h]}"))
+        seen[h] += 1
+        hashes.append(h)
+    return hashes
+
+
+def tag_chunks(document_id: int, nodes: List[TextNode]) -> List[str]:
+    """
+    Stamp nodes with their document and assign their ids (see
+    `assign_chunk_ids`); returns the chunk content hashes.
+
+    The document id and filename stay out of the embedded text, so an
+    identical chunk embeds, hashes and hits the embedding cache the same
+    way in every document and on every re-ingestion.
+    """
+    for node in nodes:
+        node.metadata["document_id"] = str(document_id)
+        for key in _DOCUMENT_KEYS:
+            if key not in node.excluded_embed_metadata_keys:
+                node.excluded_embed_metadata_keys.append(key)
+        if "document_id" not in node.excluded_llm_metadata_keys:
+            node.excluded_llm_metadata_keys.append("document_id")
+    return assign_chunk_ids(document_id, nodes)
+
+
 class DocumentService:
-    def __init__(self, session: Session) -> None:
+    def __init__(self, session: Session, chunker: Optional[TokenBoundedChunker] = None) -> None:
         self.session = session
+        # Resolved on first use: listing/deleting never needs a tokenizer.
+        self._chunker = chunker
+
+    def find_by_hash(self, content_hash: str) -> Optional[Document]:
+        return self.session.exec(
+            select(Document).where(Document.hash == content_hash)
+        ).first()
+
+    def chunk_positions(self, node_ids: List[str]) -> Dict[str, Tuple[int, int]]:
+        """node id → (document id, position of the chunk in its document)."""
+        positions: Dict[str, Tuple[int, int]] = {}
+        for start in range(0, len(node_ids), 500):
+            rows = self.session.exec(
+                select(DocumentChunk.node_id, DocumentChunk.document_id, DocumentChunk.position)
+                .where(DocumentChunk.node_id.in_(node_ids[start:start + 500]))  # type: ignore[attr-defined]
+            ).all()
+            positions.update((node_id, (doc_id, pos)) for node_id, doc_id, pos in rows)
+        return positions
 
     def ingest(self, document: Document) -> List[TextNode]:
         """
         Ingest a document file into the system.
         """
         try:
-            content_hash = compute_hash(document.path)
-
-            existing = self.session.exec(
-                select(Document).where(Document.hash == content_hash)
-            ).first()
+            # Uploads arrive already hashed (see storage.spool_upload).
+            content_hash = document.hash or compute_hash(document.path)
 
-            if existing:
+            if self.find_by_hash(content_hash):
                 logger.info(
                     f"Document '{document.path}' already ingested (hash match). Skipping."
                 )
                 return []
 
             # --- Load ---
-            llama_docs = load_document(document.path)
+            llama_docs, timings = load_document_with_timings(document.path)
+            return self.register(document, llama_docs, content_hash, timings)
+
+        except (ServiceException, IntegrityError):
+            raise
+        except Exception as e:
+            self.session.rollback()
+            raise ServiceException(f"Failed to ingest document: {str(e)}") from e
+
+    def register(
+        self,
+        document: Document,
+        llama_docs: List[LlamaDocument],
+        content_hash: str,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> List[TextNode]:
+        """
+        Chunk already-converted content and save the document record.
+
+        Split out of `ingest` so the bulk pipeline can run Docling in worker
+        processes and only do the cheap, DB-bound part here. Raises
+        IntegrityError if a document with the same hash was registered
+        concurrently.
+        """
+        try:
             if not llama_docs:
-                logger.warning(f"DoclingReader returned no content for '{document.path}'.")
+                logger.warning(f"Docling returned no content for '{document.path}'.")
                 return []
 
+            # Stored files are content-addressed; keep the user's filename.
+            if document.doc_metadata is None:
+                document.doc_metadata = {}
+            filename = document.doc_metadata.get("filename") or Path(document.path).name
+
             # --- Chunk with MarkdownNodeParser ---
-            parser = MarkdownNodeParser()
-            nodes: List[TextNode] = parser.get_nodes_from_documents(llama_docs)
+            nodes = self._chunk(llama_docs, filename)
 
             # --- Enrich metadata & save document record ---
             document.hash = content_hash
-            if document.doc_metadata is None:
-                document.doc_metadata = {}
-            document.doc_metadata.update({
-                "filename": Path(document.path).name,
-                "page_count": llama_docs[0].metadata.get("page_count", 0),
-                "ingested_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-            })
+            document.doc_metadata.update(self._document_metadata(llama_docs, nodes, timings))
+            document.doc_metadata["filename"] = filename
 
             self.session.add(document)
-            self.session.commit()
-            self.session.refresh(document)
+            self.session.flush()
 
             # Attach document_id to every node so we can delete by document later
-            for node in nodes:
-                node.metadata["document_id"] = str(document.id)
-                node.metadata.setdefault("filename", Path(document.path).name)
+            self._save_chunks(document.id, nodes)
+
+            self.session.commit()
+            self.session.refresh(document)
 
             logger.info(
-                f"Ingested '{Path(document.path).name}': "
+                f"Ingested '{filename}': "
                 f"{len(llama_docs)} pages → {len(nodes)} chunks."
             )
             return nodes
 
+        except IntegrityError:
+            self.session.rollback()
+            raise
         except Exception as e:
             self.session.rollback()
             raise ServiceException(f"Failed to ingest document: {str(e)}") from e
 
+    def rechunk(self, document_id: int, llama_docs: List[LlamaDocument]) -> List[TextNode]:
+        """
+        Re-chunk a registered document from its converted content (the bulk
+        pipeline resuming a job interrupted before its vectors were stored).
+
+        Chunk ids are deterministic, so the nodes get the ids recorded at
+        registration; the chunk table is rewritten anyway in case the
+        chunker settings changed in between.
+        """
+        try:
+            document = self.session.get(Document, document_id)
+            if not document:
+                raise ResourceNotFoundException(f"Document with ID {document_id} not found.")
+            if not llama_docs:
+                raise ServiceException(f"Docling returned no content for '{document.path}'.")
+
+            filename = document.doc_metadata.get("filename") or Path(document.path).name
+            nodes = self._chunk(llama_docs, filename)
+            self.session.exec(delete(DocumentChunk).where(DocumentChunk.document_id == document_id))
+            self._save_chunks(document_id, nodes)
+            self.session.commit()
+            return nodes
+
+        except ServiceException:
+            self.session.rollback()
+            raise
+        except Exception as e:
+            self.session.rollback()
+            raise ServiceException(f"Failed to re-chunk document: {str(e)}") from e
+
+    def prepare_update(
+        self,
+        document_id: int,
+        path: str,
+        llama_docs: List[LlamaDocument],
+        content_hash: str,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Tuple[List[TextNode], Optional[List[str]], int]:
+        """
+        Diff a new version of a document against its stored chunks.
+
+        The new content is chunked exactly as on first ingestion and each
+        chunk is matched to the stored ones by content hash. The document
+        record and its chunk table are updated in the session but NOT
+        committed: the caller applies the vector store changes first and
+        then commits (or rolls back).
+
+        Returns:
+            (added, removed, unchanged) — nodes to embed and insert, node ids
+            to delete (None if the document predates chunk tracking and all
+            of its old nodes must be replaced), and the number of chunks kept.
+        """
+        document = self.session.get(Document, document_id)
+        if not document:
+            raise ResourceNotFoundException(f"Document with ID {document_id} not found.")
+        if not llama_docs:
+            raise ServiceException(f"Docling returned no content for '{path}'.")
+
+        filename = document.doc_metadata.get("filename") or Path(document.path).name
+        nodes = self._chunk(llama_docs, filename)
+
+        old_ids = set(
+            self.session.exec(
+                select(DocumentChunk.node_id).where(DocumentChunk.document_id == document_id)
+            ).all()
+        )
+        self.session.exec(delete(DocumentChunk).where(DocumentChunk.document_id == document_id))
+        self._save_chunks(document_id, nodes)
+
+        new_ids = {node.id_ for node in nodes}
+        added = [node for node in nodes if node.id_ not in old_ids]
+        removed = sorted(old_ids - new_ids) if old_ids else None
+        unchanged = len(nodes) - len(added)
+
+        document.path = path
+        document.hash = content_hash
+        metadata = self._document_metadata(llama_docs, nodes, timings)
+        metadata["updated_at"] = metadata.pop("ingested_at")
+        document.doc_metadata = {**document.doc_metadata, **metadata}
+        self.session.add(document)
+
+        logger.info(
+            f"Update of '{filename}': {len(added)} new, "
+            f"{'all' if removed is None else len(removed)} removed, "
+            f"{unchanged} unchanged chunks."
+        )
+        return added, removed, unchanged
+
+    def _chunk(self, llama_docs: List[LlamaDocument], filename: str) -> List[TextNode]:
+        for doc in llama_docs:
+            doc.metadata["filename"] = filename
+            # The storage path changes with every version of the file, so it
+            # must not leak into what is embedded or hashed.
+            doc.metadata.pop("source", None)
+        parser = MarkdownNodeParser()
+        nodes: List[TextNode] = parser.get_nodes_from_documents(llama_docs)
+        # Bound every section to the embedding window; adds section metadata.
+        return (self._chunker or get_chunker()).split(nodes)
+
+    @staticmethod
+    def _document_metadata(
+        llama_docs: List[LlamaDocument],
+        nodes: List[TextNode],
+        timings: Optional[Dict[str, float]],
+    ) -> Dict:
+        metadata = {
+            "page_count": llama_docs[0].metadata.get("page_count", 0),
+            "sections": extract_section_headings(nodes),
+            "ingested_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        if timings:
+            metadata["timings"] = timings
+        return metadata
+
+    def _save_chunks(self, document_id: int, nodes: List[TextNode]) -> None:
+        """Tag nodes with their document, give them stable ids and record hashes."""
+        hashes = tag_chunks(document_id, nodes)
+        for position, (node, h) in enumerate(zip(nodes, hashes)):
+            self.session.add(
+                DocumentChunk(
+                    document_id=document_id,
+                    node_id=node.id_,
+                    content_hash=h,
+                    position=position,
+                )
+            )
+
     def list_documents(self):
         """Returns a list of all ingested documents."""
         statement = select(Document)
@@ -107,15 +345,15 @@ class DocumentService:
             raise ServiceException(f"Document with ID {doc_id} not found.")
 
         filename = doc.doc_metadata.get("filename")
+        file_path = Path(doc.path)
 
         # Delete from DB
+        self.session.exec(delete(DocumentChunk).where(DocumentChunk.document_id == doc_id))
         self.session.delete(doc)
         self.session.commit()
 
-        # Delete from file system
-        if filename:
-            file_path = DOCUMENTS_DIR / filename
-            if file_path.exists():
-                os.remove(file_path)
+        # Delete from file system (content-addressed, so never shared)
+        if file_path.exists():
+            os.remove(file_path)
 
         return filename
@@ -0,0 +1,61 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Tuple
+
+from src.config.settings import DOCUMENTS_DIR, INGEST_STAGING_DIR
+
+# Large buffers: uploads are read and hashed in 1 MiB slices.
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def spool_upload(
+    file_stream: BinaryIO, suffix: str = ".part", spool_dir: Path = INGEST_STAGING_DIR
+) -> Tuple[Path, str, int]:
+    """
+    Copy an upload to a temporary file, hashing it on the way through.
+
+    Pass the original extension as `suffix` if the spooled file will be
+    parsed in place (Docling detects the format from it).
+
+    Returns:
+        (temp_path, sha256 hex digest, size in bytes). The caller owns the
+        temp file and must either commit it to the store or delete it.
+    """
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=spool_dir, suffix=suffix)
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: file_stream.read(COPY_BUFFER_SIZE), b""):
+                h.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return Path(tmp_name), h.hexdigest(), size
+
+
+def content_path(content_hash: str, filename: str) -> Path:
+    """
+    Content-addressed location of a document: documents/<h[:2]>/<hash><ext>.
+
+    The original extension is kept because Docling picks its input format
+    from it; the original filename lives in the Document metadata.
+    """
+    suffix = Path(filename).suffix.lower()
+    return DOCUMENTS_DIR / content_hash[:2] / f"{content_hash}{suffix}"
+
+
+def commit_to_store(tmp_path: Path, content_hash: str, filename: str) -> Path:
+    """Move a spooled file to its content-addressed path (no-op if present)."""
+    target = content_path(content_hash, filename)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.exists():
+        tmp_path.unlink(missing_ok=True)
+    else:
+        os.replace(tmp_path, target)
+    return target
@@ -1,8 +1,116 @@
-from sqlmodel import create_engine, Session
-from src.config.settings import DATABASE_URL
+import logging
+from typing import AsyncIterator, Iterator
 
-engine = create_engine(DATABASE_URL, echo=False)
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlmodel import create_engine, Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config.settings import (
+    ASYNC_DATABASE_URL,
+    DATABASE_URL,
+    DB_BUSY_TIMEOUT_MS,
+    DB_CACHE_SIZE_KB,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Per-connection SQLite settings for a concurrently used database."""
+    cursor = dbapi_connection.cursor()
+    # WAL is persistent in the file; the other pragmas are per connection.
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # Safe with WAL: a crash can lose the last commits, never corrupt the file.
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _tune(sync_engine: Engine) -> None:
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+
+
+# Sessions may be handed to executor threads (e.g. ingestion offloaded from
+# the event loop), so SQLite must not pin connections to their creating thread.
+engine = create_engine(
+    DATABASE_URL,
+    echo=False,
+    connect_args={
+        "check_same_thread": False,
+        "timeout": DB_BUSY_TIMEOUT_MS / 1000,
+    },
+    poolclass=QueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+)
+_tune(engine)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    connect_args={"timeout": DB_BUSY_TIMEOUT_MS / 1000},
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+)
+_tune(async_engine.sync_engine)
+
+
+def init_db() -> None:
+    """
+    Create missing tables, indexes and columns.
+
+    `create_all` only creates tables that do not exist yet, so indexes and
+    columns added to a model later are created here on databases from
+    earlier versions (new columns must therefore be Optional).
+    """
+    # Table models must be imported before the metadata can see them.
+    import src.conversation.schemas  # noqa: F401
+    import src.documents.schemas  # noqa: F401
+    import src.ingestion.schemas  # noqa: F401
+
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                # Added as nullable: existing rows have no value for it.
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(
+                    text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+                )
+                logger.info(f"Added column {table.name}.{column.name}.")
+            for index in table.indexes:
+                try:
+                    index.create(connection, checkfirst=True)
+                except IntegrityError as e:
+                    # Unique index over rows that already violate it.
+                    logger.error(f"Could not create index {index.name}, duplicate rows exist: {e}")
 
 
 def get_session() -> Session:
     return Session(engine)
+
+
+def get_request_session() -> Iterator[Session]:
+    """FastAPI dependency: one session per request, closed once it finishes."""
+    with Session(engine) as session:
+        yield session
+
+
+async def get_async_request_session() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency: async session for the non-blocking chat path."""
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,190 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import BaseNode, MetadataMode
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Unicode- and whitespace-insensitive form of a chunk, used for keys."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """
+    Disk-backed cache of document embeddings, shared by every ingestion path.
+
+    Vectors are stored as float32 blobs in SQLite, keyed on
+    (model name, sha256 of the normalized text), so boilerplate chunks that
+    repeat across the corpus, and re-ingestions after a delete, are only
+    embedded once per model. The table is bounded: once it grows past
+    `max_entries`, the least recently used tenth is evicted.
+    """
+
+    def __init__(self, db_path: Path, max_entries: int = 100_000) -> None:
+        """
+        Args:
+            db_path:     SQLite file holding the vectors.
+            max_entries: Max cached vectors across all models.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embedding_cache ("
+            " model TEXT NOT NULL, key TEXT NOT NULL, vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL, PRIMARY KEY (model, key))"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS ix_embedding_cache_last_used"
+            " ON embedding_cache (last_used)"
+        )
+        self._db.commit()
+        self._count = self._db.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors for `texts`, None where there is no entry."""
+        keys = [self.make_key(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit.
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embedding_cache"
+                    f" WHERE model = ? AND key IN ({placeholders})",
+                    (model, *chunk),
+                ).fetchall()
+                found.update((k, np.frombuffer(v, dtype=np.float32)) for k, v in rows)
+            if found:
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE embedding_cache SET last_used = ? WHERE model = ? AND key = ?",
+                    [(now, model, k) for k in found],
+                )
+                self._db.commit()
+
+            results = [found.get(k) for k in keys]
+            hits = sum(r is not None for r in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(
+        self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]
+    ) -> None:
+        now = time.time()
+        rows = [
+            (model, self.make_key(t), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO embedding_cache (model, key, vector, last_used)"
+                " VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._count += self._db.total_changes - before
+            if self._count > self.max_entries:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries down to 90% of capacity."""
+        excess = self._count - int(self.max_entries * 0.9)
+        self._db.execute(
+            "DELETE FROM embedding_cache WHERE rowid IN ("
+            " SELECT rowid FROM embedding_cache ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._count -= excess
+        self.evictions += excess
+        logger.info(f"Embedding cache: evicted {excess} least recently used vectors.")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def embed_nodes(
+    nodes: Sequence[BaseNode],
+    embed_model: BaseEmbedding,
+    cache: Optional[EmbeddingCache] = None,
+    embed_texts: Optional[Callable[[List[str]], List[List[float]]]] = None,
+) -> int:
+    """
+    Fill `node.embedding` for every node, embedding only cache misses.
+
+    LlamaIndex skips nodes that already carry an embedding, so calling this
+    before `VectorStoreIndex.insert_nodes` keeps cached chunks away from the
+    model entirely.
+
+    Args:
+        nodes:       Nodes to embed; ones that already have an embedding are left alone.
+        embed_model: Model whose name keys the cache.
+        cache:       Optional persistent cache.
+        embed_texts: Batch embedding function for the misses (e.g. an
+                     EmbeddingScheduler); defaults to the model's own batching.
+
+    Returns:
+        The number of texts that had to be embedded.
+    """
+    pending = [n for n in nodes if n.embedding is None]
+    if not pending:
+        return 0
+    embed_texts = embed_texts or embed_model.get_text_embedding_batch
+
+    texts = [n.get_content(metadata_mode=MetadataMode.EMBED) for n in pending]
+    if cache is not None:
+        vectors: List[Any] = cache.get_many(embed_model.model_name, texts)
+    else:
+        vectors = [None] * len(texts)
+
+    # Identical chunks within one batch are embedded once.
+    misses: Dict[str, List[int]] = {}
+    for i, vector in enumerate(vectors):
+        if vector is None:
+            misses.setdefault(EmbeddingCache.make_key(texts[i]), []).append(i)
+    if misses:
+        miss_texts = [texts[indices[0]] for indices in misses.values()]
+        computed = embed_texts(miss_texts)
+        if cache is not None:
+            cache.put_many(embed_model.model_name, miss_texts, computed)
+        for indices, vector in zip(misses.values(), computed):
+            for i in indices:
+                vectors[i] = vector
+
+    for node, vector in zip(pending, vectors):
+        node.embedding = vector.tolist() if isinstance(vector, np.ndarray) else list(vector)
+
+    logger.debug(f"Embedded {len(misses)} distinct texts for {len(pending)} chunks.")
+    return len(misses)
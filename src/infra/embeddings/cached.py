@@ -0,0 +1,142 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic import PrivateAttr
+
+from src.utils.batching import MicroBatcher
+from src.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Query-side accelerator wrapped around a LlamaIndex embedding model.
+
+    - Query embeddings are memoized in a bounded LRU keyed on
+      (model name, text), stored as compact float32 arrays (4 KB per
+      bge-large vector instead of ~32 KB as a Python float list).
+    - Cache misses from concurrent requests are merged by a MicroBatcher
+      into a single forward pass.
+
+    Document (text) embeddings pass straight through to the wrapped model;
+    ingestion has its own batching.
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _query_instruction: Optional[str] = PrivateAttr()
+    _cache: LRUCache[Tuple[str, str], np.ndarray] = PrivateAttr()
+    _batcher: Optional[MicroBatcher[str, List[float]]] = PrivateAttr()
+
+    def __init__(
+        self,
+        inner: BaseEmbedding,
+        cache_size: int = 4096,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Args:
+            inner:          The real embedding model (e.g. HuggingFaceEmbedding).
+            cache_size:     Max number of cached query vectors.
+            max_batch_size: Max queries merged into one forward pass.
+            max_wait_ms:    How long the first query of a batch waits for
+                            company. 0 disables micro-batching.
+        """
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs,
+        )
+        self._inner = inner
+        # A batch of queries is embedded as texts with the query instruction
+        # prepended, which needs both instructions to be known; otherwise
+        # each query goes through the model's own query path.
+        query_instruction = getattr(inner, "query_instruction", None)
+        self._query_instruction = (
+            query_instruction
+            if query_instruction is not None and not getattr(inner, "text_instruction", None)
+            else None
+        )
+        self._cache = LRUCache(maxsize=cache_size)
+        self._batcher = (
+            MicroBatcher(
+                self._embed_query_batch,
+                max_batch_size=max_batch_size,
+                max_wait_ms=max_wait_ms,
+                name="query-embed",
+            )
+            if max_wait_ms > 0
+            else None
+        )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def inner(self) -> BaseEmbedding:
+        return self._inner
+
+    # ------------------------------------------------------------------ #
+    #  Query embeddings (cached + micro-batched)                           #
+    # ------------------------------------------------------------------ #
+
+    def _embed_query_batch(self, queries: List[str]) -> List[List[float]]:
+        if self._query_instruction is None:
+            return [self._inner.get_query_embedding(q) for q in queries]
+        return self._inner.get_text_embedding_batch(
+            [f"{self._query_instruction}{q}" for q in queries]
+        )
+
+    def _cache_key(self, query: str) -> Tuple[str, str]:
+        return (self.model_name, query)
+
+    def _remember(self, query: str, embedding: List[float]) -> List[float]:
+        self._cache.put(self._cache_key(query), np.asarray(embedding, dtype=np.float32))
+        return embedding
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        cached = self._cache.get(self._cache_key(query))
+        if cached is not None:
+            return cached.tolist()
+
+        if self._batcher is not None:
+            embedding = self._batcher(query)
+        else:
+            embedding = self._embed_query_batch([query])[0]
+        return self._remember(query, embedding)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        cached = self._cache.get(self._cache_key(query))
+        if cached is not None:
+            return cached.tolist()
+
+        if self._batcher is not None:
+            embedding = await asyncio.wrap_future(self._batcher.submit(query))
+        else:
+            embedding = await self._inner.aget_query_embedding(query)
+        return self._remember(query, embedding)
+
+    # ------------------------------------------------------------------ #
+    #  Text embeddings (pass-through)                                      #
+    # ------------------------------------------------------------------ #
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._inner.get_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._inner.get_text_embedding_batch(texts)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return await self._inner.aget_text_embedding(text)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._cache.stats()
+        if self._batcher is not None:
+            stats["batching"] = self._batcher.stats()
+        return stats
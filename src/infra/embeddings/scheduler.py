@@ -0,0 +1,177 @@
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+from src.utils.tokens import count_tokens_batch, get_tokenizer
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingScheduler:
+    """
+    Length-aware batching for document embeddings.
+
+    A transformer batch costs roughly (batch size × longest member) tokens,
+    because every sequence is padded to the longest one. Feeding chunks in
+    arrival order in fixed batches of 32 therefore pays for the longest
+    chunk 32 times over. The scheduler instead:
+
+      1. counts tokens for every text (capped at the model's max length);
+      2. sorts texts by length, so each batch holds similar-sized chunks;
+      3. grows each batch until its padded size would exceed a token budget
+         (many short chunks per batch, few long ones);
+      4. embeds batch by batch and restores the original order.
+    """
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        max_tokens_per_batch: int = 8192,
+        max_batch_size: int = 128,
+    ) -> None:
+        """
+        Args:
+            embed_model:          The model to drive. HuggingFaceEmbedding
+                                  (optionally inside CachedEmbedding) gets a
+                                  direct sentence-transformers path.
+            max_tokens_per_batch: Padded-token budget of one forward pass.
+            max_batch_size:       Hard cap on texts per forward pass.
+        """
+        self.embed_model = embed_model
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.max_batch_size = max_batch_size
+
+        inner = getattr(embed_model, "inner", embed_model)
+        self._st_model = getattr(inner, "_model", None)
+        if not callable(getattr(self._st_model, "encode", None)):
+            self._st_model = None
+        self._normalize = getattr(inner, "normalize", True)
+
+        self.max_seq_length = getattr(self._st_model, "max_seq_length", None) or 512
+        self._tokenizer = getattr(self._st_model, "tokenizer", None) or get_tokenizer(
+            embed_model.model_name
+        )
+
+    # ------------------------------------------------------------------ #
+    #  Planning                                                            #
+    # ------------------------------------------------------------------ #
+
+    def token_lengths(self, texts: Sequence[str]) -> List[int]:
+        """Model-side token count of each text, including [CLS]/[SEP]."""
+        return [
+            min(n + 2, self.max_seq_length)
+            for n in count_tokens_batch(texts, self._tokenizer)
+        ]
+
+    def plan(self, lengths: Sequence[int]) -> List[List[int]]:
+        """
+        Group text indices into batches that fit the token budget.
+
+        Returns:
+            Batches of indices into the input, longest texts first.
+        """
+        order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+        batches: List[List[int]] = []
+        batch: List[int] = []
+        longest = 0
+        for i in order:
+            # Sorted descending: the first member sets the padded length.
+            padded = max(longest, lengths[i]) * (len(batch) + 1)
+            if batch and (
+                padded > self.max_tokens_per_batch or len(batch) >= self.max_batch_size
+            ):
+                batches.append(batch)
+                batch, longest = [], 0
+            batch.append(i)
+            longest = max(longest, lengths[i])
+        if batch:
+            batches.append(batch)
+        return batches
+
+    # ------------------------------------------------------------------ #
+    #  Embedding                                                           #
+    # ------------------------------------------------------------------ #
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        if self._st_model is not None:
+            # One forward pass for the whole planned batch; going through
+            # LlamaIndex would re-split it by `embed_batch_size`.
+            vectors = self._st_model.encode(
+                texts,
+                batch_size=len(texts),
+                prompt_name="text",
+                normalize_embeddings=self._normalize,
+                show_progress_bar=False,
+            )
+            return vectors.tolist()
+        return self.embed_model._get_text_embeddings(texts)
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embed `texts` in token-budgeted batches; output order matches input."""
+        if not texts:
+            return []
+        lengths = self.token_lengths(texts)
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        for batch in self.plan(lengths):
+            vectors = self._encode([texts[i] for i in batch])
+            for i, vector in zip(batch, vectors):
+                results[i] = vector
+        return results  # type: ignore[return-value]
+
+    # ------------------------------------------------------------------ #
+    #  Benchmark                                                           #
+    # ------------------------------------------------------------------ #
+
+    def benchmark(self, texts: Sequence[str], baseline: bool = True) -> Dict[str, Any]:
+        """
+        Time the scheduler (and optionally the fixed-size baseline) on `texts`.
+
+        Returns:
+            Chunks/sec and tokens/sec for each strategy, plus the padding
+            overhead (padded tokens / real tokens) of each.
+        """
+        texts = list(texts)
+        lengths = self.token_lengths(texts)
+        real_tokens = sum(lengths)
+
+        def _run(label: str, fn: Callable[[], Any], padded: int) -> Dict[str, Any]:
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            return {
+                "strategy": label,
+                "seconds": round(elapsed, 3),
+                "chunks_per_sec": round(len(texts) / elapsed, 1),
+                "tokens_per_sec": round(real_tokens / elapsed, 1),
+                "padding_overhead": round(padded / real_tokens, 3) if real_tokens else 0.0,
+            }
+
+        # Warm-up pass so model loading and kernel selection are not timed.
+        self._encode(texts[:2])
+
+        plan = self.plan(lengths)
+        results = [
+            _run(
+                f"token_budget({self.max_tokens_per_batch})",
+                lambda: self.embed(texts),
+                sum(max(lengths[i] for i in b) * len(b) for b in plan),
+            )
+        ]
+        if baseline:
+            size = self.embed_model.embed_batch_size
+            fixed = [lengths[i:i + size] for i in range(0, len(lengths), size)]
+            results.append(
+                _run(
+                    f"fixed_batch({size})",
+                    lambda: self.embed_model.get_text_embedding_batch(texts),
+                    sum(max(b) * len(b) for b in fixed),
+                )
+            )
+        return {
+            "model": self.embed_model.model_name,
+            "chunks": len(texts),
+            "tokens": real_tokens,
+            "results": results,
+        }
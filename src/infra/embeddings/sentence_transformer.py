@@ -1,9 +1,9 @@
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 
-from src.config.settings import DEVICE, EMBEDDING_MODEL
+from src.config.settings import DEVICE, EMBEDDING_MODEL, EMBEDDING_QUERY_INSTRUCTION
 
 
-def get_embedding_model() -> HuggingFaceEmbedding:
+def get_embedding_model(device: str = DEVICE) -> HuggingFaceEmbedding:
     """
     Returns a LlamaIndex HuggingFaceEmbedding using the model defined in settings.
 
@@ -12,9 +12,16 @@ def get_embedding_model() -> HuggingFaceEmbedding:
       - Top MTEB performance for retrieval tasks
       - Strong on scientific and technical text
       - No trust_remote_code required
+
+    `embed_batch_size` only governs query-side and fallback batching; bulk
+    document embedding is batched by token budget (see EmbeddingScheduler).
+    The instructions are set explicitly so CachedEmbedding can batch queries
+    through the public text-embedding API.
     """
     return HuggingFaceEmbedding(
         model_name=EMBEDDING_MODEL,
         embed_batch_size=32,
-        device=DEVICE,
+        device=device,
+        query_instruction=EMBEDDING_QUERY_INSTRUCTION,
+        text_instruction="",
     )
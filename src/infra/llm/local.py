@@ -1,34 +1,200 @@
-from typing import Dict, List, Optional
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_ollama import ChatOllama
 
+logger = logging.getLogger(__name__)
+
+RAG_SYSTEM_TEMPLATE = (
+    "You are an expert research assistant dedicated to providing accurate, verified information.\n\n"
+    "STRICT GUIDELINES:\n"
+    "1. **Context Priority**: Answer strictly based on the 'Context' provided below if possible.\n"
+    "2. **Verification & Labeling**:\n"
+    "   - Never present generated/inferred content as fact.\n"
+    "   - If information is not in the context and you use general knowledge, you MUST label it.\n"
+    "   - Start sentences with **[Inference]**, **[Speculation]**, or **[Unverified]** if the content is not directly supported by the context.\n"
+    "   - If you cannot verify something, say: 'I cannot verify this' or 'My knowledge base does not contain that'.\n"
+    "3. **Tone & Style**:\n"
+    "   - Maintain a professional, objective, academic tone.\n"
+    "   - Do not paraphrase or reinterpret user input unless requested.\n"
+    "   - **CRITICAL**: All mathematical formulas, equations, and symbols MUST be written in LaTeX format (e.g., $E=mc^2$).\n"
+    "4. **Forbidden Absolutes**: Unless sourced from context, label claims using words like 'Prevent', 'Guarantee', 'Fixes', 'Eliminates', 'Ensures'.\n"
+    "5. **Correction Protocol**: If you realize a previous mistake, say: 'Correction: I previously made an unverified claim...'.\n\n"
+    "Context:\n{context}"
+)
+
 
 class OllamaLLM:
+    """
+    Long-lived Ollama client, shared by every request.
+
+    - ChatOllama clients (each holding its own pooled HTTP connection) are
+      created once per (temperature, max_tokens) and reused; the RAG chain
+      is built once per temperature.
+    - Every generation request asks Ollama to keep the model loaded for
+      `keep_alive`, and `warm_up` loads it before the first chat.
+    - Tags / availability go through one pooled `requests.Session`, and the
+      result is cached for `health_ttl_seconds`; `start_health_monitor`
+      refreshes it in the background so `is_available` never blocks.
+    """
+
     def __init__(
-        self, model: str = "llama3.2", base_url: str = "http://localhost:11434"
+        self,
+        model: str = "llama3.2",
+        base_url: str = "http://localhost:11434",
+        keep_alive: Optional[str] = "30m",
+        health_ttl_seconds: float = 15.0,
     ):
+        """
+        Args:
+            model:              Ollama model name.
+            base_url:           Ollama server URL.
+            keep_alive:         How long Ollama keeps the model loaded after
+                                a request ("30m", "-1" for ever, None for
+                                the server default).
+            health_ttl_seconds: Age after which a cached health status is
+                                refreshed.
+        """
         self.model = model
         self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.health_ttl_seconds = health_ttl_seconds
 
-    def is_available(self) -> bool:
-        # LangChain doesn't have a native "ping" method, so we keep this lightweight check
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=8)
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[float, Optional[int]], ChatOllama] = {}
+        self._chains: Dict[float, Any] = {}
+        self._health: Dict[str, Any] = {"available": False, "models": [], "checked_at": None}
+        self._monitor_stop = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------ #
+    #  Health                                                              #
+    # ------------------------------------------------------------------ #
+
+    def refresh_health(self) -> Dict[str, Any]:
+        """Query /api/tags now and update the cached status."""
+        start = time.perf_counter()
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=2)
-            return response.status_code == 200
-        except requests.RequestException:
-            return False
+            response = self._http.get(f"{self.base_url}/api/tags", timeout=2)
+            response.raise_for_status()
+            models = [model["name"] for model in response.json().get("models", [])]
+            available = True
+        except (requests.RequestException, ValueError):
+            models, available = [], False
+        health = {
+            "available": available,
+            "models": models,
+            "model_installed": self.model in models,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "checked_at": time.monotonic(),
+        }
+        with self._lock:
+            self._health = health
+        return health
+
+    def health(self) -> Dict[str, Any]:
+        """Cached health status, refreshed inline only when stale."""
+        with self._lock:
+            health = self._health
+        checked_at = health["checked_at"]
+        if checked_at is None or time.monotonic() - checked_at > self.health_ttl_seconds:
+            health = self.refresh_health()
+        return health
+
+    def is_available(self) -> bool:
+        return self.health()["available"]
 
     def list_models(self) -> List[str]:
+        return list(self.health()["models"])
+
+    def start_health_monitor(self, interval_seconds: Optional[float] = None) -> None:
+        """Refresh the health status every `interval_seconds` in a daemon thread."""
+        if self._monitor is not None:
+            return
+        interval = interval_seconds or max(1.0, self.health_ttl_seconds / 2)
+
+        def _run() -> None:
+            while not self._monitor_stop.wait(interval):
+                self.refresh_health()
+
+        self._monitor_stop.clear()
+        self._monitor = threading.Thread(target=_run, name="ollama-health", daemon=True)
+        self._monitor.start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            health = dict(self._health)
+            clients, chains = len(self._clients), len(self._chains)
+        health.pop("models", None)
+        health.pop("checked_at", None)
+        return {**health, "clients": clients, "chains": chains}
+
+    # ------------------------------------------------------------------ #
+    #  Warm-up / lifecycle                                                 #
+    # ------------------------------------------------------------------ #
+
+    def warm_up(self, temperature: float = 0.1, timeout: float = 300.0) -> bool:
+        """
+        Load the model into Ollama memory (an empty generate request) and
+        prebuild the RAG chain for `temperature`.
+
+        Returns:
+            True if Ollama loaded the model.
+        """
+        self._context_chain(temperature)
+        payload: Dict[str, Any] = {"model": self.model, "prompt": ""}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        start = time.perf_counter()
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=2)
+            response = self._http.post(
+                f"{self.base_url}/api/generate", json=payload, timeout=timeout
+            )
             response.raise_for_status()
-            models = response.json().get("models", [])
-            return [model["name"] for model in models]
-        except requests.RequestException:
-            return []
+        except requests.RequestException as e:
+            logger.warning(f"Could not warm up Ollama model '{self.model}': {e}")
+            return False
+        logger.info(f"Ollama model '{self.model}' loaded in {time.perf_counter() - start:.1f}s.")
+        self.refresh_health()
+        return True
+
+    def close(self) -> None:
+        self._monitor_stop.set()
+        self._monitor = None
+        self._http.close()
+
+    # ------------------------------------------------------------------ #
+    #  Generation                                                          #
+    # ------------------------------------------------------------------ #
+
+    def _client(self, temperature: float, max_tokens: Optional[int] = None) -> ChatOllama:
+        """Shared ChatOllama for these sampling settings (kept open between calls)."""
+        key = (temperature, max_tokens)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = ChatOllama(
+                        model=self.model,
+                        base_url=self.base_url,
+                        temperature=temperature,
+                        num_predict=max_tokens,
+                        keep_alive=self.keep_alive,
+                    )
+                    self._clients[key] = client
+        return client
 
     def generate(
         self,
@@ -36,20 +202,34 @@ class OllamaLLM:
         temperature: float = 0.7,
         max_tokens: Optional[int] = None,
     ) -> str:
-        # 1. Initialize LangChain's ChatOllama client
-        chat_llm = ChatOllama(
-            model=self.model,
-            base_url=self.base_url,
-            temperature=temperature,
-            num_predict=max_tokens,
-        )
-
-        # 2. LangChain natively accepts standard dictionary message lists!
-        response = chat_llm.invoke(messages)
-
-        # 3. Return the string content from the AIMessage object
+        # LangChain natively accepts standard dictionary message lists.
+        response = self._client(temperature, max_tokens).invoke(messages)
+        return str(response.content)
+
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        """Non-blocking `generate` using ChatOllama's native `ainvoke`."""
+        response = await self._client(temperature, max_tokens).ainvoke(messages)
         return str(response.content)
 
+    def _context_chain(self, temperature: float):
+        """LCEL pipeline: system prompt + history + query -> ChatOllama -> str (built once)."""
+        chain = self._chains.get(temperature)
+        if chain is None:
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", RAG_SYSTEM_TEMPLATE),
+                MessagesPlaceholder(variable_name="chat_history"),
+                ("user", "{query}"),
+            ])
+            chain = prompt | self._client(temperature) | StrOutputParser()
+            with self._lock:
+                chain = self._chains.setdefault(temperature, chain)
+        return chain
+
     def generate_with_context(
         self,
         query: str,
@@ -57,44 +237,41 @@ class OllamaLLM:
         conversation_history: List[Dict[str, str]] | None = None,
         temperature: float = 0.7,
     ) -> str:
+        return self._context_chain(temperature).invoke({
+            "context": context,
+            "chat_history": conversation_history or [],
+            "query": query,
+        })
 
-        chat_llm = ChatOllama(
-            model=self.model,
-            base_url=self.base_url,
-            temperature=temperature,
-        )
-
-        system_template = (
-            "You are an expert research assistant dedicated to providing accurate, verified information.\n\n"
-            "STRICT GUIDELINES:\n"
-            "1. **Context Priority**: Answer strictly based on the 'Context' provided below if possible.\n"
-            "2. **Verification & Labeling**:\n"
-            "   - Never present generated/inferred content as fact.\n"
-            "   - If information is not in the context and you use general knowledge, you MUST label it.\n"
-            "   - Start sentences with **[Inference]**, **[Speculation]**, or **[Unverified]** if the content is not directly supported by the context.\n"
-            "   - If you cannot verify something, say: 'I cannot verify this' or 'My knowledge base does not contain that'.\n"
-            "3. **Tone & Style**:\n"
-            "   - Maintain a professional, objective, academic tone.\n"
-            "   - Do not paraphrase or reinterpret user input unless requested.\n"
-            "   - **CRITICAL**: All mathematical formulas, equations, and symbols MUST be written in LaTeX format (e.g., $E=mc^2$).\n"
-            "4. **Forbidden Absolutes**: Unless sourced from context, label claims using words like 'Prevent', 'Guarantee', 'Fixes', 'Eliminates', 'Ensures'.\n"
-            "5. **Correction Protocol**: If you realize a previous mistake, say: 'Correction: I previously made an unverified claim...'.\n\n"
-            "Context:\n{context}"
-        )
-
-        # Build the prompt using LangChain's template engine
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_template),
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("user", "{query}"),
-        ])
-
-        # Create an LCEL (LangChain Expression Language) pipeline
-        chain = prompt | chat_llm | StrOutputParser()
-
-        # Execute the chain
-        return chain.invoke({
+    async def agenerate_with_context(
+        self,
+        query: str,
+        context: str,
+        conversation_history: List[Dict[str, str]] | None = None,
+        temperature: float = 0.7,
+    ) -> str:
+        """Non-blocking `generate_with_context` using the chain's `ainvoke`."""
+        return await self._context_chain(temperature).ainvoke({
             "context": context,
             "chat_history": conversation_history or [],
             "query": query,
         })
+
+    async def astream_with_context(
+        self,
+        query: str,
+        context: str,
+        conversation_history: List[Dict[str, str]] | None = None,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[str]:
+        """
+        Same prompt as `generate_with_context`, but yields text chunks as
+        Ollama produces them instead of waiting for the full answer.
+        """
+        async for chunk in self._context_chain(temperature).astream({
+            "context": context,
+            "chat_history": conversation_history or [],
+            "query": query,
+        }):
+            if chunk:
+                yield chunk
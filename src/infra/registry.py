@@ -0,0 +1,497 @@
+import gc
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config.settings import LLM_MODEL_NAME
+from src.infra.db.session import async_engine, engine, init_db
+
+logger = logging.getLogger(__name__)
+
+
+def _current_rss_mb() -> float:
+    """Resident set size of this process in MiB (best effort, 0.0 if unknown)."""
+    try:
+        import psutil  # optional
+
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+
+        # ru_maxrss is the *peak* RSS: KiB on Linux, bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+    except (ImportError, AttributeError):
+        return 0.0
+
+
+class ServiceRegistry:
+    """
+    Process-wide registry of heavyweight, shareable components.
+
+    Embedding models, the cross-encoder reranker, the vector store and the
+    Ollama client are expensive to build (seconds, and hundreds of MB each)
+    but safe to share across requests. The registry builds each of them
+    lazily, exactly once per process, and records how long the load took and
+    how much resident memory it added.
+
+    Per-request objects (DB sessions, DocumentService, ConversationManager,
+    OrchestratorService) stay cheap and are assembled on demand around the
+    shared singletons via `build_orchestrator`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._instances: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    # ------------------------------------------------------------------ #
+    #  Singleton plumbing                                                  #
+    # ------------------------------------------------------------------ #
+
+    def _get_or_create(self, name: str, factory: Callable[[], Any]) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        # RLock: factories may resolve their own dependencies re-entrantly.
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                rss_before = _current_rss_mb()
+                start = time.perf_counter()
+                instance = factory()
+                elapsed = time.perf_counter() - start
+                self._stats[name] = {
+                    "load_seconds": round(elapsed, 3),
+                    "rss_delta_mb": round(_current_rss_mb() - rss_before, 1),
+                }
+                self._instances[name] = instance
+                logger.info(f"Loaded '{name}' in {elapsed:.2f}s.")
+        return instance
+
+    # ------------------------------------------------------------------ #
+    #  Shared components                                                   #
+    # ------------------------------------------------------------------ #
+
+    def embedding_model(self):
+        def _build():
+            from src.config.settings import (
+                QUERY_EMBED_CACHE_SIZE,
+                QUERY_EMBED_MAX_BATCH,
+                QUERY_EMBED_MAX_WAIT_MS,
+            )
+            from src.infra.embeddings.cached import CachedEmbedding
+            from src.infra.embeddings.sentence_transformer import get_embedding_model
+
+            return CachedEmbedding(
+                get_embedding_model(),
+                cache_size=QUERY_EMBED_CACHE_SIZE,
+                max_batch_size=QUERY_EMBED_MAX_BATCH,
+                max_wait_ms=QUERY_EMBED_MAX_WAIT_MS,
+            )
+
+        return self._get_or_create("embedding_model", _build)
+
+    def embedding_cache(self):
+        from src.config.settings import EMBEDDING_CACHE_DB, EMBEDDING_CACHE_MAX_ENTRIES
+
+        if EMBEDDING_CACHE_DB is None:
+            return None
+
+        def _build():
+            from src.infra.embeddings.cache import EmbeddingCache
+
+            return EmbeddingCache(EMBEDDING_CACHE_DB, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+
+        return self._get_or_create("embedding_cache", _build)
+
+    def embed_scheduler(self):
+        def _build():
+            from src.config.settings import EMBED_MAX_BATCH, EMBED_TOKEN_BUDGET
+            from src.infra.embeddings.scheduler import EmbeddingScheduler
+
+            return EmbeddingScheduler(
+                self.embedding_model(),
+                max_tokens_per_batch=EMBED_TOKEN_BUDGET,
+                max_batch_size=EMBED_MAX_BATCH,
+            )
+
+        return self._get_or_create("embed_scheduler", _build)
+
+    def chroma_client(self):
+        def _build():
+            import chromadb
+
+            from src.infra.vectorstore.chroma import CHROMA_DB_PATH
+
+            CHROMA_DB_PATH.mkdir(parents=True, exist_ok=True)
+            return chromadb.PersistentClient(path=str(CHROMA_DB_PATH))
+
+        return self._get_or_create("chroma_client", _build)
+
+    def vector_store(self):
+        def _build():
+            from src.config.settings import VECTOR_STORE_BACKEND
+
+            if VECTOR_STORE_BACKEND == "local":
+                from src.config.settings import (
+                    LOCAL_VECTOR_COARSE_DIM,
+                    LOCAL_VECTOR_DTYPE,
+                    LOCAL_VECTOR_INDEX,
+                    LOCAL_VECTOR_QUANTIZATION,
+                    LOCAL_VECTOR_RESCORE_FACTOR,
+                    LOCAL_VECTOR_STORE_DIR,
+                )
+                from src.infra.vectorstore.local import LocalVectorStore
+
+                return LocalVectorStore(
+                    LOCAL_VECTOR_STORE_DIR,
+                    embed_model=self.embedding_model(),
+                    embedding_cache=self.embedding_cache(),
+                    embed_scheduler=self.embed_scheduler(),
+                    dtype=LOCAL_VECTOR_DTYPE,
+                    index=LOCAL_VECTOR_INDEX,
+                    quantization=LOCAL_VECTOR_QUANTIZATION,
+                    rescore_factor=LOCAL_VECTOR_RESCORE_FACTOR,
+                    coarse_dim=LOCAL_VECTOR_COARSE_DIM,
+                )
+            if VECTOR_STORE_BACKEND != "chroma":
+                raise ValueError(f"Unknown VECTOR_STORE_BACKEND '{VECTOR_STORE_BACKEND}'.")
+
+            from src.infra.vectorstore.chroma import ChromaVectorStore
+
+            return ChromaVectorStore(
+                client=self.chroma_client(),
+                embed_model=self.embedding_model(),
+                embedding_cache=self.embedding_cache(),
+                embed_scheduler=self.embed_scheduler(),
+            )
+
+        return self._get_or_create("vector_store", _build)
+
+    def reranker(self):
+        def _build():
+            from src.config.settings import (
+                RERANK_MAX_BATCH,
+                RERANK_MAX_WAIT_MS,
+                RERANK_SCORE_CACHE_SIZE,
+                RERANKER_MODEL,
+            )
+            from src.retrieval.reranker import Reranker
+
+            return Reranker(
+                model_name=RERANKER_MODEL,
+                max_batch_size=RERANK_MAX_BATCH,
+                max_wait_ms=RERANK_MAX_WAIT_MS,
+                score_cache_size=RERANK_SCORE_CACHE_SIZE,
+            )
+
+        return self._get_or_create("reranker", _build)
+
+    def llm(self):
+        def _build():
+            from src.config.settings import (
+                OLLAMA_BASE_URL,
+                OLLAMA_HEALTH_TTL_SECONDS,
+                OLLAMA_KEEP_ALIVE,
+            )
+            from src.infra.llm import OllamaLLM
+
+            return OllamaLLM(
+                model=LLM_MODEL_NAME,
+                base_url=OLLAMA_BASE_URL,
+                keep_alive=OLLAMA_KEEP_ALIVE,
+                health_ttl_seconds=OLLAMA_HEALTH_TTL_SECONDS,
+            )
+
+        return self._get_or_create("llm", _build)
+
+    def conversation_memory(self):
+        def _build():
+            from src.config.settings import (
+                HISTORY_CACHE_SIZE,
+                HISTORY_MAX_MESSAGES,
+                HISTORY_SUMMARY_MAX_TOKENS,
+                HISTORY_TOKEN_BUDGET,
+            )
+            from src.conversation.memory import ConversationMemory
+
+            return ConversationMemory(
+                self.llm(),
+                token_budget=HISTORY_TOKEN_BUDGET,
+                summary_max_tokens=HISTORY_SUMMARY_MAX_TOKENS,
+                max_messages=HISTORY_MAX_MESSAGES,
+                cache_size=HISTORY_CACHE_SIZE,
+            )
+
+        return self._get_or_create("conversation_memory", _build)
+
+    def catalog(self):
+        from src.documents.catalog import DocumentCatalog
+
+        return self._get_or_create("catalog", DocumentCatalog)
+
+    def analysis_cache(self):
+        def _build():
+            from src.config.settings import (
+                ANALYSIS_CACHE_DB,
+                ANALYSIS_CACHE_SIZE,
+                ANALYSIS_CACHE_TTL_SECONDS,
+            )
+            from src.retrieval.analysis_cache import QueryAnalysisCache
+
+            return QueryAnalysisCache(
+                maxsize=ANALYSIS_CACHE_SIZE,
+                ttl_seconds=ANALYSIS_CACHE_TTL_SECONDS,
+                db_path=ANALYSIS_CACHE_DB,
+            )
+
+        return self._get_or_create("analysis_cache", _build)
+
+    def answer_cache(self):
+        from src.config.settings import (
+            ANSWER_CACHE_DB,
+            ANSWER_CACHE_MAX_ENTRIES,
+            ANSWER_CACHE_THRESHOLD,
+            ANSWER_CACHE_TTL_SECONDS,
+        )
+
+        if ANSWER_CACHE_DB is None:
+            return None
+
+        def _build():
+            from src.orchestrator.answer_cache import SemanticAnswerCache
+
+            return SemanticAnswerCache(
+                ANSWER_CACHE_DB,
+                self.embedding_model(),
+                threshold=ANSWER_CACHE_THRESHOLD,
+                max_entries=ANSWER_CACHE_MAX_ENTRIES,
+                ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+            )
+
+        return self._get_or_create("answer_cache", _build)
+
+    def lexical_index(self):
+        from src.config.settings import BM25_INDEX_DIR, HYBRID_RETRIEVAL
+
+        if not HYBRID_RETRIEVAL:
+            return None
+
+        def _build():
+            from src.retrieval.bm25 import BM25Index
+
+            return BM25Index(BM25_INDEX_DIR)
+
+        return self._get_or_create("lexical_index", _build)
+
+    def metadata_index(self):
+        def _build():
+            from src.config.settings import METADATA_INDEX_DB
+            from src.retrieval.metadata_index import MetadataIndex
+
+            return MetadataIndex(METADATA_INDEX_DB)
+
+        return self._get_or_create("metadata_index", _build)
+
+    def context_packer(self):
+        def _build():
+            from src.config.settings import (
+                CONTEXT_COMPRESS_MIN_TOKENS,
+                CONTEXT_COMPRESSION,
+                CONTEXT_COMPRESSION_KEEP_RATIO,
+                CONTEXT_DEDUP_THRESHOLD,
+                CONTEXT_TOKEN_BUDGET,
+            )
+            from src.retrieval.context_packer import ContextPacker
+
+            return ContextPacker(
+                reranker=self.reranker() if CONTEXT_COMPRESSION else None,
+                token_budget=CONTEXT_TOKEN_BUDGET,
+                dedup_threshold=CONTEXT_DEDUP_THRESHOLD,
+                compress=CONTEXT_COMPRESSION,
+                keep_ratio=CONTEXT_COMPRESSION_KEEP_RATIO,
+                compress_min_tokens=CONTEXT_COMPRESS_MIN_TOKENS,
+            )
+
+        return self._get_or_create("context_packer", _build)
+
+    def retrieval_service(self):
+        def _build():
+            from src.retrieval.service import RetrievalService
+
+            lexical_index = self.lexical_index()
+            metadata_index = self.metadata_index()
+            service = RetrievalService(
+                self.llm(),
+                vector_store=self.vector_store(),
+                reranker=self.reranker(),
+                catalog=self.catalog(),
+                analysis_cache=self.analysis_cache(),
+                lexical_index=lexical_index,
+                metadata_index=metadata_index,
+            )
+            if len(metadata_index) == 0 or (
+                lexical_index is not None and len(lexical_index) == 0
+            ):
+                # First start with the side indexes on an existing corpus.
+                service.rebuild_indexes()
+            return service
+
+        return self._get_or_create("retrieval_service", _build)
+
+    def ingestion_pipeline(self):
+        def _build():
+            from src.config.settings import (
+                INGEST_EMBED_BATCH_NODES,
+                INGEST_PARSE_WORKERS,
+                INGEST_QUEUE_SIZE,
+            )
+            from src.ingestion.pipeline import BulkIngestionPipeline
+
+            pipeline = BulkIngestionPipeline(
+                self.retrieval_service(),
+                parse_workers=INGEST_PARSE_WORKERS,
+                queue_size=INGEST_QUEUE_SIZE,
+                embed_batch_nodes=INGEST_EMBED_BATCH_NODES,
+            )
+            pipeline.start()
+            return pipeline
+
+        return self._get_or_create("ingestion_pipeline", _build)
+
+    # ------------------------------------------------------------------ #
+    #  Request-scoped objects                                              #
+    # ------------------------------------------------------------------ #
+
+    @contextmanager
+    def session_scope(self) -> Iterator[Session]:
+        """Yield a DB session that is closed when the unit of work ends."""
+        with Session(engine) as session:
+            yield session
+
+    @asynccontextmanager
+    async def async_session_scope(self) -> AsyncIterator[AsyncSession]:
+        """Async counterpart of `session_scope` for the non-blocking chat path."""
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    def build_orchestrator(
+        self, session: Session, async_session: Optional[AsyncSession] = None
+    ):
+        """Assemble an OrchestratorService around request-scoped sessions."""
+        from src.conversation.manager import (
+            AsyncConversationManager,
+            ConversationManager,
+        )
+        from src.documents.service import DocumentService
+        from src.orchestrator.service import OrchestratorService
+
+        memory = self.conversation_memory()
+        return OrchestratorService(
+            session=session,
+            doc_service=DocumentService(session),
+            conv_manager=ConversationManager(session, memory=memory),
+            retrieval_service=self.retrieval_service(),
+            llm=self.llm(),
+            aconv_manager=(
+                AsyncConversationManager(async_session, memory=memory)
+                if async_session is not None
+                else None
+            ),
+            answer_cache=self.answer_cache(),
+            context_packer=self.context_packer(),
+        )
+
+    # ------------------------------------------------------------------ #
+    #  Lifecycle                                                           #
+    # ------------------------------------------------------------------ #
+
+    def warm_up(self) -> None:
+        """
+        Create / migrate DB tables, eagerly load every shared component and
+        load the LLM into Ollama memory.
+        """
+        from src.config import settings
+
+        init_db()
+        self.retrieval_service()
+        llm = self.llm()
+        if settings.OLLAMA_WARM_UP and llm.is_available():
+            # Prebuilds the chain for the temperature the chat paths use.
+            llm.warm_up(temperature=getattr(settings, "TEMPERATURE", 0.1))
+        llm.start_health_monitor()
+        logger.info(f"Service registry warm: {self.stats()}")
+
+    def shutdown(self) -> None:
+        """Drop all shared components so their memory can be reclaimed."""
+        from src.utils.concurrency import shutdown_executor
+
+        shutdown_executor()
+        pipeline = self._instances.get("ingestion_pipeline")
+        if pipeline is not None:
+            pipeline.stop()
+        llm = self._instances.get("llm")
+        if llm is not None:
+            llm.close()
+        memory = self._instances.get("conversation_memory")
+        if memory is not None:
+            memory.shutdown()
+        vector_store = self._instances.get("vector_store")
+        if callable(getattr(vector_store, "close", None)):
+            # The local backend persists its HNSW graph on close.
+            vector_store.close()
+        with self._lock:
+            self._instances.clear()
+            self._stats.clear()
+        gc.collect()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of every loaded component that reports them."""
+        with self._lock:
+            instances = dict(self._instances)
+        return {
+            name: instance.stats()
+            for name, instance in instances.items()
+            if callable(getattr(instance, "stats", None))
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Load time and memory footprint of each loaded component."""
+        with self._lock:
+            components = {name: dict(s) for name, s in self._stats.items()}
+        return {
+            "components": components,
+            "rss_mb": round(_current_rss_mb(), 1),
+        }
+
+
+_registry: Optional[ServiceRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ServiceRegistry:
+    """Return the process-wide ServiceRegistry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ServiceRegistry()
+    return _registry
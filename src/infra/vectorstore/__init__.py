@@ -1,4 +1,5 @@
 from .base import BaseVectorStore
 from .chroma import ChromaVectorStore
+from .local import LocalVectorStore
 
-__all__ = ["BaseVectorStore", "ChromaVectorStore"]
+__all__ = ["BaseVectorStore", "ChromaVectorStore", "LocalVectorStore"]
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, TYPE_CHECKING
+from typing import Collection, Iterator, List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from llama_index.core.retrievers import BaseRetriever
@@ -35,6 +35,8 @@ class BaseVectorStore(ABC):
         self,
         similarity_top_k: int = 20,
         filters: Optional["MetadataFilters"] = None,
+        node_ids: Optional[Collection[str]] = None,
+        coarse_k: Optional[int] = None,
     ) -> "BaseRetriever":
         """
         Return a configured retriever for this backend.
@@ -42,6 +44,12 @@ class BaseVectorStore(ABC):
         Args:
             similarity_top_k: Number of candidate nodes to fetch before reranking.
             filters:          Optional LlamaIndex MetadataFilters for pre-filtering.
+            node_ids:         Optional pre-resolved id set; only these nodes
+                              are searched (takes precedence over `filters`).
+            coarse_k:         Optional first-stage candidate count for backends
+                              with a reduced-dimension pass; the candidates
+                              are rescored on full vectors down to
+                              `similarity_top_k`. Backends without one ignore it.
 
         Returns:
             A LlamaIndex BaseRetriever whose .retrieve(query) returns List[NodeWithScore].
@@ -56,3 +64,30 @@ class BaseVectorStore(ABC):
             document_id: The integer ID of the SQLModel Document record.
                          Nodes are matched via the 'document_id' metadata field.
         """
+
+    @abstractmethod
+    def delete_nodes(self, node_ids: List[str]) -> None:
+        """
+        Remove individual nodes by id.
+
+        Args:
+            node_ids: Ids of the nodes to delete. Unknown ids are ignored.
+        """
+
+    @abstractmethod
+    def get_nodes(self, node_ids: List[str]) -> List["BaseNode"]:
+        """
+        Fetch stored nodes by id.
+
+        Args:
+            node_ids: Ids to fetch.
+
+        Returns:
+            The nodes that exist, in the order of `node_ids`.
+        """
+
+    @abstractmethod
+    def iter_nodes(self, batch_size: int = 1000) -> Iterator[List["BaseNode"]]:
+        """
+        Iterate over every stored node in batches (e.g. to rebuild an index).
+        """
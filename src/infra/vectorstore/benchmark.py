@@ -0,0 +1,213 @@
+"""
+Recall / latency benchmark of compressed vector storage.
+
+    python -m src.infra.vectorstore.benchmark                       # vectors of the local store
+    python -m src.infra.vectorstore.benchmark --synthetic 200000 --dim 1024
+    python -m src.infra.vectorstore.benchmark --rescore 1 2 4 8 --output quant.json
+    python -m src.infra.vectorstore.benchmark --coarse-dim 128 256 --coarse-k 100 200 400
+
+Every mode is compared with exact float32 brute force over the same
+vectors: recall@k is the overlap of the top-k ids with the exact top-k.
+"""
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+from src.infra.vectorstore.projection import DimensionReducer
+from src.infra.vectorstore.quantization import ScalarQuantizer
+
+logger = logging.getLogger(__name__)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return (vectors / norms).astype(np.float32)
+
+
+def synthetic_vectors(
+    count: int, dim: int, clusters: int = 64, spread: float = 0.8, seed: int = 0
+) -> np.ndarray:
+    """Unit vectors drawn around random centroids (closer to real embeddings than pure noise)."""
+    rng = np.random.default_rng(seed)
+    centroids = _normalize(rng.standard_normal((clusters, dim)).astype(np.float32))
+    labels = rng.integers(0, clusters, count)
+    noise = rng.standard_normal((count, dim)).astype(np.float32) * (spread / np.sqrt(dim))
+    return _normalize(centroids[labels] + noise)
+
+
+def make_queries(vectors: np.ndarray, count: int, noise: float = 0.5, seed: int = 1) -> np.ndarray:
+    """Perturbed copies of stored vectors, so each query has a realistic neighbourhood."""
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.integers(0, len(vectors), count)]
+    jitter = rng.standard_normal(picked.shape).astype(np.float32) / np.sqrt(vectors.shape[1])
+    return _normalize(picked + noise * jitter)
+
+
+def _measure(
+    label: str,
+    search: Callable[[np.ndarray], np.ndarray],
+    queries: np.ndarray,
+    truth: List[np.ndarray],
+    k: int,
+    bytes_per_vector: int,
+    count: int,
+) -> Dict[str, Any]:
+    search(queries[0])  # warm-up: page in the matrix
+    latencies: List[float] = []
+    recall = 0.0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recall += len(np.intersect1d(found, expected)) / len(expected)
+    latencies_arr = np.asarray(latencies)
+    return {
+        "mode": label,
+        f"recall@{k}": round(recall / len(queries), 4),
+        "mean_ms": round(float(latencies_arr.mean()), 3),
+        "p95_ms": round(float(np.percentile(latencies_arr, 95)), 3),
+        "bytes_per_vector": bytes_per_vector,
+        "scanned_mb": round(bytes_per_vector * count / 2**20, 1),
+    }
+
+
+def benchmark_quantization(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    top_k: int = 10,
+    rescore_factors: Sequence[int] = (1, 2, 4, 8),
+) -> Dict[str, Any]:
+    """
+    Compare float32, float16 and int8 (with full-precision rescoring of
+    `top_k * factor` candidates) brute-force search on `vectors`.
+
+    Returns:
+        The corpus shape and one result row per mode (recall@k, mean / p95
+        latency per query, bytes per vector, size of the scanned matrix).
+    """
+    vectors, queries = _normalize(vectors), _normalize(queries)
+    count, dim = vectors.shape
+    truth = [_top_k(vectors @ q, top_k) for q in queries]
+
+    half = vectors.astype(np.float16)
+    quantizer = ScalarQuantizer.fit(vectors)
+    codes = quantizer.encode(vectors)
+
+    def _int8(factor: int) -> Callable[[np.ndarray], np.ndarray]:
+        def search(query: np.ndarray) -> np.ndarray:
+            weights, bias = quantizer.query_terms(query)
+            candidates = _top_k(quantizer.scores(codes, weights, bias), top_k * factor)
+            if factor == 1:
+                return candidates
+            candidates = np.sort(candidates)
+            return candidates[_top_k(vectors[candidates] @ query, top_k)]
+
+        return search
+
+    results = [
+        _measure("float32", lambda q: _top_k(vectors @ q, top_k), queries, truth, top_k, dim * 4, count),
+        _measure(
+            "float16",
+            lambda q: _top_k(half.astype(np.float32) @ q, top_k),
+            queries, truth, top_k, dim * 2, count,
+        ),
+    ]
+    for factor in rescore_factors:
+        label = "int8" if factor == 1 else f"int8+rescore(x{factor})"
+        results.append(_measure(label, _int8(factor), queries, truth, top_k, dim, count))
+    return {"vectors": count, "dim": dim, "queries": len(queries), "top_k": top_k, "results": results}
+
+
+def benchmark_two_stage(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    top_k: int = 20,
+    coarse_dims: Sequence[int] = (128, 256),
+    coarse_ks: Sequence[int] = (100, 200, 400),
+) -> Dict[str, Any]:
+    """
+    Compare exact search with a reduced-dimension first pass of `coarse_k`
+    candidates followed by full-precision rescoring down to `top_k`.
+    """
+    vectors, queries = _normalize(vectors), _normalize(queries)
+    count, dim = vectors.shape
+    truth = [_top_k(vectors @ q, top_k) for q in queries]
+
+    def _two_stage(reducer: DimensionReducer, coarse: np.ndarray, coarse_k: int):
+        def search(query: np.ndarray) -> np.ndarray:
+            candidates = np.sort(_top_k(coarse @ reducer.transform(query), coarse_k))
+            return candidates[_top_k(vectors[candidates] @ query, top_k)]
+
+        return search
+
+    results = [
+        _measure("full", lambda q: _top_k(vectors @ q, top_k), queries, truth, top_k, dim * 4, count)
+    ]
+    for coarse_dim in coarse_dims:
+        if coarse_dim >= dim:
+            continue
+        reducer = DimensionReducer.fit(vectors[:100_000], coarse_dim)
+        coarse = reducer.transform(vectors)
+        for coarse_k in coarse_ks:
+            results.append(
+                _measure(
+                    f"coarse({coarse_dim}d, k={coarse_k})+rescore",
+                    _two_stage(reducer, coarse, coarse_k),
+                    queries, truth, top_k, coarse_dim * 4, count,
+                )
+            )
+    return {"vectors": count, "dim": dim, "queries": len(queries), "top_k": top_k, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Vector quantization recall/latency benchmark.")
+    parser.add_argument("--store", type=Path, default=None, help="LocalVectorStore directory.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead.")
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--limit", type=int, default=0, help="Max stored vectors (0 = all).")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument(
+        "--coarse-dim", type=int, nargs="+", default=None,
+        help="Benchmark the two-stage coarse pass at these dimensions instead.",
+    )
+    parser.add_argument("--coarse-k", type=int, nargs="+", default=[100, 200, 400])
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.dim)
+    else:
+        from src.config.settings import LOCAL_VECTOR_STORE_DIR
+        from src.infra.vectorstore.local import read_vectors
+
+        vectors = read_vectors(args.store or LOCAL_VECTOR_STORE_DIR, limit=args.limit or None)
+        if len(vectors) == 0:
+            raise SystemExit("The local vector store is empty; pass --synthetic N.")
+
+    queries = make_queries(vectors, args.queries)
+    if args.coarse_dim:
+        report = benchmark_two_stage(vectors, queries, args.top_k, args.coarse_dim, args.coarse_k)
+    else:
+        report = benchmark_quantization(vectors, queries, args.top_k, args.rescore)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
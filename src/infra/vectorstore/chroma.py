@@ -1,14 +1,20 @@
 import logging
-from typing import List, Optional
+from typing import Any, Collection, Dict, Iterator, List, Optional
 
 import chromadb
+import numpy as np
+from chromadb.api import ClientAPI
 from llama_index.core import StorageContext, VectorStoreIndex
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.retrievers import BaseRetriever
-from llama_index.core.schema import BaseNode
+from llama_index.core.schema import BaseNode, NodeWithScore, QueryBundle
 from llama_index.core.vector_stores import MetadataFilters
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
 from llama_index.vector_stores.chroma import ChromaVectorStore as _LlamaChromaVS
 
 from src.config.settings import VECTOR_STORE_DIR
+from src.infra.embeddings.cache import EmbeddingCache, embed_nodes
+from src.infra.embeddings.scheduler import EmbeddingScheduler
 from src.infra.embeddings.sentence_transformer import get_embedding_model
 from src.infra.vectorstore.base import BaseVectorStore
 
@@ -16,6 +22,62 @@ logger = logging.getLogger(__name__)
 
 CHROMA_DB_PATH = VECTOR_STORE_DIR / "chroma_db"
 
+# Id sets up to this size are scored exactly; larger ones are post-filtered.
+EXACT_SEARCH_MAX_IDS = 4096
+
+
+class _IdSetRetriever(BaseRetriever):
+    """
+    Dense retrieval restricted to a pre-resolved set of node ids.
+
+    Small sets (the chunks of one file or section) are scored exactly: their
+    stored embeddings are fetched by id and compared to the query with one
+    matrix product, which is cheaper than a filtered ANN search. Larger sets
+    fall back to an over-fetched ANN search intersected with the set.
+    """
+
+    def __init__(
+        self, store: "ChromaVectorStore", node_ids: Collection[str], similarity_top_k: int
+    ) -> None:
+        super().__init__()
+        self._store = store
+        self._node_ids = node_ids if isinstance(node_ids, (set, frozenset)) else set(node_ids)
+        self._top_k = similarity_top_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if not self._node_ids:
+            return []
+        if len(self._node_ids) > EXACT_SEARCH_MAX_IDS:
+            ann = self._store.index.as_retriever(similarity_top_k=self._top_k * 8)
+            hits = [n for n in ann.retrieve(query_bundle) if n.node.node_id in self._node_ids]
+            return hits[: self._top_k]
+
+        query = np.asarray(
+            query_bundle.embedding
+            or self._store._embed_model.get_query_embedding(query_bundle.query_str),
+            dtype=np.float32,
+        )
+        query /= np.linalg.norm(query) or 1.0
+
+        ids = list(self._node_ids)
+        nodes: List[BaseNode] = []
+        vectors: List[np.ndarray] = []
+        for start in range(0, len(ids), 1000):
+            result = self._store._chroma_collection.get(
+                ids=ids[start:start + 1000],
+                include=["embeddings", "documents", "metadatas"],
+            )
+            nodes.extend(ChromaVectorStore._to_nodes(result))
+            vectors.append(np.asarray(result["embeddings"], dtype=np.float32))
+        if not nodes:
+            return []
+
+        matrix = np.concatenate(vectors)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        scores = matrix @ query
+        top = np.argsort(-scores)[: self._top_k]
+        return [NodeWithScore(node=nodes[i], score=float(scores[i])) for i in top]
+
 
 class ChromaVectorStore(BaseVectorStore):
     """
@@ -27,14 +89,34 @@ class ChromaVectorStore(BaseVectorStore):
       - HuggingFaceEmbedding (BAAI/bge-large-en-v1.5)       (embedding model)
 
     Swap backends: subclass BaseVectorStore and implement add_nodes,
-    as_retriever, and delete_document.
+    as_retriever, delete_document, delete_nodes, get_nodes and iter_nodes.
     """
 
-    def __init__(self, collection_name: str = "rag_collection") -> None:
-        CHROMA_DB_PATH.mkdir(parents=True, exist_ok=True)
-
+    def __init__(
+        self,
+        collection_name: str = "rag_collection",
+        client: Optional[ClientAPI] = None,
+        embed_model: Optional[BaseEmbedding] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        embed_scheduler: Optional[EmbeddingScheduler] = None,
+    ) -> None:
+        """
+        Args:
+            collection_name: Chroma collection holding the nodes.
+            client:          Shared Chroma client. A new PersistentClient is
+                             opened when omitted.
+            embed_model:     Shared embedding model. Loaded from settings
+                             when omitted.
+            embedding_cache: Optional persistent cache consulted before
+                             embedding new nodes.
+            embed_scheduler: Optional length-bucketed batching for the
+                             nodes that do need embedding.
+        """
         # 1. Raw ChromaDB client (persistent)
-        self._chroma_client = chromadb.PersistentClient(path=str(CHROMA_DB_PATH))
+        if client is None:
+            CHROMA_DB_PATH.mkdir(parents=True, exist_ok=True)
+            client = chromadb.PersistentClient(path=str(CHROMA_DB_PATH))
+        self._chroma_client = client
         self._chroma_collection = self._chroma_client.get_or_create_collection(
             collection_name
         )
@@ -46,7 +128,10 @@ class ChromaVectorStore(BaseVectorStore):
         storage_ctx = StorageContext.from_defaults(vector_store=llama_vs)
 
         # 4. Embedding model (BAAI/bge-large-en-v1.5)
-        embed_model = get_embedding_model()
+        embed_model = embed_model or get_embedding_model()
+        self._embed_model = embed_model
+        self._embedding_cache = embedding_cache
+        self._embed_scheduler = embed_scheduler
 
         # 5. VectorStoreIndex — the main interface for insert + query
         self.index = VectorStoreIndex(
@@ -64,6 +149,15 @@ class ChromaVectorStore(BaseVectorStore):
         """Embed and persist nodes into ChromaDB via LlamaIndex."""
         if not nodes:
             return
+        if self._embedding_cache is not None or self._embed_scheduler is not None:
+            # Pre-filled embeddings are not recomputed by insert_nodes.
+            embedded = embed_nodes(
+                nodes,
+                self._embed_model,
+                cache=self._embedding_cache,
+                embed_texts=self._embed_scheduler.embed if self._embed_scheduler else None,
+            )
+            logger.info(f"Embedded {embedded} distinct texts for {len(nodes)} nodes.")
         self.index.insert_nodes(nodes)
         logger.info(f"Persisted {len(nodes)} nodes to ChromaDB.")
 
@@ -71,8 +165,16 @@ class ChromaVectorStore(BaseVectorStore):
         self,
         similarity_top_k: int = 20,
         filters: Optional[MetadataFilters] = None,
+        node_ids: Optional[Collection[str]] = None,
+        coarse_k: Optional[int] = None,
     ) -> BaseRetriever:
-        """Return a VectorIndexRetriever configured with optional metadata filters."""
+        """
+        Return a VectorIndexRetriever configured with optional metadata filters,
+        or an exact retriever over `node_ids` when a pre-resolved id set is given.
+        Chroma's HNSW search is already approximate, so `coarse_k` is ignored.
+        """
+        if node_ids is not None:
+            return _IdSetRetriever(self, node_ids, similarity_top_k)
         return self.index.as_retriever(
             similarity_top_k=similarity_top_k,
             filters=filters,
@@ -87,3 +189,38 @@ class ChromaVectorStore(BaseVectorStore):
             where={"document_id": str(document_id)}
         )
         logger.info(f"Deleted all nodes for document_id={document_id} from ChromaDB.")
+
+    def delete_nodes(self, node_ids: List[str]) -> None:
+        """Delete individual nodes (e.g. chunks dropped by a document update)."""
+        if not node_ids:
+            return
+        self._chroma_collection.delete(ids=list(node_ids))
+        logger.info(f"Deleted {len(node_ids)} nodes from ChromaDB.")
+
+    @staticmethod
+    def _to_nodes(result: Dict[str, Any]) -> List[BaseNode]:
+        return [
+            metadata_dict_to_node(metadata, text=text)
+            for text, metadata in zip(result["documents"], result["metadatas"])
+        ]
+
+    def get_nodes(self, node_ids: List[str]) -> List[BaseNode]:
+        """Fetch nodes by id (no embeddings), in the requested order."""
+        if not node_ids:
+            return []
+        result = self._chroma_collection.get(
+            ids=list(node_ids), include=["documents", "metadatas"]
+        )
+        by_id = {node.node_id: node for node in self._to_nodes(result)}
+        return [by_id[i] for i in node_ids if i in by_id]
+
+    def iter_nodes(self, batch_size: int = 1000) -> Iterator[List[BaseNode]]:
+        offset = 0
+        while True:
+            result = self._chroma_collection.get(
+                limit=batch_size, offset=offset, include=["documents", "metadatas"]
+            )
+            if not result["ids"]:
+                return
+            yield self._to_nodes(result)
+            offset += len(result["ids"])
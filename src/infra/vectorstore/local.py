@@ -0,0 +1,858 @@
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Collection, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, NodeWithScore, QueryBundle
+from llama_index.core.vector_stores import (
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+)
+from llama_index.core.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+
+from src.config.settings import LOCAL_VECTOR_STORE_DIR
+from src.infra.embeddings.cache import EmbeddingCache, embed_nodes
+from src.infra.embeddings.scheduler import EmbeddingScheduler
+from src.infra.embeddings.sentence_transformer import get_embedding_model
+from src.infra.vectorstore.base import BaseVectorStore
+from src.infra.vectorstore.projection import DimensionReducer
+from src.infra.vectorstore.quantization import ScalarQuantizer
+
+try:  # optional: approximate search; brute force is used without it
+    import hnswlib
+except ImportError:  # pragma: no cover
+    hnswlib = None
+
+logger = logging.getLogger(__name__)
+
+# Rows scored per matrix product during brute-force search.
+_SCAN_BLOCK = 65_536
+# Tombstones are only compacted away once there are at least this many.
+_MIN_COMPACT_ROWS = 1024
+# Max rows sampled when (re)fitting the int8 quantizer / coarse projection.
+_FIT_SAMPLE = 100_000
+
+_SQL_OPERATORS = {
+    FilterOperator.EQ: "=",
+    FilterOperator.NE: "!=",
+    FilterOperator.GT: ">",
+    FilterOperator.GTE: ">=",
+    FilterOperator.LT: "<",
+    FilterOperator.LTE: "<=",
+    FilterOperator.IN: "IN",
+    FilterOperator.NIN: "NOT IN",
+}
+
+
+def _filters_to_sql(filters: MetadataFilters) -> Tuple[str, List[Any]]:
+    """Translate MetadataFilters into a WHERE clause over the metadata JSON."""
+    clauses: List[str] = []
+    params: List[Any] = []
+    for f in filters.filters:
+        if isinstance(f, MetadataFilters):
+            clause, nested = _filters_to_sql(f)
+            clauses.append(f"({clause})")
+            params.extend(nested)
+            continue
+        op = _SQL_OPERATORS.get(f.operator)
+        if op is None:
+            raise NotImplementedError(f"Filter operator {f.operator} is not supported.")
+        # The JSON path is bound like the values; a quote would end the
+        # quoted key early, so it cannot be part of one.
+        if '"' in f.key:
+            raise ValueError(f"Unsupported metadata filter key: {f.key!r}")
+        column = "json_extract(metadata, ?)"
+        params.append(f'$."{f.key}"')
+        if op in ("IN", "NOT IN"):
+            values = list(f.value) if isinstance(f.value, (list, tuple)) else [f.value]
+            clauses.append(f"{column} {op} ({','.join('?' * len(values))})")
+            params.extend(values)
+        else:
+            clauses.append(f"{column} {op} ?")
+            params.append(f.value)
+    joiner = " OR " if filters.condition == FilterCondition.OR else " AND "
+    return joiner.join(clauses) or "1", params
+
+
+class _LocalRetriever(BaseRetriever):
+    """Dense retrieval over a LocalVectorStore, optionally pre-filtered."""
+
+    def __init__(
+        self,
+        store: "LocalVectorStore",
+        similarity_top_k: int,
+        filters: Optional[MetadataFilters] = None,
+        node_ids: Optional[Collection[str]] = None,
+        coarse_k: Optional[int] = None,
+    ) -> None:
+        super().__init__()
+        self._store = store
+        self._top_k = similarity_top_k
+        self._filters = filters
+        self._node_ids = node_ids
+        self._coarse_k = coarse_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        embedding = query_bundle.embedding or self._store._embed_model.get_query_embedding(
+            query_bundle.query_str
+        )
+        return self._store.search(
+            embedding,
+            self._top_k,
+            filters=self._filters,
+            node_ids=self._node_ids,
+            coarse_k=self._coarse_k,
+        )
+
+
+class LocalVectorStore(BaseVectorStore):
+    """
+    In-process vector store: a memory-mapped matrix plus SQLite.
+
+    Every query against Chroma crosses its client API and serializes results
+    through it; for a single-user corpus of a few hundred thousand chunks
+    the search itself is a matrix product. This backend keeps
+
+      - vectors in a memory-mapped float32 / float16 matrix (one row per
+        chunk, L2-normalized, grown by doubling), so only touched pages are
+        resident;
+      - node text, metadata and the row → node mapping in SQLite;
+      - an HNSW graph (hnswlib) for unfiltered queries when installed, and
+        NumPy brute force otherwise. Filtered and id-restricted queries are
+        always scored exactly over the matching rows.
+
+    With `quantization="int8"` a second, 4x smaller matrix of int8 codes
+    (see ScalarQuantizer) is what gets scanned: the best
+    `top_k * rescore_factor` candidates are then rescored against the
+    full-precision rows, so only those pages of the big matrix are ever
+    touched. HNSW is not used in this mode (hnswlib keeps its own float32
+    copy of every vector).
+
+    With `coarse_dim` set, a third matrix holds every vector projected to
+    `coarse_dim` dimensions (see DimensionReducer). Searches given a
+    `coarse_k` first scan that matrix for `coarse_k` candidates and then
+    rescore only those on the full vectors; this replaces HNSW as well.
+    The quantizer and the projection are refitted whenever the store has
+    doubled since the last fit.
+
+    Deletes only tombstone rows (a SQLite flag, an in-memory mask and
+    hnswlib's mark_deleted). Once tombstones exceed `compact_ratio` of the
+    rows, `compact()` rewrites the matrix without them and renumbers rows.
+    The HNSW graph is saved on `close()` and rebuilt from the matrix when
+    it is missing or stale.
+    """
+
+    def __init__(
+        self,
+        path: Path = LOCAL_VECTOR_STORE_DIR,
+        embed_model: Optional[BaseEmbedding] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        embed_scheduler: Optional[EmbeddingScheduler] = None,
+        dtype: str = "float32",
+        index: str = "auto",
+        compact_ratio: float = 0.25,
+        quantization: Optional[str] = None,
+        rescore_factor: int = 4,
+        coarse_dim: Optional[int] = None,
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 200,
+        hnsw_ef_search: int = 128,
+    ) -> None:
+        """
+        Args:
+            path:                 Directory holding the matrix, SQLite and HNSW files.
+            embed_model:          Shared embedding model. Loaded from settings
+                                  when omitted.
+            embedding_cache:      Optional persistent cache consulted before
+                                  embedding new nodes.
+            embed_scheduler:      Optional length-bucketed batching for the
+                                  nodes that do need embedding.
+            dtype:                Storage type of the matrix ("float32" or
+                                  "float16"); fixed once the store has rows.
+            index:                "hnsw", "flat" (brute force) or "auto"
+                                  (HNSW if hnswlib is installed).
+            compact_ratio:        Tombstone fraction that triggers compaction.
+            quantization:         None, or "int8" to scan int8 codes and
+                                  rescore candidates at full precision;
+                                  fixed once the store has rows.
+            rescore_factor:       Candidates rescored per requested result
+                                  in int8 mode.
+            coarse_dim:           Dimension of the first-pass vectors stored
+                                  alongside the full ones (None disables the
+                                  two-stage search); fixed once the store has rows.
+            hnsw_m:               HNSW graph degree.
+            hnsw_ef_construction: HNSW build-time beam width.
+            hnsw_ef_search:       HNSW query-time beam width (raised to top_k).
+        """
+        if index not in ("auto", "hnsw", "flat"):
+            raise ValueError(f"Unknown local vector index '{index}'.")
+        if index == "hnsw" and hnswlib is None:
+            raise ImportError("index='hnsw' requires the hnswlib package.")
+
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.rescore_factor = max(1, rescore_factor)
+        self._hnsw_m = hnsw_m
+        self._hnsw_ef_construction = hnsw_ef_construction
+        self._hnsw_ef_search = hnsw_ef_search
+
+        self._embed_model = embed_model or get_embedding_model()
+        self._embedding_cache = embedding_cache
+        self._embed_scheduler = embed_scheduler
+        self._lock = threading.RLock()
+
+        path.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path / "nodes.db"), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS nodes ("
+            " row INTEGER PRIMARY KEY, node_id TEXT NOT NULL, document_id TEXT NOT NULL,"
+            " text TEXT NOT NULL, metadata TEXT NOT NULL, node TEXT NOT NULL,"
+            " deleted INTEGER NOT NULL DEFAULT 0);"
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_nodes_live_id ON nodes (node_id) WHERE deleted = 0;"
+            "CREATE INDEX IF NOT EXISTS ix_nodes_document ON nodes (document_id);"
+            "CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+        )
+        self._db.commit()
+
+        meta = dict(self._db.execute("SELECT key, value FROM store_meta"))
+        self.dtype = np.dtype(meta.get("dtype", dtype))
+        if self.dtype not in (np.float32, np.float16):
+            raise ValueError(f"Unsupported local vector dtype '{self.dtype}'.")
+        # Stores created before quantization existed have "dim" but no setting.
+        self.quantization = meta.get(
+            "quantization", "none" if "dim" in meta else (quantization or "none")
+        )
+        if self.quantization not in ("none", "int8"):
+            raise ValueError(f"Unsupported local vector quantization '{self.quantization}'.")
+        self.coarse_dim = int(
+            meta.get("coarse_dim", 0 if "dim" in meta else (coarse_dim or 0))
+        )
+        compressed = self.quantization == "int8" or self.coarse_dim > 0
+        if compressed and index == "hnsw":
+            raise ValueError("index='hnsw' cannot be combined with int8 or coarse vectors.")
+        self._use_hnsw = hnswlib is not None and index != "flat" and not compressed
+        self.dim: Optional[int] = int(meta["dim"]) if "dim" in meta else None
+        self._generation = int(meta.get("generation", 0))
+        # Bumped on every write; the saved HNSW graph records the version it matches.
+        self._version = int(meta.get("version", 0))
+
+        self._count = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM nodes").fetchone()[0]
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._codes: Optional[np.memmap] = None
+        self._quantizer: Optional[ScalarQuantizer] = None
+        self._coarse: Optional[np.memmap] = None
+        self._reducer: Optional[DimensionReducer] = None
+        self._trained_rows = int(meta.get("trained_rows", 0))
+        self._alive = np.zeros(0, dtype=bool)
+        self._hnsw = None
+        self._hnsw_version = -1
+
+        if self.dim is not None:
+            if self.quantization == "int8":
+                self._quantizer = ScalarQuantizer.load(self._quantizer_path(self._generation))
+            if self.coarse_dim:
+                self._reducer = DimensionReducer.load(self._projection_path(self._generation))
+            self._open_matrix(max(self._count, 1024))
+            self._alive = np.zeros(self._capacity, dtype=bool)
+            live = [r for (r,) in self._db.execute("SELECT row FROM nodes WHERE deleted = 0")]
+            self._alive[live] = True
+            if self._use_hnsw:
+                self._load_hnsw(meta)
+        logger.info(
+            f"Local vector store at {path}: {self.live_count} nodes, "
+            f"{'hnsw' if self._use_hnsw else 'brute-force'} search"
+            f"{', int8 codes' if self.quantization == 'int8' else ''}"
+            f"{f', {self.coarse_dim}-dim coarse pass' if self.coarse_dim else ''}."
+        )
+
+    def __len__(self) -> int:
+        return self.live_count
+
+    @property
+    def live_count(self) -> int:
+        return int(self._alive[: self._count].sum())
+
+    # ------------------------------------------------------------------ #
+    #  Storage                                                             #
+    # ------------------------------------------------------------------ #
+
+    def _matrix_path(self, generation: int) -> Path:
+        return self.path / f"vectors-{generation}.{self.dtype.name}"
+
+    def _codes_path(self, generation: int) -> Path:
+        return self.path / f"codes-{generation}.int8"
+
+    def _quantizer_path(self, generation: int) -> Path:
+        return self.path / f"quantizer-{generation}.npy"
+
+    def _coarse_path(self, generation: int) -> Path:
+        return self.path / f"coarse-{generation}.float32"
+
+    def _projection_path(self, generation: int) -> Path:
+        return self.path / f"projection-{generation}.npy"
+
+    def _hnsw_path(self) -> Path:
+        return self.path / f"hnsw-{self._generation}.bin"
+
+    def _map(self, file: Path, dtype: np.dtype, capacity: int, dim: int) -> np.memmap:
+        size = capacity * dim * dtype.itemsize
+        with open(file, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(file, dtype=dtype, mode="r+", shape=(capacity, dim))
+
+    def _open_matrix(self, capacity: int) -> None:
+        """(Re)map the matrix files with room for at least `capacity` rows."""
+        # Readers holding the previous mapping keep a valid (smaller) view.
+        generation = self._generation
+        self._vectors = self._map(self._matrix_path(generation), self.dtype, capacity, self.dim)
+        if self.quantization == "int8":
+            self._codes = self._map(
+                self._codes_path(generation), np.dtype(np.int8), capacity, self.dim
+            )
+        if self.coarse_dim:
+            self._coarse = self._map(
+                self._coarse_path(generation), np.dtype(np.float32), capacity, self.coarse_dim
+            )
+        self._capacity = capacity
+
+    def _derived_matrices(self) -> List[np.memmap]:
+        return [m for m in (self._codes, self._coarse) if m is not None]
+
+    def _write_rows(self, start: int, vectors: np.ndarray) -> None:
+        """Write full vectors and their derived forms at rows start.. (caller holds the lock)."""
+        end = start + len(vectors)
+        self._vectors[start:end] = vectors.astype(self.dtype)
+        if self._codes is not None:
+            self._codes[start:end] = self._quantizer.encode(vectors)
+        if self._coarse is not None:
+            self._coarse[start:end] = self._reducer.transform(vectors)
+
+    def _flush(self) -> None:
+        for matrix in [self._vectors, *self._derived_matrices()]:
+            if matrix is not None:
+                matrix.flush()
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows <= self._capacity:
+            return
+        capacity = max(rows, self._capacity * 2, 1024)
+        self._flush()
+        self._open_matrix(capacity)
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: len(self._alive)] = self._alive
+        self._alive = alive
+        if self._hnsw is not None:
+            self._hnsw.resize_index(capacity)
+
+    def _set_meta(self, **values: Any) -> None:
+        self._db.executemany(
+            "INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)",
+            [(k, str(v)) for k, v in values.items()],
+        )
+
+    def _bump_version(self) -> None:
+        self._version += 1
+        self._set_meta(version=self._version)
+
+    # ------------------------------------------------------------------ #
+    #  HNSW                                                                #
+    # ------------------------------------------------------------------ #
+
+    def _new_hnsw(self):
+        hnsw = hnswlib.Index(space="ip", dim=self.dim)
+        hnsw.init_index(
+            max_elements=self._capacity, M=self._hnsw_m, ef_construction=self._hnsw_ef_construction
+        )
+        hnsw.set_ef(self._hnsw_ef_search)
+        return hnsw
+
+    def _load_hnsw(self, meta: Dict[str, str]) -> None:
+        file = self._hnsw_path()
+        if file.exists() and int(meta.get("hnsw_version", -1)) == self._version:
+            hnsw = hnswlib.Index(space="ip", dim=self.dim)
+            hnsw.load_index(str(file), max_elements=self._capacity)
+            hnsw.set_ef(self._hnsw_ef_search)
+            self._hnsw, self._hnsw_version = hnsw, self._version
+            return
+        self._rebuild_hnsw()
+
+    def _rebuild_hnsw(self) -> None:
+        """Build the graph over the live rows of the matrix."""
+        hnsw = self._new_hnsw()
+        live = np.flatnonzero(self._alive[: self._count])
+        for start in range(0, len(live), _SCAN_BLOCK):
+            rows = live[start:start + _SCAN_BLOCK]
+            hnsw.add_items(np.asarray(self._vectors[rows], dtype=np.float32), rows)
+        self._hnsw, self._hnsw_version = hnsw, -1
+        logger.info(f"Built HNSW graph over {len(live)} vectors.")
+
+    def save(self) -> None:
+        """Flush the matrix and persist the HNSW graph if it changed."""
+        with self._lock:
+            self._flush()
+            if self._hnsw is not None and self._hnsw_version != self._version:
+                self._hnsw.save_index(str(self._hnsw_path()))
+                self._hnsw_version = self._version
+                self._set_meta(hnsw_version=self._version)
+                self._db.commit()
+
+    def close(self) -> None:
+        self.save()
+        with self._lock:
+            self._db.close()
+
+    # ------------------------------------------------------------------ #
+    #  BaseVectorStore interface                                           #
+    # ------------------------------------------------------------------ #
+
+    def add_nodes(self, nodes: List[BaseNode]) -> None:
+        """Embed (cache misses only) and append nodes; re-added ids replace their old row."""
+        if not nodes:
+            return
+        embedded = embed_nodes(
+            nodes,
+            self._embed_model,
+            cache=self._embedding_cache,
+            embed_texts=self._embed_scheduler.embed if self._embed_scheduler else None,
+        )
+        logger.info(f"Embedded {embedded} distinct texts for {len(nodes)} nodes.")
+
+        matrix = np.asarray([n.embedding for n in nodes], dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+        records = []
+        for node in nodes:
+            payload = node_to_metadata_dict(node, remove_text=True, flat_metadata=False)
+            records.append(
+                (
+                    node.node_id,
+                    str(node.metadata.get("document_id", "")),
+                    node.get_content(),
+                    json.dumps(node.metadata, default=str),
+                    json.dumps(payload, default=str),
+                )
+            )
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                self._set_meta(
+                    dim=self.dim,
+                    dtype=self.dtype.name,
+                    quantization=self.quantization,
+                    coarse_dim=self.coarse_dim,
+                    generation=self._generation,
+                )
+                self._fit_derived(matrix, np.arange(len(matrix)), self._generation)
+                self._open_matrix(1024)
+                self._alive = np.zeros(self._capacity, dtype=bool)
+                if self._use_hnsw:
+                    self._hnsw = self._new_hnsw()
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dimension {matrix.shape[1]} does not match the store ({self.dim})."
+                )
+
+            self._tombstone("node_id IN ({})", [r[0] for r in records])
+            start = self._count
+            rows = np.arange(start, start + len(records))
+            self._ensure_capacity(start + len(records))
+            self._write_rows(start, matrix)
+            self._db.executemany(
+                "INSERT INTO nodes (row, node_id, document_id, text, metadata, node)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(int(row), *record) for row, record in zip(rows, records)],
+            )
+            self._bump_version()
+            self._db.commit()
+
+            self._alive[rows] = True
+            self._count = start + len(records)
+            if self._hnsw is not None:
+                self._hnsw.add_items(matrix, rows)
+        logger.info(f"Persisted {len(nodes)} nodes to the local vector store.")
+        self._maybe_compact()
+
+    def as_retriever(
+        self,
+        similarity_top_k: int = 20,
+        filters: Optional[MetadataFilters] = None,
+        node_ids: Optional[Collection[str]] = None,
+        coarse_k: Optional[int] = None,
+    ) -> BaseRetriever:
+        """Return a retriever over this store (exact search when filtered or id-restricted)."""
+        return _LocalRetriever(
+            self, similarity_top_k, filters=filters, node_ids=node_ids, coarse_k=coarse_k
+        )
+
+    def delete_document(self, document_id: int) -> None:
+        with self._lock:
+            removed = self._tombstone("document_id IN ({})", [str(document_id)])
+            self._db.commit()
+        logger.info(f"Deleted {removed} nodes for document_id={document_id} from the local store.")
+        self._maybe_compact()
+
+    def delete_nodes(self, node_ids: List[str]) -> None:
+        if not node_ids:
+            return
+        with self._lock:
+            removed = self._tombstone("node_id IN ({})", list(node_ids))
+            self._db.commit()
+        logger.info(f"Deleted {removed} nodes from the local store.")
+        self._maybe_compact()
+
+    def _tombstone(self, clause: str, params: Sequence[Any]) -> int:
+        """Flag the live rows matching `clause`; caller holds the lock and commits."""
+        rows: List[int] = []
+        for start in range(0, len(params), 500):
+            chunk = list(params[start:start + 500])
+            where = clause.format(",".join("?" * len(chunk)))
+            rows.extend(
+                r for (r,) in self._db.execute(
+                    f"SELECT row FROM nodes WHERE deleted = 0 AND {where}", chunk
+                )
+            )
+        if not rows:
+            return 0
+        self._db.executemany("UPDATE nodes SET deleted = 1 WHERE row = ?", [(r,) for r in rows])
+        self._bump_version()
+        self._alive[rows] = False
+        if self._hnsw is not None:
+            for row in rows:
+                self._hnsw.mark_deleted(row)
+        return len(rows)
+
+    def _row_nodes(self, rows: Sequence[int]) -> Dict[int, BaseNode]:
+        found: Dict[int, BaseNode] = {}
+        for start in range(0, len(rows), 500):
+            chunk = [int(r) for r in rows[start:start + 500]]
+            for row, text, payload in self._db.execute(
+                f"SELECT row, text, node FROM nodes WHERE row IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ):
+                found[row] = metadata_dict_to_node(json.loads(payload), text=text)
+        return found
+
+    def get_nodes(self, node_ids: List[str]) -> List[BaseNode]:
+        """Fetch nodes by id (no embeddings), in the requested order."""
+        if not node_ids:
+            return []
+        by_id: Dict[str, BaseNode] = {}
+        with self._lock:
+            for start in range(0, len(node_ids), 500):
+                chunk = list(node_ids[start:start + 500])
+                for text, payload in self._db.execute(
+                    f"SELECT text, node FROM nodes WHERE deleted = 0"
+                    f" AND node_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ):
+                    node = metadata_dict_to_node(json.loads(payload), text=text)
+                    by_id[node.node_id] = node
+        return [by_id[i] for i in node_ids if i in by_id]
+
+    def iter_nodes(self, batch_size: int = 1000) -> Iterator[List[BaseNode]]:
+        last = -1
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT row, text, node FROM nodes WHERE deleted = 0 AND row > ?"
+                    " ORDER BY row LIMIT ?",
+                    (last, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            yield [metadata_dict_to_node(json.loads(p), text=t) for _, t, p in rows]
+            last = rows[-1][0]
+
+    # ------------------------------------------------------------------ #
+    #  Search                                                              #
+    # ------------------------------------------------------------------ #
+
+    def _candidate_rows(
+        self, filters: Optional[MetadataFilters], node_ids: Optional[Collection[str]]
+    ) -> Optional[np.ndarray]:
+        """Live rows allowed by `node_ids` (preferred) or `filters`; None = all."""
+        if node_ids is not None:
+            ids = list(node_ids)
+            rows: List[int] = []
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows.extend(
+                    r for (r,) in self._db.execute(
+                        f"SELECT row FROM nodes WHERE deleted = 0"
+                        f" AND node_id IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                )
+            return np.asarray(sorted(rows), dtype=np.int64)
+        if filters is not None and filters.filters:
+            where, params = _filters_to_sql(filters)
+            rows = [
+                r for (r,) in self._db.execute(
+                    f"SELECT row FROM nodes WHERE deleted = 0 AND ({where}) ORDER BY row", params
+                )
+            ]
+            return np.asarray(rows, dtype=np.int64)
+        return None
+
+    @staticmethod
+    def _scan(
+        matrix: np.ndarray,
+        score: Callable[[np.ndarray], np.ndarray],
+        alive: np.ndarray,
+        count: int,
+        top_k: int,
+        rows: Optional[np.ndarray],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k of `score(matrix block)` over `rows` (all live rows when None)."""
+        best_rows: List[np.ndarray] = []
+        best_scores: List[np.ndarray] = []
+        total = count if rows is None else len(rows)
+        for start in range(0, total, _SCAN_BLOCK):
+            if rows is None:
+                block = np.arange(start, min(start + _SCAN_BLOCK, count))
+                scores = score(matrix[start:start + len(block)])
+                scores[~alive[start:start + len(block)]] = -np.inf
+            else:
+                block = rows[start:start + _SCAN_BLOCK]
+                scores = score(matrix[block])
+            if len(block) > top_k:
+                keep = np.argpartition(-scores, top_k)[:top_k]
+                block, scores = block[keep], scores[keep]
+            best_rows.append(block)
+            best_scores.append(scores)
+        if not best_rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        all_rows, all_scores = np.concatenate(best_rows), np.concatenate(best_scores)
+        finite = np.isfinite(all_scores)
+        all_rows, all_scores = all_rows[finite], all_scores[finite]
+        order = np.argsort(-all_scores)[:top_k]
+        return all_rows[order], all_scores[order]
+
+    def _exact_scan(
+        self,
+        snapshot: Tuple[Any, ...],
+        query: np.ndarray,
+        top_k: int,
+        rows: Optional[np.ndarray],
+        coarse_k: Optional[int],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Brute-force top-k. A cheaper first pass picks the candidates when
+        available (coarse vectors for `coarse_k`, else int8 codes); they
+        are then rescored on the full vectors.
+        """
+        vectors, alive, count, quantizer, codes, reducer, coarse = snapshot
+        total = count if rows is None else len(rows)
+
+        def _full(block: np.ndarray) -> np.ndarray:
+            return np.asarray(block, dtype=np.float32) @ query
+
+        if reducer is not None and coarse_k and top_k < coarse_k < total:
+            projected = reducer.transform(query)
+            candidates, _ = self._scan(
+                coarse, lambda block: block @ projected, alive, count, coarse_k, rows
+            )
+        elif quantizer is not None and top_k * self.rescore_factor < total:
+            weights, bias = quantizer.query_terms(query)
+            candidates, _ = self._scan(
+                codes,
+                lambda block: quantizer.scores(block, weights, bias),
+                alive,
+                count,
+                top_k * self.rescore_factor,
+                rows,
+            )
+        else:
+            return self._scan(vectors, _full, alive, count, top_k, rows)
+        # Sorted row order keeps the memmap reads sequential.
+        return self._scan(vectors, _full, alive, count, top_k, np.sort(candidates))
+
+    def search(
+        self,
+        embedding: Sequence[float],
+        top_k: int,
+        filters: Optional[MetadataFilters] = None,
+        node_ids: Optional[Collection[str]] = None,
+        coarse_k: Optional[int] = None,
+    ) -> List[NodeWithScore]:
+        """
+        Top-k nodes by cosine similarity to `embedding`.
+
+        `coarse_k` sizes the first pass over the reduced-dimension vectors
+        (ignored without `coarse_dim`). The vector scan runs outside the
+        lock on a snapshot of the matrices; only a compaction (which
+        renumbers rows) in between forces a retry.
+        """
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+
+        for _ in range(3):
+            with self._lock:
+                if self._vectors is None or top_k <= 0:
+                    return []
+                generation = self._generation
+                snapshot = (
+                    self._vectors,
+                    self._alive,
+                    self._count,
+                    self._quantizer,
+                    self._codes,
+                    self._reducer,
+                    self._coarse,
+                )
+                rows = self._candidate_rows(filters, node_ids)
+                hits = None
+                if rows is None and self._hnsw is not None and self.live_count > top_k:
+                    # Graph queries are sub-millisecond; holding the lock keeps
+                    # them clear of resize_index / mark_deleted.
+                    self._hnsw.set_ef(max(self._hnsw_ef_search, top_k))
+                    try:
+                        labels, distances = self._hnsw.knn_query(query, k=top_k)
+                        hits = labels[0].astype(np.int64)
+                        # "ip" space distance is 1 - inner product.
+                        scores = 1.0 - distances[0]
+                    except RuntimeError:
+                        # Too few reachable live elements (heavy tombstoning).
+                        hits = None
+
+            if hits is None:
+                hits, scores = self._exact_scan(snapshot, query, top_k, rows, coarse_k)
+
+            with self._lock:
+                if self._generation != generation:
+                    continue
+                nodes = self._row_nodes(hits.tolist())
+            return [
+                NodeWithScore(node=nodes[row], score=float(score))
+                for row, score in zip(hits.tolist(), scores.tolist())
+                if row in nodes
+            ]
+        raise RuntimeError("Local vector store kept compacting during a search.")
+
+    # ------------------------------------------------------------------ #
+    #  Compaction                                                          #
+    # ------------------------------------------------------------------ #
+
+    def _maybe_compact(self) -> None:
+        dead = self._count - self.live_count
+        if dead >= _MIN_COMPACT_ROWS and dead > self.compact_ratio * self._count:
+            self.compact()
+        elif self._derived_matrices() and self.live_count >= 2 * self._trained_rows:
+            # Quantizer / projection were fitted on a much smaller corpus.
+            self.compact()
+
+    def _fit_derived(self, vectors: np.ndarray, rows: np.ndarray, generation: int) -> None:
+        """
+        Fit and persist the int8 quantizer and the coarse projection for
+        `generation` on a sample of `vectors[rows]` (caller holds the lock).
+        """
+        if self.quantization == "none" and not self.coarse_dim:
+            return
+        self._trained_rows = len(rows)
+        if len(rows) > _FIT_SAMPLE:
+            rows = np.sort(np.random.default_rng(0).choice(rows, _FIT_SAMPLE, replace=False))
+        sample = np.asarray(vectors[rows], dtype=np.float32)
+        if self.quantization == "int8":
+            self._quantizer = ScalarQuantizer.fit(sample)
+            self._quantizer.save(self._quantizer_path(generation))
+        if self.coarse_dim:
+            self._reducer = DimensionReducer.fit(sample, self.coarse_dim)
+            self._reducer.save(self._projection_path(generation))
+        self._set_meta(trained_rows=self._trained_rows)
+
+    def compact(self) -> None:
+        """
+        Rewrite the matrix without tombstoned rows and renumber the rest.
+
+        The int8 quantizer and coarse projection, if any, are refitted on the
+        surviving vectors and every derived row is rewritten.
+        """
+        with self._lock:
+            if self._vectors is None:
+                return
+            live = np.flatnonzero(self._alive[: self._count])
+            old_files = [
+                self._matrix_path(self._generation),
+                self._codes_path(self._generation),
+                self._quantizer_path(self._generation),
+                self._coarse_path(self._generation),
+                self._projection_path(self._generation),
+                self._hnsw_path(),
+            ]
+            old = np.memmap(old_files[0], dtype=self.dtype, mode="r").reshape(-1, self.dim)
+
+            self._generation += 1
+            self._fit_derived(old, live, self._generation)
+            capacity = max(1024, int(2 ** np.ceil(np.log2(max(len(live), 1)))))
+            self._open_matrix(capacity)
+            for start in range(0, len(live), _SCAN_BLOCK):
+                rows = live[start:start + _SCAN_BLOCK]
+                self._write_rows(start, np.asarray(old[rows], dtype=np.float32))
+            self._flush()
+            del old
+
+            self._db.execute("DELETE FROM nodes WHERE deleted = 1")
+            # Ascending order: each target row is free by the time it is written.
+            self._db.executemany(
+                "UPDATE nodes SET row = ? WHERE row = ?",
+                [(new, int(row)) for new, row in enumerate(live) if new != row],
+            )
+            self._set_meta(generation=self._generation)
+            self._bump_version()
+            self._db.commit()
+
+            self._alive = np.zeros(capacity, dtype=bool)
+            self._alive[: len(live)] = True
+            self._count = len(live)
+            if self._use_hnsw:
+                self._rebuild_hnsw()
+            for file in old_files:
+                file.unlink(missing_ok=True)
+            self.save()
+        logger.info(f"Compacted local vector store to {len(live)} rows.")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rows": self._count,
+            "live": self.live_count,
+            "tombstones": self._count - self.live_count,
+            "dim": self.dim,
+            "dtype": self.dtype.name,
+            "quantization": self.quantization,
+            "coarse_dim": self.coarse_dim or None,
+            "index": "hnsw" if self._use_hnsw else "flat",
+        }
+
+
+def read_vectors(path: Path = LOCAL_VECTOR_STORE_DIR, limit: Optional[int] = None) -> np.ndarray:
+    """
+    Live full-precision vectors of a LocalVectorStore directory, as float32.
+
+    Reads the files directly (no embedding model is loaded), e.g. for
+    offline benchmarks.
+    """
+    db = sqlite3.connect(str(path / "nodes.db"))
+    try:
+        meta = dict(db.execute("SELECT key, value FROM store_meta"))
+        if "dim" not in meta:
+            return np.zeros((0, 0), dtype=np.float32)
+        query = "SELECT row FROM nodes WHERE deleted = 0 ORDER BY row"
+        rows = np.asarray([r for (r,) in db.execute(query)], dtype=np.int64)
+    finally:
+        db.close()
+    if limit:
+        rows = rows[:limit]
+    dtype = np.dtype(meta["dtype"])
+    file = path / f"vectors-{meta.get('generation', 0)}.{dtype.name}"
+    matrix = np.memmap(file, dtype=dtype, mode="r").reshape(-1, int(meta["dim"]))
+    return np.asarray(matrix[rows], dtype=np.float32)
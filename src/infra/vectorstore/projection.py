@@ -0,0 +1,60 @@
+import logging
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class DimensionReducer:
+    """
+    Linear map of embeddings onto `coarse_dim` dimensions for a cheap first
+    retrieval pass.
+
+    Matryoshka-trained models front-load information, so truncation alone
+    works for them; bge-large is not one. The reducer therefore projects
+    onto the top eigenvectors of the uncentered second-moment matrix of the
+    stored vectors (PCA without centering), which is the rank-`coarse_dim`
+    map that best preserves inner products on this corpus. With fewer than
+    `2 * coarse_dim` vectors to fit on, it falls back to plain truncation.
+    """
+
+    def __init__(self, components: np.ndarray) -> None:
+        """
+        Args:
+            components: (dim, coarse_dim) projection matrix.
+        """
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+
+    @property
+    def coarse_dim(self) -> int:
+        return self.components.shape[1]
+
+    @classmethod
+    def truncation(cls, dim: int, coarse_dim: int) -> "DimensionReducer":
+        return cls(np.eye(dim, coarse_dim, dtype=np.float32))
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, coarse_dim: int) -> "DimensionReducer":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dim = vectors.shape[1]
+        if coarse_dim >= dim:
+            raise ValueError(f"coarse_dim ({coarse_dim}) must be below the embedding dim ({dim}).")
+        if len(vectors) < 2 * coarse_dim:
+            return cls.truncation(dim, coarse_dim)
+        moment = vectors.T @ vectors / len(vectors)
+        eigenvalues, eigenvectors = np.linalg.eigh(moment)
+        top = np.argsort(eigenvalues)[::-1][:coarse_dim]
+        kept = float(eigenvalues[top].sum() / max(eigenvalues.sum(), 1e-12))
+        logger.info(f"Fitted {dim}→{coarse_dim} projection keeping {kept:.1%} of the energy.")
+        return cls(eigenvectors[:, top])
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float32) @ self.components
+
+    def save(self, path: Path) -> None:
+        np.save(path, self.components)
+
+    @classmethod
+    def load(cls, path: Path) -> "DimensionReducer":
+        return cls(np.load(path))
@@ -0,0 +1,8 @@
+from .jobs import JobStore
+from .schemas import IngestionJob, JobStatus
+
+__all__ = [
+    "IngestionJob",
+    "JobStatus",
+    "JobStore",
+]
@@ -0,0 +1,181 @@
+"""
+Command-line bulk ingestion.
+
+    python -m src.ingestion.cli ingest data/papers/ report.pdf
+    python -m src.ingestion.cli watch data/inbox --interval 5
+    python -m src.ingestion.cli bench-embed data/papers/ --device cpu
+"""
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+from src.infra.registry import get_registry
+from src.utils.logging import setup_logging
+from .schemas import JobStatus
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_SUFFIXES = {".pdf", ".txt", ".md", ".docx", ".pptx", ".html"}
+
+
+def _iter_files(paths: Iterable[Path]) -> List[Path]:
+    files: List[Path] = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(
+                p for p in sorted(path.rglob("*"))
+                if p.is_file() and p.suffix.lower() in SUPPORTED_SUFFIXES
+            )
+        elif path.is_file():
+            files.append(path)
+        else:
+            logger.warning(f"Skipping '{path}': not a file or directory.")
+    return files
+
+
+def _wait_for(job_ids: List[int], poll_seconds: float = 2.0) -> None:
+    jobs = get_registry().ingestion_pipeline().jobs
+    pending = set(job_ids)
+    while pending:
+        time.sleep(poll_seconds)
+        for job_id in list(pending):
+            job = jobs.get(job_id)
+            if job is None or job.status not in JobStatus.ACTIVE:
+                pending.discard(job_id)
+                if job is not None:
+                    detail = f" ({job.error})" if job.error else ""
+                    print(f"[{job.status}] {job.filename}: {job.chunks_processed} chunks{detail}")
+
+
+def ingest(paths: List[Path], wait: bool = True) -> None:
+    pipeline = get_registry().ingestion_pipeline()
+    files = _iter_files(paths)
+    if not files:
+        print("No files to ingest.")
+        return
+
+    batch_id = None
+    job_ids = []
+    for path in files:
+        job = pipeline.submit_path(path, batch_id)
+        batch_id = job.batch_id
+        job_ids.append(job.id)
+    print(f"Queued {len(job_ids)} files as batch {batch_id}.")
+
+    if wait:
+        _wait_for(job_ids)
+
+
+def watch(directory: Path, interval: float) -> None:
+    """
+    Poll `directory` and queue every new supported file once its size has
+    been stable for one full interval (i.e. it has finished being copied).
+    """
+    pipeline = get_registry().ingestion_pipeline()
+    submitted: Set[Path] = set()
+    last_seen: Dict[Path, Tuple[int, float]] = {}
+    print(f"Watching '{directory}' every {interval:.0f}s. Ctrl+C to stop.")
+
+    while True:
+        for path in _iter_files([directory]):
+            if path in submitted:
+                continue
+            stat = path.stat()
+            signature = (stat.st_size, stat.st_mtime)
+            if last_seen.get(path) == signature:
+                job = pipeline.submit_path(path)
+                submitted.add(path)
+                print(f"Queued '{path.name}' as job {job.id}.")
+            else:
+                last_seen[path] = signature
+        time.sleep(interval)
+
+
+def _load_chunk_texts(paths: List[Path], limit: int) -> List[str]:
+    from llama_index.core.node_parser import MarkdownNodeParser
+    from llama_index.core.schema import Document as LlamaDocument
+    from llama_index.core.schema import MetadataMode
+
+    from src.documents.loader import load_document
+
+    docs: List[LlamaDocument] = []
+    for path in _iter_files(paths):
+        if path.suffix.lower() in {".md", ".txt"}:
+            docs.append(LlamaDocument(text=path.read_text(errors="ignore")))
+        else:
+            docs.extend(load_document(str(path)))
+    nodes = MarkdownNodeParser().get_nodes_from_documents(docs)
+    texts = [n.get_content(metadata_mode=MetadataMode.EMBED) for n in nodes]
+    return texts[:limit] if limit else texts
+
+
+def bench_embed(paths: List[Path], device: str, token_budget: int, limit: int) -> None:
+    """Chunks/sec and tokens/sec of token-budgeted vs fixed-size batching."""
+    from src.config.settings import EMBED_MAX_BATCH
+    from src.infra.embeddings.scheduler import EmbeddingScheduler
+    from src.infra.embeddings.sentence_transformer import get_embedding_model
+
+    texts = _load_chunk_texts(paths, limit)
+    if not texts:
+        print("No chunks to embed.")
+        return
+
+    scheduler = EmbeddingScheduler(
+        get_embedding_model(device=device),
+        max_tokens_per_batch=token_budget,
+        max_batch_size=EMBED_MAX_BATCH,
+    )
+    report = scheduler.benchmark(texts)
+    report["device"] = device
+    print(json.dumps(report, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk document ingestion.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest_cmd = sub.add_parser("ingest", help="Ingest files and/or directories.")
+    ingest_cmd.add_argument("paths", nargs="+", type=Path)
+    ingest_cmd.add_argument(
+        "--no-wait", action="store_true", help="Return once the files are queued."
+    )
+
+    watch_cmd = sub.add_parser("watch", help="Continuously ingest new files in a directory.")
+    watch_cmd.add_argument("directory", type=Path)
+    watch_cmd.add_argument("--interval", type=float, default=5.0)
+
+    bench_cmd = sub.add_parser(
+        "bench-embed", help="Benchmark document embedding throughput on a corpus."
+    )
+    bench_cmd.add_argument("paths", nargs="+", type=Path)
+    bench_cmd.add_argument("--device", default="cpu")
+    bench_cmd.add_argument("--token-budget", type=int, default=None)
+    bench_cmd.add_argument("--limit", type=int, default=0, help="Max chunks (0 = all).")
+
+    args = parser.parse_args()
+    setup_logging()
+    if args.command == "bench-embed":
+        from src.config.settings import EMBED_TOKEN_BUDGET
+
+        bench_embed(args.paths, args.device, args.token_budget or EMBED_TOKEN_BUDGET, args.limit)
+        return
+
+    registry = get_registry()
+    registry.warm_up()
+
+    try:
+        if args.command == "ingest":
+            ingest(args.paths, wait=not args.no_wait)
+        else:
+            watch(args.directory, args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        registry.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import or_
+from sqlmodel import col, select, update
+
+from src.documents.schemas import Document
+from src.infra.db.session import get_session
+from .schemas import IngestionJob, JobStatus
+
+
+_IN_FLIGHT = (JobStatus.PARSING, JobStatus.EMBEDDING)
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class JobStore:
+    """
+    Persistence for ingestion jobs. Every call uses its own short session.
+
+    Several pipelines (API, UI, CLI) may share the table: a job is only
+    processed by the pipeline that claimed it, and only jobs whose claim
+    has lapsed are requeued.
+    """
+
+    def create(
+        self,
+        batch_id: str,
+        filename: str,
+        staged_path: str,
+        content_hash: str,
+        **fields: Any,
+    ) -> IngestionJob:
+        with get_session() as session:
+            job = IngestionJob(
+                batch_id=batch_id,
+                filename=filename,
+                staged_path=staged_path,
+                content_hash=content_hash,
+                **fields,
+            )
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            return job
+
+    def get(self, job_id: int) -> Optional[IngestionJob]:
+        with get_session() as session:
+            return session.get(IngestionJob, job_id)
+
+    def list_batch(self, batch_id: str) -> List[IngestionJob]:
+        with get_session() as session:
+            statement = (
+                select(IngestionJob)
+                .where(IngestionJob.batch_id == batch_id)
+                .order_by(IngestionJob.id)  # type: ignore[arg-type]
+            )
+            return list(session.exec(statement).all())
+
+    def next_queued(self, limit: int) -> List[IngestionJob]:
+        with get_session() as session:
+            statement = (
+                select(IngestionJob)
+                .where(IngestionJob.status == JobStatus.QUEUED)
+                .order_by(IngestionJob.id)  # type: ignore[arg-type]
+                .limit(limit)
+            )
+            return list(session.exec(statement).all())
+
+    def claim(self, job_id: int, owner: str, lease_seconds: float) -> bool:
+        """
+        Atomically move a QUEUED job to PARSING for `owner`.
+
+        Returns:
+            False if the job is no longer queued (another pipeline claimed it).
+        """
+        now = _now()
+        with get_session() as session:
+            result = session.exec(
+                update(IngestionJob)
+                .where(IngestionJob.id == job_id, IngestionJob.status == JobStatus.QUEUED)
+                .values(
+                    status=JobStatus.PARSING,
+                    owner=owner,
+                    lease_expires_at=now + datetime.timedelta(seconds=lease_seconds),
+                    updated_at=now,
+                )
+            )
+            session.commit()
+            return result.rowcount == 1
+
+    def renew(self, owner: str, lease_seconds: float) -> None:
+        """Extend the claim on every in-flight job of `owner`."""
+        with get_session() as session:
+            session.exec(
+                update(IngestionJob)
+                .where(IngestionJob.owner == owner, col(IngestionJob.status).in_(_IN_FLIGHT))
+                .values(lease_expires_at=_now() + datetime.timedelta(seconds=lease_seconds))
+            )
+            session.commit()
+
+    def update(self, job_id: int, **fields: Any) -> None:
+        with get_session() as session:
+            job = session.get(IngestionJob, job_id)
+            if job is None:
+                return
+            for key, value in fields.items():
+                setattr(job, key, value)
+            job.updated_at = datetime.datetime.now(datetime.timezone.utc)
+            session.add(job)
+            session.commit()
+
+    def requeue_interrupted(self) -> int:
+        """
+        Put in-flight jobs whose claim lapsed (their pipeline stopped or
+        died) back in the queue. Jobs another live pipeline is working on
+        are left alone.
+
+        A job whose Document is already registered (EMBEDDING, or PARSING
+        interrupted right after registration) no longer has a staged file:
+        it moved into the document store. Such jobs are pointed at the
+        stored file and keep their `document_id`, so the pipeline re-chunks
+        and embeds the existing Document instead of creating a new one.
+        """
+        now = _now()
+        lapsed = (
+            col(IngestionJob.status).in_(_IN_FLIGHT),
+            or_(
+                col(IngestionJob.lease_expires_at).is_(None),
+                col(IngestionJob.lease_expires_at) < now,
+            ),
+        )
+        requeued = 0
+        with get_session() as session:
+            for job in session.exec(select(IngestionJob).where(*lapsed)).all():
+                document = None
+                if job.document_id is not None:
+                    document = session.get(Document, job.document_id)
+                elif not (job.staged_path and Path(job.staged_path).exists()):
+                    document = session.exec(
+                        select(Document).where(Document.hash == job.content_hash)
+                    ).first()
+                values: Dict[str, Any] = {
+                    "status": JobStatus.QUEUED,
+                    "owner": None,
+                    "lease_expires_at": None,
+                    "updated_at": now,
+                }
+                if document is not None:
+                    values.update(document_id=document.id, staged_path=document.path)
+                # Conditional, so a claim renewed in the meantime wins.
+                result = session.exec(
+                    update(IngestionJob).where(IngestionJob.id == job.id, *lapsed).values(**values)
+                )
+                requeued += result.rowcount
+            session.commit()
+        return requeued
@@ -0,0 +1,405 @@
+import logging
+import multiprocessing
+import os
+import queue
+import socket
+import threading
+import uuid
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from llama_index.core.schema import Document as LlamaDocument
+from llama_index.core.schema import TextNode
+from sqlalchemy.exc import IntegrityError
+
+from src.config.settings import INGEST_JOB_LEASE_SECONDS, INGEST_STAGING_DIR
+from src.documents.schemas import Document
+from src.documents.service import DocumentService
+from src.documents.storage import commit_to_store, spool_upload
+from src.infra.db.session import get_session
+from .jobs import JobStore
+from .schemas import IngestionJob, JobStatus
+
+logger = logging.getLogger(__name__)
+
+# Set in each parse worker by `_init_worker`.
+_worker_threads: Optional[int] = None
+
+
+def _init_worker(num_threads: int) -> None:
+    """Keep each parse process from claiming every core for itself."""
+    global _worker_threads
+    _worker_threads = num_threads
+    os.environ["OMP_NUM_THREADS"] = str(num_threads)
+    try:
+        import torch
+
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+
+
+def _parse_file(path: str) -> Tuple[List[LlamaDocument], Dict[str, float]]:
+    """
+    Runs in a worker process: Docling conversion. The converter is cached
+    per process, so models load once per worker.
+    """
+    from src.documents.loader import load_document_with_timings
+
+    return load_document_with_timings(path, num_threads=_worker_threads)
+
+
+class BulkIngestionPipeline:
+    """
+    Parallel, bounded, three-stage ingestion pipeline backed by a job table.
+
+        dispatcher ──> [parse pool: N processes running Docling]
+                   ──> chunker  (dedup, MarkdownNodeParser, Document record)
+                   ──> embedder (cross-file batches into the vector store)
+
+    Stages are connected by bounded queues and the number of files being
+    parsed at once is capped, so memory stays flat however many files are
+    queued. Job state lives in the `ingestionjob` table: it can be polled
+    while the pipeline runs, and jobs interrupted by a restart are resumed.
+    Pipelines of other processes (API, UI, CLI) may share the table: each
+    job is claimed by one of them, and the claim is renewed while it runs.
+    """
+
+    def __init__(
+        self,
+        retrieval_service,
+        parse_workers: int = 2,
+        queue_size: int = 4,
+        embed_batch_nodes: int = 256,
+        staging_dir: Path = INGEST_STAGING_DIR,
+        lease_seconds: float = INGEST_JOB_LEASE_SECONDS,
+    ) -> None:
+        """
+        Args:
+            retrieval_service: Shared RetrievalService used to persist nodes.
+            parse_workers:     Docling worker processes.
+            queue_size:        Max files in flight per stage.
+            embed_batch_nodes: Nodes accumulated (across files) per insert.
+            staging_dir:       Where uploads wait until they are processed.
+            lease_seconds:     How long a claim on a job holds without renewal.
+        """
+        self.retrieval_service = retrieval_service
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        self.embed_batch_nodes = embed_batch_nodes
+        self.staging_dir = staging_dir
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.jobs = JobStore()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._parse_slots = threading.Semaphore(queue_size)
+        self._parsed: "queue.Queue[Optional[Tuple[IngestionJob, Future]]]" = queue.Queue(
+            maxsize=queue_size
+        )
+        self._chunked: "queue.Queue[Optional[Tuple[IngestionJob, List[TextNode]]]]" = (
+            queue.Queue(maxsize=queue_size)
+        )
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+
+    # ------------------------------------------------------------------ #
+    #  Lifecycle                                                           #
+    # ------------------------------------------------------------------ #
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._pool is not None:
+                return
+
+            resumed = self.jobs.requeue_interrupted()
+            if resumed:
+                logger.info(f"Resuming {resumed} interrupted ingestion jobs.")
+
+            threads_per_worker = max(1, (os.cpu_count() or 2) // self.parse_workers)
+            # spawn: forked children would inherit torch / Chroma state.
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.parse_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(threads_per_worker,),
+            )
+            for name, target in (
+                ("dispatch", self._dispatch_loop),
+                ("chunk", self._chunk_loop),
+                ("embed", self._embed_loop),
+                ("lease", self._lease_loop),
+            ):
+                thread = threading.Thread(
+                    target=target, name=f"rag-ingest-{name}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            self._wake.set()
+
+    def stop(self) -> None:
+        """
+        Stop the pipeline for good. Jobs still in flight stay in the table and
+        are resumed by the next pipeline started against this database.
+        """
+        with self._start_lock:
+            if self._pool is None:
+                return
+            self._stop.set()
+            self._wake.set()
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # ------------------------------------------------------------------ #
+    #  Submission                                                          #
+    # ------------------------------------------------------------------ #
+
+    def submit(
+        self, file_stream: BinaryIO, filename: str, batch_id: Optional[str] = None
+    ) -> IngestionJob:
+        """
+        Stage an upload and queue it. Returns immediately with the job.
+
+        The upload is hashed while it is spooled; content that is already in
+        the knowledge base is recorded as skipped without reaching Docling.
+        """
+        batch_id = batch_id or uuid.uuid4().hex
+        staged_path, content_hash, _ = spool_upload(
+            file_stream, suffix=Path(filename).suffix.lower(), spool_dir=self.staging_dir
+        )
+
+        with get_session() as session:
+            existing = DocumentService(session).find_by_hash(content_hash)
+        if existing:
+            staged_path.unlink(missing_ok=True)
+            return self.jobs.create(
+                batch_id,
+                filename,
+                "",
+                content_hash,
+                status=JobStatus.SKIPPED,
+                document_id=existing.id,
+                error="Duplicate of an already ingested document.",
+            )
+
+        job = self.jobs.create(batch_id, filename, str(staged_path), content_hash)
+        self.start()
+        self._wake.set()
+        return job
+
+    def submit_path(self, path: Path, batch_id: Optional[str] = None) -> IngestionJob:
+        with open(path, "rb") as stream:
+            return self.submit(stream, path.name, batch_id)
+
+    # ------------------------------------------------------------------ #
+    #  Stages                                                              #
+    # ------------------------------------------------------------------ #
+
+    def _dispatch_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(timeout=1.0)
+            self._wake.clear()
+
+            while not self._stop.is_set():
+                jobs = self.jobs.next_queued(limit=self.queue_size)
+                if not jobs:
+                    break
+                for job in jobs:
+                    # Blocks while `queue_size` files are already in flight.
+                    while not self._parse_slots.acquire(timeout=1.0):
+                        if self._stop.is_set():
+                            return
+                    pool = self._pool
+                    if pool is None:
+                        return
+                    if not self.jobs.claim(job.id, self.owner, self.lease_seconds):
+                        # Another pipeline sharing the database took it.
+                        self._parse_slots.release()
+                        continue
+                    self._parsed.put((job, pool.submit(_parse_file, job.staged_path)))
+
+        self._parsed.put(None)
+
+    def _lease_loop(self) -> None:
+        """Keep this pipeline's claims alive; take over jobs whose claim lapsed."""
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                self.jobs.renew(self.owner, self.lease_seconds)
+                requeued = self.jobs.requeue_interrupted()
+            except Exception:
+                logger.exception("Could not renew ingestion job claims.")
+                continue
+            if requeued:
+                logger.info(f"Requeued {requeued} ingestion jobs abandoned by another pipeline.")
+                self._wake.set()
+
+    def _chunk_loop(self) -> None:
+        while True:
+            item = self._parsed.get()
+            if item is None:
+                self._chunked.put(None)
+                return
+
+            job, future = item
+            try:
+                llama_docs, timings = future.result()
+            except CancelledError:
+                # stop() cancelled it before a worker picked it up.
+                self._release(job)
+                continue
+            except Exception as e:
+                if self._stop.is_set():
+                    # The pool was torn down under it; not the file's fault.
+                    self._release(job)
+                else:
+                    self._fail(job, f"Docling failed: {e}")
+                continue
+            finally:
+                self._parse_slots.release()
+
+            try:
+                nodes = self._register(job, llama_docs, timings)
+            except Exception as e:
+                self._fail(job, str(e))
+                continue
+
+            if nodes:
+                self._chunked.put((job, nodes))
+
+    def _register(
+        self,
+        job: IngestionJob,
+        llama_docs: List[LlamaDocument],
+        timings: Dict[str, float],
+    ) -> List[TextNode]:
+        """Dedup, move into permanent storage and create the Document record."""
+        if job.document_id is not None:
+            return self._resume(job, llama_docs)
+
+        staged = Path(job.staged_path)
+        content_hash = job.content_hash
+        with get_session() as session:
+            doc_service = DocumentService(session)
+            existing = doc_service.find_by_hash(content_hash)
+            if existing:
+                staged.unlink(missing_ok=True)
+                self._skip_duplicate(job, existing.id)
+                return []
+
+            permanent_path = commit_to_store(staged, content_hash, job.filename)
+
+            document = Document(
+                path=str(permanent_path), doc_metadata={"filename": job.filename}
+            )
+            try:
+                nodes = doc_service.register(document, llama_docs, content_hash, timings)
+            except IntegrityError:
+                # Lost the race to a concurrent upload of the same content;
+                # the stored file belongs to that document now.
+                existing = doc_service.find_by_hash(content_hash)
+                if existing is None:
+                    raise
+                self._skip_duplicate(job, existing.id)
+                return []
+            except Exception:
+                permanent_path.unlink(missing_ok=True)
+                raise
+
+            if not nodes:
+                permanent_path.unlink(missing_ok=True)
+                self.jobs.update(job.id, status=JobStatus.SKIPPED, error="No content.")
+                return []
+
+            self.jobs.update(
+                job.id,
+                status=JobStatus.EMBEDDING,
+                document_id=document.id,
+                chunks_processed=len(nodes),
+            )
+            job.document_id = document.id
+            return nodes
+
+    def _skip_duplicate(self, job: IngestionJob, document_id: int) -> None:
+        self.jobs.update(
+            job.id,
+            status=JobStatus.SKIPPED,
+            document_id=document_id,
+            error="Duplicate of an already ingested document.",
+        )
+
+    def _resume(self, job: IngestionJob, llama_docs: List[LlamaDocument]) -> List[TextNode]:
+        """Re-chunk the already registered Document of an interrupted job."""
+        with get_session() as session:
+            nodes = DocumentService(session).rechunk(job.document_id, llama_docs)
+        # Drop whatever part of the interrupted insert did land.
+        self.retrieval_service.delete_document(job.document_id)
+        self.jobs.update(job.id, status=JobStatus.EMBEDDING, chunks_processed=len(nodes))
+        logger.info(f"Resumed ingestion job {job.id} for document {job.document_id}.")
+        return nodes
+
+    def _embed_loop(self) -> None:
+        done = False
+        while not done:
+            item = self._chunked.get()
+            if item is None:
+                return
+
+            # Merge whatever else is already waiting into one insert.
+            batch = [item]
+            total = len(item[1])
+            while total < self.embed_batch_nodes:
+                try:
+                    extra = self._chunked.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is None:
+                    done = True
+                    break
+                batch.append(extra)
+                total += len(extra[1])
+
+            try:
+                self.retrieval_service.add_nodes([n for _, nodes in batch for n in nodes])
+            except Exception as e:
+                for job, _ in batch:
+                    self._fail(job, f"Embedding failed: {e}")
+                continue
+
+            for job, _ in batch:
+                self.jobs.update(job.id, status=JobStatus.DONE)
+            logger.info(f"Bulk ingestion: embedded {total} chunks from {len(batch)} files.")
+
+    # ------------------------------------------------------------------ #
+    #  Failure handling                                                    #
+    # ------------------------------------------------------------------ #
+
+    def _release(self, job: IngestionJob) -> None:
+        """
+        Hand an unfinished job back to the queue, files untouched, for the
+        next pipeline started against this database.
+        """
+        logger.info(f"Ingestion job {job.id} ('{job.filename}') interrupted by shutdown.")
+        self.jobs.update(job.id, status=JobStatus.QUEUED, owner=None, lease_expires_at=None)
+
+    def _fail(self, job: IngestionJob, error: str) -> None:
+        logger.error(f"Ingestion job {job.id} ('{job.filename}') failed: {error}")
+        if job.document_id is not None:
+            # The file now belongs to the Document record; removing the
+            # record removes it too.
+            self._discard_document(job)
+        elif job.staged_path:
+            Path(job.staged_path).unlink(missing_ok=True)
+        self.jobs.update(job.id, status=JobStatus.FAILED, error=error)
+
+    def _discard_document(self, job: IngestionJob) -> None:
+        """Undo the Document record (and any vectors) so the file can be re-submitted."""
+        try:
+            self.retrieval_service.delete_document(job.document_id)
+            with get_session() as session:
+                DocumentService(session).delete_document(job.document_id)
+        except Exception:
+            logger.exception(f"Could not discard document {job.document_id}.")
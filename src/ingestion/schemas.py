@@ -0,0 +1,40 @@
+import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+
+class JobStatus:
+    QUEUED = "queued"
+    PARSING = "parsing"
+    EMBEDDING = "embedding"
+    DONE = "done"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+    ACTIVE = (QUEUED, PARSING, EMBEDDING)
+
+
+class IngestionJob(SQLModel, table=True):
+    """One file submitted to the bulk ingestion pipeline."""
+
+    __table_args__ = {"extend_existing": True}
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    batch_id: str = Field(index=True, max_length=64)
+    filename: str = Field(max_length=255)
+    staged_path: str
+    content_hash: str = Field(index=True, max_length=64)
+    status: str = Field(default=JobStatus.QUEUED, index=True, max_length=20)
+    document_id: Optional[int] = None
+    chunks_processed: int = 0
+    error: Optional[str] = None
+    # Pipeline working on the job and until when its claim holds (see JobStore.claim).
+    owner: Optional[str] = Field(default=None, max_length=64)
+    lease_expires_at: Optional[datetime.datetime] = None
+    created_at: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc)
+    )
+    updated_at: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc)
+    )
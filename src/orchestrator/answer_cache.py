@@ -0,0 +1,280 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+from src.retrieval.analysis_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Words that make a question lean on earlier turns ("what about its
+# limitations?", "explain that in more detail").
+_FOLLOW_UP = re.compile(
+    r"\b(it|its|they|them|their|this|that|these|those|he|she|his|her|"
+    r"above|previous|previously|earlier|before|again|also|else|more|same|"
+    r"you said|you mentioned|elaborate|continue|go on|what about|how about)\b",
+    re.IGNORECASE,
+)
+
+
+def is_conversation_independent(query: str, has_history: bool) -> bool:
+    """
+    Whether the answer to `query` can be shared across conversations.
+
+    The first message of a conversation has no history to depend on. Later
+    messages qualify only if they contain no follow-up or anaphoric wording;
+    the check is deliberately conservative, a false negative only costs a
+    cache miss.
+    """
+    return not has_history or _FOLLOW_UP.search(query) is None
+
+
+class SemanticAnswerCache:
+    """
+    Persistent cache of generated answers, matched on query similarity.
+
+    Entries are stamped with the document catalog version and a scope (LLM
+    model + retrieval options); a lookup only considers entries of the
+    current version and the same scope, so any ingest, update or delete
+    makes every earlier answer unreachable. Stale versions are evicted
+    first once the table is full, then the least recently used entries.
+
+    A lookup first tries the normalized query text, which needs no
+    embedding, then the nearest cached query by cosine similarity of the
+    query embeddings. The embeddings of the current version are kept in
+    memory as one matrix, so matching is a single matrix-vector product.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        embed_model: BaseEmbedding,
+        threshold: float = 0.95,
+        max_entries: int = 5000,
+        ttl_seconds: float = 7 * 24 * 3600,
+    ) -> None:
+        """
+        Args:
+            db_path:     SQLite file holding the answers.
+            embed_model: Query embedding model (shares its query vector cache
+                         with retrieval).
+            threshold:   Minimum cosine similarity between the new and the
+                         cached query for a hit.
+            max_entries: Max cached answers across all versions.
+            ttl_seconds: Age past which an entry is no longer served.
+        """
+        self.embed_model = embed_model
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS answer_cache ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " corpus_version TEXT NOT NULL, scope TEXT NOT NULL,"
+            " query TEXT NOT NULL, normalized TEXT NOT NULL, embedding BLOB NOT NULL,"
+            " response TEXT NOT NULL, sources TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_used REAL NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS ix_answer_cache_version"
+            " ON answer_cache (corpus_version, scope);"
+            "CREATE INDEX IF NOT EXISTS ix_answer_cache_last_used"
+            " ON answer_cache (last_used);"
+        )
+        self._db.commit()
+        self._count = self._db.execute("SELECT COUNT(*) FROM answer_cache").fetchone()[0]
+
+        # In-memory view of the entries of `_version`.
+        self._version: Optional[str] = None
+        self._ids: List[int] = []
+        self._scopes: List[str] = []
+        self._created: List[float] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        # (scope, normalized query) → position in the view.
+        self._exact: Dict[Tuple[str, str], int] = {}
+
+    def _embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embed_model.get_query_embedding(query), dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _load(self, corpus_version: str) -> None:
+        """(Re)build the in-memory view for `corpus_version` (lock held)."""
+        rows = self._db.execute(
+            "SELECT id, scope, normalized, embedding, created_at FROM answer_cache"
+            " WHERE corpus_version = ? AND created_at > ? ORDER BY id",
+            (corpus_version, time.time() - self.ttl_seconds),
+        ).fetchall()
+        self._version = corpus_version
+        self._ids = [r[0] for r in rows]
+        self._scopes = [r[1] for r in rows]
+        self._created = [r[4] for r in rows]
+        self._exact = {(r[1], r[2]): i for i, r in enumerate(rows)}
+        self._matrix = (
+            np.stack([np.frombuffer(r[3], dtype=np.float32) for r in rows])
+            if rows
+            else np.zeros((0, 0), dtype=np.float32)
+        )
+        logger.debug(f"Answer cache: loaded {len(rows)} entries for version {corpus_version[:8]}.")
+
+    def _match(
+        self, normalized: str, scope: str, vector: Optional[np.ndarray]
+    ) -> Optional[Tuple[int, float]]:
+        """(entry id, similarity) of the best live entry, or None (lock held)."""
+        deadline = time.time() - self.ttl_seconds
+        index = self._exact.get((scope, normalized))
+        if index is not None and self._created[index] > deadline:
+            return self._ids[index], 1.0
+        if vector is None or not self._ids:
+            return None
+
+        scores = self._matrix @ vector
+        for i in np.argsort(-scores):
+            if scores[i] < self.threshold:
+                break
+            if self._scopes[i] == scope and self._created[i] > deadline:
+                return self._ids[i], float(scores[i])
+        return None
+
+    def lookup(self, query: str, corpus_version: str, scope: str) -> Optional[Dict[str, Any]]:
+        """
+        The cached answer to `query` (or a near-duplicate of it).
+
+        Returns:
+            {"query", "response", "sources", "similarity"} of the matched
+            entry, or None on a miss.
+        """
+        normalized = normalize_query(query)
+        with self._lock:
+            if self._version != corpus_version:
+                self._load(corpus_version)
+            match = self._match(normalized, scope, None)
+            empty = not self._ids
+        if match is None and not empty:
+            # Embed outside the lock; the vector is memoized for retrieval.
+            vector = self._embed(query)
+            with self._lock:
+                if self._version != corpus_version:
+                    self._load(corpus_version)
+                match = self._match(normalized, scope, vector)
+
+        with self._lock:
+            row = None
+            if match is not None:
+                row = self._db.execute(
+                    "SELECT query, response, sources FROM answer_cache WHERE id = ?",
+                    (match[0],),
+                ).fetchone()
+                if row is None:
+                    # Evicted by another process; drop the stale view.
+                    self._load(corpus_version)
+            if row is None:
+                self.misses += 1
+                return None
+
+            entry_id, similarity = match
+            self._db.execute(
+                "UPDATE answer_cache SET hits = hits + 1, last_used = ? WHERE id = ?",
+                (time.time(), entry_id),
+            )
+            self._db.commit()
+            self.hits += 1
+            if similarity < 1.0:
+                self.semantic_hits += 1
+
+        logger.info(f"Answer cache hit (similarity {similarity:.3f}) for: {query[:60]}")
+        return {
+            "query": row[0],
+            "response": row[1],
+            "sources": json.loads(row[2]),
+            "similarity": similarity,
+        }
+
+    def put(
+        self,
+        query: str,
+        corpus_version: str,
+        scope: str,
+        response: str,
+        sources: List[Dict[str, Any]],
+    ) -> None:
+        vector = self._embed(query)
+        normalized = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            if self._version != corpus_version:
+                self._load(corpus_version)
+            index = self._exact.get((scope, normalized))
+            if index is not None and self._created[index] > now - self.ttl_seconds:
+                return
+            cursor = self._db.execute(
+                "INSERT INTO answer_cache (corpus_version, scope, query, normalized,"
+                " embedding, response, sources, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    corpus_version, scope, query, normalized, vector.tobytes(),
+                    response, json.dumps(sources, default=str), now, now,
+                ),
+            )
+            self._count += 1
+            entry_id = cursor.lastrowid
+            self._ids.append(entry_id)
+            self._scopes.append(scope)
+            self._created.append(now)
+            self._exact[(scope, normalized)] = len(self._ids) - 1
+            self._matrix = (
+                np.vstack([self._matrix, vector[None, :]]) if len(self._matrix) else vector[None, :]
+            )
+            if self._count > self.max_entries:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        """Drop other versions, expired, then least recently used entries down to 90%."""
+        self._db.execute(
+            "DELETE FROM answer_cache WHERE corpus_version != ? OR created_at <= ?",
+            (self._version, time.time() - self.ttl_seconds),
+        )
+        self._count = self._db.execute("SELECT COUNT(*) FROM answer_cache").fetchone()[0]
+        excess = self._count - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM answer_cache WHERE id IN ("
+                " SELECT id FROM answer_cache ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self._count -= excess
+        logger.info(f"Answer cache: evicted down to {self._count} entries.")
+        self._load(self._version)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM answer_cache")
+            self._db.commit()
+            self._count = 0
+            self._version = None
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
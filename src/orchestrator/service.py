@@ -1,16 +1,25 @@
+import asyncio
+import json
 import logging
 import os
-import shutil
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session
 
 from src.config import settings
-from src.config.settings import DOCUMENTS_DIR
-from src.conversation.manager import ConversationManager
+from src.conversation.manager import AsyncConversationManager, ConversationManager
 from src.documents.schemas import Document
+from src.documents.loader import load_document_with_timings
 from src.documents.service import DocumentService
+from src.documents.storage import commit_to_store, spool_upload
 from src.infra.llm import OllamaLLM
+from src.orchestrator.answer_cache import SemanticAnswerCache, is_conversation_independent
+from src.retrieval.context_packer import ContextPacker
 from src.retrieval.service import RetrievalService
+from src.utils.concurrency import run_blocking
+from src.utils.exceptions import InvalidRequestException, ResourceNotFoundException
 
 logger = logging.getLogger(__name__)
 
@@ -23,34 +32,59 @@ class OrchestratorService:
         conv_manager: ConversationManager,
         retrieval_service: RetrievalService,
         llm: OllamaLLM,
+        aconv_manager: Optional[AsyncConversationManager] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        context_packer: Optional[ContextPacker] = None,
     ):
         self.session = session
         self.doc_service = doc_service
         self.conv_manager = conv_manager
         self.retrieval_service = retrieval_service
         self.llm = llm
+        self.aconv_manager = aconv_manager
+        self.answer_cache = answer_cache
+        self.context_packer = context_packer or ContextPacker()
 
     def ingest_file(self, file_stream, filename: str) -> dict:
         logger.info(f"Starting ingestion for file: {filename}")
-        permanent_path = DOCUMENTS_DIR / filename
 
+        # Hash while spooling, then dedup before anything touches the store
+        # or Docling: a re-upload (even under another name) costs one read.
         try:
-            with open(permanent_path, "xb") as buffer:
-                shutil.copyfileobj(file_stream, buffer)
-        except FileExistsError:
-            raise IOError(f"A file named '{filename}' already exists. Please delete the existing document first before re-uploading.")
+            tmp_path, content_hash, size = spool_upload(file_stream)
         except Exception as e:
-            if permanent_path.exists():
-                os.remove(permanent_path)
+            raise IOError(f"Failed to save file to storage: {str(e)}")
+
+        try:
+            existing = self.doc_service.find_by_hash(content_hash)
+            if existing:
+                tmp_path.unlink(missing_ok=True)
+                return self._duplicate(existing, filename)
+            permanent_path = commit_to_store(tmp_path, content_hash, filename)
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
             raise IOError(f"Failed to save file to storage: {str(e)}")
 
         try:
             doc = Document(
-                path=str(permanent_path), doc_metadata={"filename": filename}
+                path=str(permanent_path),
+                hash=content_hash,
+                doc_metadata={"filename": filename, "size_bytes": size},
             )
-            nodes = self.doc_service.ingest(doc)
+            try:
+                nodes = self.doc_service.ingest(doc)
+            except IntegrityError:
+                # A concurrent upload of the same content registered first;
+                # the stored file is now its file, so it stays.
+                existing = self.doc_service.find_by_hash(content_hash)
+                if existing is None:
+                    raise
+                return self._duplicate(existing, filename)
 
             if not nodes:
+                existing = self.doc_service.find_by_hash(content_hash)
+                if existing is not None:
+                    return self._duplicate(existing, filename)
                 logger.warning(f"No chunks generated for file: {filename}")
                 if permanent_path.exists():
                     os.remove(permanent_path)
@@ -71,11 +105,235 @@ class OrchestratorService:
                 os.remove(permanent_path)
             raise e
 
-    def chat(self, message: str, conversation_id: int | None) -> dict:
+    @staticmethod
+    def _duplicate(existing: Document, filename: str) -> dict:
+        logger.info(f"'{filename}' is identical to document {existing.id}. Skipping.")
+        return {"status": "duplicate", "document_id": existing.id, "chunks_processed": 0}
+
+    async def aingest_file(self, file_stream, filename: str) -> dict:
         """
-        Flow: User Query -> Vector Search -> History Context -> LLM Answer -> Save to DB
+        Non-blocking `ingest_file`: copying, hashing, Docling conversion and
+        embedding all run on the bounded executor instead of the event loop.
+        """
+        return await run_blocking(self.ingest_file, file_stream, filename)
+
+    def update_file(self, doc_id: int, file_stream, filename: str) -> dict:
+        """
+        Replace a document with a new version, re-embedding only what changed.
+
+        The new file is converted and chunked as usual, then diffed against
+        the stored per-chunk hashes: unchanged chunks keep their node ids and
+        embeddings, new or edited chunks are embedded and inserted, and
+        chunks that disappeared are deleted from the vector store.
+        """
+        logger.info(f"Starting update of document {doc_id} from file: {filename}")
+        document = self.session.get(Document, doc_id)
+        if not document:
+            raise ResourceNotFoundException(f"Document with ID {doc_id} not found.")
+
+        try:
+            tmp_path, content_hash, size = spool_upload(file_stream)
+        except Exception as e:
+            raise IOError(f"Failed to save file to storage: {str(e)}")
+
+        if content_hash == document.hash:
+            tmp_path.unlink(missing_ok=True)
+            return {"status": "unchanged", "document_id": doc_id}
+
+        existing = self.doc_service.find_by_hash(content_hash)
+        if existing:
+            tmp_path.unlink(missing_ok=True)
+            raise InvalidRequestException(
+                f"'{filename}' is identical to document {existing.id}."
+            )
+
+        old_path = Path(document.path)
+        permanent_path = commit_to_store(tmp_path, content_hash, filename)
+        added_ids: List[str] = []
+        try:
+            llama_docs, timings = load_document_with_timings(str(permanent_path))
+            added, removed, unchanged = self.doc_service.prepare_update(
+                doc_id, str(permanent_path), llama_docs, content_hash, timings
+            )
+
+            if removed is None:
+                # No chunk table yet: every node the store holds for the
+                # document is replaced (new ids never collide with them).
+                new_ids = {node.id_ for node in added}
+                removed = [
+                    i for i in self.retrieval_service.document_node_ids(doc_id) if i not in new_ids
+                ]
+            added_ids = [node.id_ for node in added]
+            self.retrieval_service.add_nodes(added)
+
+            document.doc_metadata = {**document.doc_metadata, "size_bytes": size}
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            # Old chunks are untouched until the commit; only the new ones
+            # must not linger under a document whose record was not updated.
+            if added_ids:
+                self.retrieval_service.delete_nodes(added_ids)
+            if isinstance(e, IntegrityError):
+                # Same content committed concurrently by another document,
+                # which now owns the stored file.
+                raise InvalidRequestException(
+                    f"'{filename}' is identical to another document."
+                ) from e
+            permanent_path.unlink(missing_ok=True)
+            raise
+
+        # Removed chunks go only once the new version is committed.
+        if removed:
+            try:
+                self.retrieval_service.delete_nodes(removed)
+            except Exception as e:
+                logger.error(f"Document {doc_id}: could not delete {len(removed)} stale chunks: {e}")
+
+        if old_path != permanent_path and old_path.exists():
+            os.remove(old_path)
+
+        logger.info(
+            f"Updated document {doc_id}: {len(added)} chunks embedded, "
+            f"{unchanged} reused."
+        )
+        return {
+            "status": "updated",
+            "document_id": doc_id,
+            "chunks_added": len(added),
+            "chunks_removed": len(removed),
+            "chunks_unchanged": unchanged,
+        }
+
+    async def aupdate_file(self, doc_id: int, file_stream, filename: str) -> dict:
+        """Non-blocking `update_file`, run on the bounded executor."""
+        return await run_blocking(self.update_file, doc_id, file_stream, filename)
+
+    # ------------------------------------------------------------------ #
+    #  Answer cache                                                        #
+    # ------------------------------------------------------------------ #
+
+    def _answer_key(
+        self,
+        message: str,
+        conversation_id: int | None,
+        retrieval_options: Optional[Dict[str, int]],
+    ) -> Optional[Tuple[str, str]]:
+        """
+        (corpus version, scope) under which the answer to `message` is
+        cached, or None if it must not be (no cache, or a follow-up that
+        depends on the conversation so far).
+        """
+        if self.answer_cache is None:
+            return None
+        if not is_conversation_independent(message, has_history=bool(conversation_id)):
+            return None
+        scope = json.dumps(
+            {
+                "model": self.llm.model,
+                "temperature": getattr(settings, "TEMPERATURE", 0.1),
+                **(retrieval_options or {}),
+            },
+            sort_keys=True,
+        )
+        return self.retrieval_service.catalog.version, scope
+
+    def _lookup_answer(
+        self,
+        message: str,
+        conversation_id: int | None,
+        retrieval_options: Optional[Dict[str, int]],
+    ) -> Tuple[Optional[Tuple[str, str]], Optional[Dict[str, Any]]]:
+        """(answer key, cached answer or None) for an incoming message."""
+        answer_key = self._answer_key(message, conversation_id, retrieval_options)
+        if answer_key is None:
+            return None, None
+        try:
+            return answer_key, self.answer_cache.lookup(message, *answer_key)
+        except Exception as e:
+            logger.warning(f"Answer cache lookup failed: {e}")
+            return answer_key, None
+
+    def _store_answer(
+        self,
+        message: str,
+        answer_key: Optional[Tuple[str, str]],
+        response_text: str,
+        sources: List[Dict[str, Any]],
+    ) -> None:
+        if answer_key is None or not response_text.strip():
+            return
+        try:
+            self.answer_cache.put(
+                message, *answer_key, response_text, sources
+            )
+        except Exception as e:
+            logger.warning(f"Answer cache store failed: {e}")
+
+    @staticmethod
+    def _cached_sources(cached: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [{**source, "cached": True} for source in cached["sources"]]
+
+    def _serve_cached(
+        self, message: str, conversation_id: int | None, cached: Dict[str, Any]
+    ) -> dict:
+        """Record a cache hit in the conversation and build the chat result."""
+        if not conversation_id:
+            conversation_id = self.conv_manager.create_conversation(title=message[:30]).id
+        self.conv_manager.add_turn(
+            conversation_id, message, cached["response"], assistant_metadata={"cached": True}
+        )
+        return {
+            "conversation_id": conversation_id,
+            "response": cached["response"],
+            "sources": self._cached_sources(cached),
+            "cached": True,
+        }
+
+    async def _aserve_cached(
+        self, message: str, conversation_id: int | None, cached: Dict[str, Any]
+    ) -> int:
+        """Async counterpart of `_serve_cached`; returns the conversation id."""
+        if not conversation_id:
+            conv = await self._aconv("create_conversation", title=message[:30])
+            conversation_id = conv.id
+        await self._aconv(
+            "add_turn",
+            conversation_id,
+            message,
+            cached["response"],
+            assistant_metadata={"cached": True},
+        )
+        return conversation_id
+
+    # ------------------------------------------------------------------ #
+    #  Chat                                                                #
+    # ------------------------------------------------------------------ #
+
+    def _pack_context(
+        self, message: str, final_docs: List[Dict[str, Any]]
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Context string for the LLM and the sources of what made it in,
+        each tagged with the number of its span in the context.
+        """
+        positions = self.doc_service.chunk_positions([doc["id"] for doc in final_docs])
+        spans = self.context_packer.pack(message, final_docs, positions)
+        return ContextPacker.render(spans), ContextPacker.attributed_sources(spans)
+
+    def _prepare_chat(
+        self,
+        message: str,
+        conversation_id: int | None,
+        retrieval_options: Optional[Dict[str, int]] = None,
+    ) -> Tuple[int, List[Dict[str, Any]], str, List[Dict[str, str]]]:
+        """
+        Conversation bookkeeping, retrieval, context packing and history
+        shared by chat paths.
+
+        Returns:
+            (conversation id, attributed sources, context string, history)
         """
-        logger.info(f"Processing chat message. Conversation ID: {conversation_id}")
         # 1. Manage Conversation
         if not conversation_id:
             conv = self.conv_manager.create_conversation(title=message[:30])
@@ -86,13 +344,38 @@ class OrchestratorService:
 
         # 2. Retrieve Context (delegated to RetrievalService)
         logger.info("Retrieving context via RetrievalService...")
-        final_docs = self.retrieval_service.retrieve(message)
+        final_docs = self.retrieval_service.retrieve(message, **(retrieval_options or {}))
 
-        context_str = "\n\n".join([doc["text"] for doc in final_docs])
+        context_str, sources = self._pack_context(message, final_docs)
 
         # 3. Get Conversation History
         history = self.conv_manager.get_context(conversation_id)
 
+        return conversation_id, sources, context_str, history
+
+    def chat(
+        self,
+        message: str,
+        conversation_id: int | None,
+        retrieval_options: Optional[Dict[str, int]] = None,
+    ) -> dict:
+        """
+        Flow: User Query -> Vector Search -> History Context -> LLM Answer -> Save to DB
+
+        `retrieval_options` (coarse_k / limit / top_k) override the
+        retrieval stage sizes for this request. Conversation-independent
+        questions are first looked up in the answer cache; a hit skips
+        retrieval and generation and is flagged `cached`.
+        """
+        logger.info(f"Processing chat message. Conversation ID: {conversation_id}")
+        answer_key, cached = self._lookup_answer(message, conversation_id, retrieval_options)
+        if cached is not None:
+            return self._serve_cached(message, conversation_id, cached)
+
+        conversation_id, sources, context_str, history = self._prepare_chat(
+            message, conversation_id, retrieval_options
+        )
+
         # 4. Generate Answer (RAG)
         logger.info("Generating answer using LLM...")
         response_text = self.llm.generate_with_context(
@@ -103,13 +386,174 @@ class OrchestratorService:
         )
 
         # 5. Save Interaction
-        self.conv_manager.add_message(conversation_id, "user", message)
-        self.conv_manager.add_message(conversation_id, "assistant", response_text)
+        self.conv_manager.add_turn(conversation_id, message, response_text)
+        self._store_answer(message, answer_key, response_text, sources)
+
+        return {
+            "conversation_id": conversation_id,
+            "response": response_text,
+            "sources": sources,
+            "cached": False,
+        }
+
+    async def _aconv(self, name: str, *args, **kwargs):
+        """Call the async conversation manager, or offload the sync one."""
+        if self.aconv_manager is not None:
+            return await getattr(self.aconv_manager, name)(*args, **kwargs)
+        return await run_blocking(getattr(self.conv_manager, name), *args, **kwargs)
+
+    async def _aprepare_chat(
+        self,
+        message: str,
+        conversation_id: int | None,
+        retrieval_options: Optional[Dict[str, int]] = None,
+    ) -> Tuple[int, List[Dict[str, Any]], str, List[Dict[str, str]]]:
+        """
+        Async `_prepare_chat`. Retrieval is independent of the conversation
+        bookkeeping, so both run concurrently.
+        """
+        retrieval = self.retrieval_service.aretrieve(message, **(retrieval_options or {}))
+
+        if not conversation_id:
+            # A brand-new conversation has no history to load.
+            conv, final_docs = await asyncio.gather(
+                self._aconv("create_conversation", title=message[:30]), retrieval
+            )
+            conversation_id = conv.id
+            history: List[Dict[str, str]] = []
+        else:
+            final_docs, history = await asyncio.gather(
+                retrieval, self._aconv("get_context", conversation_id)
+            )
+
+        if conversation_id is None:
+            raise ValueError("Failed to create or retrieve conversation ID")
+
+        context_str, sources = await run_blocking(self._pack_context, message, final_docs)
+        return conversation_id, sources, context_str, history
+
+    async def achat(
+        self,
+        message: str,
+        conversation_id: int | None,
+        retrieval_options: Optional[Dict[str, int]] = None,
+    ) -> dict:
+        """
+        Async `chat`: retrieval and history load run concurrently, the LLM
+        is awaited natively and no step blocks the event loop.
+        """
+        logger.info(f"Processing chat message. Conversation ID: {conversation_id}")
+        answer_key, cached = await run_blocking(
+            self._lookup_answer, message, conversation_id, retrieval_options
+        )
+        if cached is not None:
+            conversation_id = await self._aserve_cached(message, conversation_id, cached)
+            return {
+                "conversation_id": conversation_id,
+                "response": cached["response"],
+                "sources": self._cached_sources(cached),
+                "cached": True,
+            }
+
+        conversation_id, sources, context_str, history = await self._aprepare_chat(
+            message, conversation_id, retrieval_options
+        )
+
+        logger.info("Generating answer using LLM...")
+        response_text = await self.llm.agenerate_with_context(
+            query=message,
+            context=context_str,
+            conversation_history=history,
+            temperature=getattr(settings, "TEMPERATURE", 0.1),
+        )
+
+        await self._aconv("add_turn", conversation_id, message, response_text)
+        await run_blocking(self._store_answer, message, answer_key, response_text, sources)
 
         return {
             "conversation_id": conversation_id,
             "response": response_text,
-            "sources": [doc["metadata"] for doc in final_docs],
+            "sources": sources,
+            "cached": False,
+        }
+
+    async def chat_stream(
+        self,
+        message: str,
+        conversation_id: int | None,
+        retrieval_options: Optional[Dict[str, int]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of `chat`.
+
+        Yields events in order:
+          {"type": "sources", "conversation_id": ..., "sources": [...]}
+          {"type": "token", "content": "..."}            (repeated)
+          {"type": "done", "conversation_id": ..., "response": "...", "cached": ...}
+
+        The interaction is persisted once generation stops. If the consumer
+        goes away mid-stream, the partial answer is still saved and flagged
+        as incomplete. An answer cache hit is sent as a single token event.
+        """
+        logger.info(f"Processing streamed chat message. Conversation ID: {conversation_id}")
+        answer_key, cached = await run_blocking(
+            self._lookup_answer, message, conversation_id, retrieval_options
+        )
+        if cached is not None:
+            conversation_id = await self._aserve_cached(message, conversation_id, cached)
+            yield {
+                "type": "sources",
+                "conversation_id": conversation_id,
+                "sources": self._cached_sources(cached),
+            }
+            yield {"type": "token", "content": cached["response"]}
+            yield {
+                "type": "done",
+                "conversation_id": conversation_id,
+                "response": cached["response"],
+                "cached": True,
+            }
+            return
+
+        conversation_id, sources, context_str, history = await self._aprepare_chat(
+            message, conversation_id, retrieval_options
+        )
+
+        yield {
+            "type": "sources",
+            "conversation_id": conversation_id,
+            "sources": sources,
+        }
+
+        logger.info("Streaming answer from LLM...")
+        parts: List[str] = []
+        completed = False
+        try:
+            async for token in self.llm.astream_with_context(
+                query=message,
+                context=context_str,
+                conversation_history=history,
+                temperature=getattr(settings, "TEMPERATURE", 0.1),
+            ):
+                parts.append(token)
+                yield {"type": "token", "content": token}
+            completed = True
+        finally:
+            response_text = "".join(parts)
+            await self._aconv(
+                "add_turn",
+                conversation_id,
+                message,
+                response_text,
+                assistant_metadata=None if completed else {"incomplete": True},
+            )
+
+        await run_blocking(self._store_answer, message, answer_key, response_text, sources)
+        yield {
+            "type": "done",
+            "conversation_id": conversation_id,
+            "response": response_text,
+            "cached": False,
         }
 
     def list_documents(self):
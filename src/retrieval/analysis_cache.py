@@ -0,0 +1,106 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from src.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a query."""
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+
+class QueryAnalysisCache:
+    """
+    Two-tier cache for QueryAnalyzer filter dicts.
+
+    Tier 1 is an in-memory LRU with TTL. Tier 2 (optional) is a small SQLite
+    table that survives restarts and is shared between processes (API and UI)
+    on the same host.
+
+    Keys combine the normalized query with the document catalog version, so
+    any ingest or delete makes previously extracted filename filters
+    unreachable instead of serving stale ones.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl_seconds: float = 3600.0,
+        db_path: Optional[Path] = None,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._memory: LRUCache[str, Dict[str, Any]] = LRUCache(maxsize, ttl_seconds)
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.db_hits = 0
+
+        if db_path is not None:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_analysis_cache ("
+                " key TEXT PRIMARY KEY, filters TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(query: str, catalog_version: str) -> str:
+        raw = f"{catalog_version}\x00{normalize_query(query)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, query: str, catalog_version: str) -> Optional[Dict[str, Any]]:
+        key = self.make_key(query, catalog_version)
+        filters = self._memory.get(key)
+        if filters is not None or self._db is None:
+            return filters
+
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT filters, created_at FROM query_analysis_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+
+        filters = json.loads(row[0])
+        self.db_hits += 1
+        self._memory.put(key, filters)
+        return filters
+
+    def put(self, query: str, catalog_version: str, filters: Dict[str, Any]) -> None:
+        key = self.make_key(query, catalog_version)
+        self._memory.put(key, filters)
+        if self._db is None:
+            return
+
+        now = time.time()
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO query_analysis_cache (key, filters, created_at)"
+                " VALUES (?, ?, ?)",
+                (key, json.dumps(filters), now),
+            )
+            self._db.execute(
+                "DELETE FROM query_analysis_cache WHERE created_at < ?",
+                (now - self.ttl_seconds,),
+            )
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._memory.stats()
+        if self._db is not None:
+            # A memory miss served from SQLite is still a cache hit overall.
+            stats["db_hits"] = self.db_hits
+            total = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = (
+                round((stats["hits"] + self.db_hits) / total, 3) if total else 0.0
+            )
+        return stats
@@ -0,0 +1,465 @@
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from filelock import FileLock
+
+logger = logging.getLogger(__name__)
+
+# Keeps identifiers intact ("bge-large", "v1.5", "H2O", "Navier-Stokes") while
+# also indexing their parts; see `tokenize`.
+_TOKEN = re.compile(r"[^\W_]+(?:[.\-_/][^\W_]+)*")
+_PART_SPLIT = re.compile(r"[.\-_/]")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were which with what when where who how do does did not no "
+    "can could should would will shall may might".split()
+)
+
+# Terms are stored as fixed-width bytes so the vocabulary is one compact,
+# sortable NumPy array (binary-searched) instead of a dict of Python strings.
+_MAX_TERM_BYTES = 32
+
+_SEGMENT_ARRAYS = (
+    "terms", "indptr", "postings", "tfs", "node_ids", "doc_lens", "document_ids",
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased word tokens with stopwords removed.
+
+    Compound identifiers are emitted whole and split into their parts, so
+    "bge-large" matches queries for "bge-large" as well as "bge".
+    """
+    tokens: List[str] = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        parts = _PART_SPLIT.split(token)
+        if len(parts) > 1:
+            tokens.append(token)
+        tokens.extend(p for p in parts if p not in _STOPWORDS)
+    return tokens
+
+
+def _encode_terms(terms: Iterable[str]) -> List[bytes]:
+    return [t.encode("utf-8")[:_MAX_TERM_BYTES] for t in terms]
+
+
+class _Segment:
+    """
+    Immutable block of the index in CSR layout.
+
+    For the term at row r of the sorted `terms` array, its postings are
+    `postings[indptr[r]:indptr[r + 1]]` (row numbers into the per-document
+    arrays) with term frequencies in `tfs` at the same positions.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]) -> None:
+        self.terms = arrays["terms"]
+        self.indptr = arrays["indptr"]
+        self.postings = arrays["postings"]
+        self.tfs = arrays["tfs"]
+        self.node_ids = arrays["node_ids"]
+        self.doc_lens = arrays["doc_lens"]
+        self.document_ids = arrays["document_ids"]
+        self.alive = np.ones(len(self.node_ids), dtype=bool)
+
+    @property
+    def size(self) -> int:
+        return len(self.node_ids)
+
+    @classmethod
+    def build(cls, docs: Sequence[Tuple[str, int, str]]) -> "_Segment":
+        """Build a segment from (node_id, document_id, text) triples."""
+        term_rows: Dict[bytes, int] = {}
+        triples: List[Tuple[int, int, int]] = []
+        doc_lens = np.zeros(len(docs), dtype=np.int32)
+        for row, (_, _, text) in enumerate(docs):
+            tokens = _encode_terms(tokenize(text))
+            doc_lens[row] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                term_id = term_rows.setdefault(term, len(term_rows))
+                triples.append((term_id, row, min(tf, 65535)))
+
+        vocab = sorted(term_rows)
+        remap = np.empty(len(vocab), dtype=np.int32)
+        for new_id, term in enumerate(vocab):
+            remap[term_rows[term]] = new_id
+
+        data = np.array(triples, dtype=np.int64).reshape(-1, 3)
+        term_ids = remap[data[:, 0]] if len(data) else np.zeros(0, dtype=np.int32)
+        order = np.lexsort((data[:, 1], term_ids))
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=indptr[1:])
+
+        return cls({
+            "terms": np.array(vocab, dtype=f"S{_MAX_TERM_BYTES}"),
+            "indptr": indptr,
+            "postings": data[order, 1].astype(np.int32),
+            "tfs": data[order, 2].astype(np.uint16),
+            "node_ids": np.array([d[0] for d in docs], dtype="S"),
+            "doc_lens": doc_lens,
+            "document_ids": np.array([d[1] for d in docs], dtype=np.int64),
+        })
+
+    @classmethod
+    def merge(cls, segments: Sequence["_Segment"]) -> "_Segment":
+        """Merge segments into one, dropping deleted documents."""
+        vocab = np.unique(np.concatenate([s.terms for s in segments]))
+        term_ids, postings, tfs = [], [], []
+        node_ids, doc_lens, document_ids = [], [], []
+        offset = 0
+        for seg in segments:
+            # Old row → new row for live documents, -1 for deleted ones.
+            new_rows = np.full(seg.size, -1, dtype=np.int64)
+            live = np.flatnonzero(seg.alive)
+            new_rows[live] = offset + np.arange(len(live))
+            offset += len(live)
+
+            seg_term_ids = np.repeat(
+                np.searchsorted(vocab, seg.terms), np.diff(seg.indptr)
+            )
+            rows = new_rows[seg.postings]
+            keep = rows >= 0
+            term_ids.append(seg_term_ids[keep])
+            postings.append(rows[keep])
+            tfs.append(np.asarray(seg.tfs)[keep])
+
+            node_ids.extend(np.asarray(seg.node_ids)[live].tolist())
+            doc_lens.append(np.asarray(seg.doc_lens)[live])
+            document_ids.append(np.asarray(seg.document_ids)[live])
+
+        all_terms = np.concatenate(term_ids)
+        # Stable: within a term, postings stay in row order.
+        order = np.argsort(all_terms, kind="stable")
+        counts = np.bincount(all_terms, minlength=len(vocab))
+        used = counts > 0
+        indptr = np.zeros(int(used.sum()) + 1, dtype=np.int64)
+        np.cumsum(counts[used], out=indptr[1:])
+
+        return cls({
+            "terms": vocab[used],
+            "indptr": indptr,
+            "postings": np.concatenate(postings)[order].astype(np.int32),
+            "tfs": np.concatenate(tfs)[order].astype(np.uint16),
+            "node_ids": np.array(node_ids, dtype="S"),
+            "doc_lens": np.concatenate(doc_lens).astype(np.int32),
+            "document_ids": np.concatenate(document_ids).astype(np.int64),
+        })
+
+    def lookup(self, term: bytes) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(posting rows, term frequencies) of `term`, or None."""
+        row = int(np.searchsorted(self.terms, term))
+        if row >= len(self.terms) or self.terms[row] != term:
+            return None
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return self.postings[start:end], self.tfs[start:end]
+
+    def save(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in _SEGMENT_ARRAYS:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+
+    @classmethod
+    def load(cls, directory: Path) -> "_Segment":
+        # Memory-mapped: opening a large index costs no reads up front.
+        return cls({
+            name: np.load(directory / f"{name}.npy", mmap_mode="r")
+            for name in _SEGMENT_ARRAYS
+        })
+
+
+class BM25Index:
+    """
+    On-disk BM25 inverted index maintained alongside the vector store.
+
+    The index is a list of immutable CSR segments: sorted fixed-width term
+    array, int64 `indptr`, int32 posting rows and uint16 term frequencies
+    (~6 bytes per posting). Every `add` writes one new segment; deletions
+    are tombstones. When there are more than `max_segments` segments the
+    smallest are merged (dropping deleted documents), so the cost of a
+    merge tracks the size of recent additions, not of the whole index. Segment arrays
+    are memory-mapped, so loading is near-instant even at millions of
+    chunks.
+
+    Scoring is Okapi BM25 (k1, b) with IDF computed over all live segments.
+
+    Several processes (API, UI, ingestion CLI) may share one index
+    directory. Writes hold a lock file and start by reloading the manifest,
+    so segment numbers and tombstones never collide; searches reload it
+    whenever another process has rewritten it.
+    """
+
+    def __init__(
+        self, path: Path, k1: float = 1.2, b: float = 0.75, max_segments: int = 8
+    ) -> None:
+        """
+        Args:
+            path:         Directory holding the segments and the manifest.
+            k1, b:        BM25 term-frequency saturation and length normalization.
+            max_segments: Segment count that triggers a merge.
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.max_segments = max_segments
+        self._lock = threading.RLock()
+        self._segments: List[Tuple[str, _Segment]] = []
+        # Tombstones: node id → first segment number NOT affected by it, so a
+        # node re-added after its deletion lives on in the newer segment.
+        self._deleted: Dict[bytes, int] = {}
+        self._next_segment = 0
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._file_lock = FileLock(str(self.path / "index.lock"))
+        with self._lock, self._file_lock:
+            self._refresh()
+        if self._segments:
+            logger.info(f"Loaded BM25 index: {len(self)} chunks in {len(self._segments)} segments.")
+
+    # ------------------------------------------------------------------ #
+    #  Persistence                                                         #
+    # ------------------------------------------------------------------ #
+
+    @property
+    def _manifest_path(self) -> Path:
+        return self.path / "manifest.json"
+
+    def _manifest_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = self._manifest_path.stat()
+        except FileNotFoundError:
+            return None
+        # The manifest is replaced, never rewritten in place: a new inode.
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _refresh(self) -> None:
+        """
+        Reload the manifest if it changed since this process last read or
+        wrote it. Caller holds both locks. Segments still listed are reused.
+        """
+        signature = self._manifest_signature()
+        if signature is None or signature == self._signature:
+            return
+        manifest = json.loads(self._manifest_path.read_text())
+        self._next_segment = manifest["next_segment"]
+        self._deleted = {
+            node_id.encode("utf-8"): before
+            for node_id, before in manifest.get("deleted", {}).items()
+        }
+        loaded = dict(self._segments)
+        segments: List[Tuple[str, _Segment]] = []
+        for name in manifest["segments"]:
+            segment = loaded.get(name) or _Segment.load(self.path / name)
+            number = self._segment_number(name)
+            dead = [node_id for node_id, before in self._deleted.items() if number < before]
+            segment.alive = (
+                ~np.isin(segment.node_ids, dead) if dead else np.ones(segment.size, dtype=bool)
+            )
+            segments.append((name, segment))
+        self._segments = segments
+        self._signature = signature
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        """Exclusive access across threads and processes, on the latest manifest."""
+        with self._lock, self._file_lock:
+            self._refresh()
+            yield
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "next_segment": self._next_segment,
+            "segments": [name for name, _ in self._segments],
+            "deleted": {d.decode("utf-8"): before for d, before in self._deleted.items()},
+        }
+        tmp = self._manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifest))
+        os.replace(tmp, self._manifest_path)
+        self._signature = self._manifest_signature()
+
+    @staticmethod
+    def _segment_number(name: str) -> int:
+        return int(name.rsplit("-", 1)[1])
+
+    def _new_segment_name(self) -> str:
+        name = f"seg-{self._next_segment:06d}"
+        self._next_segment += 1
+        return name
+
+    # ------------------------------------------------------------------ #
+    #  Maintenance                                                         #
+    # ------------------------------------------------------------------ #
+
+    def __len__(self) -> int:
+        return sum(int(seg.alive.sum()) for _, seg in self._segments)
+
+    def add(self, docs: Sequence[Tuple[str, int, str]]) -> None:
+        """Index (node_id, document_id, text) triples as one new segment."""
+        if not docs:
+            return
+        segment = _Segment.build(docs)
+        with self._writing():
+            # Re-added ids (e.g. after a failed update) supersede old copies.
+            self._tombstone({d[0].encode("utf-8") for d in docs})
+            name = self._new_segment_name()
+            segment.save(self.path / name)
+            self._segments.append((name, segment))
+            self._maybe_merge()
+            self._write_manifest()
+
+    def delete_nodes(self, node_ids: Iterable[str]) -> None:
+        with self._writing():
+            self._tombstone({n.encode("utf-8") for n in node_ids})
+            self._maybe_merge()
+            self._write_manifest()
+
+    def delete_document(self, document_id: int) -> None:
+        with self._writing():
+            ids: Set[bytes] = set()
+            for _, seg in self._segments:
+                rows = np.flatnonzero(np.asarray(seg.document_ids) == document_id)
+                ids.update(np.asarray(seg.node_ids)[rows].tolist())
+            self._tombstone(ids)
+            self._maybe_merge()
+            self._write_manifest()
+
+    def _tombstone(self, ids: Set[bytes]) -> None:
+        """Delete `ids` from every existing segment (not from later ones)."""
+        if not ids:
+            return
+        lookup = list(ids)
+        found: Set[bytes] = set()
+        for _, seg in self._segments:
+            hits = np.isin(seg.node_ids, lookup) & seg.alive
+            if hits.any():
+                found.update(np.asarray(seg.node_ids)[hits].tolist())
+                seg.alive &= ~hits
+        for node_id in found:
+            self._deleted[node_id] = self._next_segment
+
+    def _maybe_merge(self) -> None:
+        """
+        Tiered merging: fold the smallest segments together once there are
+        too many, and rewrite everything once tombstones pile up.
+        """
+        total = sum(seg.size for _, seg in self._segments)
+        if total and len(self._deleted) > 0.25 * total:
+            self._merge(self._segments)
+        elif len(self._segments) > self.max_segments:
+            by_size = sorted(self._segments, key=lambda item: item[1].size)
+            self._merge(by_size[: len(self._segments) - self.max_segments // 2 + 1])
+
+    def _merge(self, victims: List[Tuple[str, _Segment]]) -> None:
+        """Merge `victims` into one new segment, dropping deleted documents."""
+        merged = _Segment.merge([seg for _, seg in victims])
+        name = self._new_segment_name()
+        merged.save(self.path / name)
+        old = {n for n, _ in victims}
+        self._segments = [item for item in self._segments if item[0] not in old]
+        self._segments.append((name, _Segment.load(self.path / name)))
+        if len(self._segments) == 1:
+            # Nothing older is left for the tombstones to apply to.
+            self._deleted.clear()
+        self._write_manifest()
+        for n in old:
+            shutil.rmtree(self.path / n, ignore_errors=True)
+        logger.info(f"Merged {len(old)} BM25 segments ({merged.size} chunks).")
+
+    def clear(self) -> None:
+        with self._writing():
+            old = [n for n, _ in self._segments]
+            self._segments = []
+            self._deleted.clear()
+            self._write_manifest()
+            for n in old:
+                shutil.rmtree(self.path / n, ignore_errors=True)
+
+    # ------------------------------------------------------------------ #
+    #  Search                                                              #
+    # ------------------------------------------------------------------ #
+
+    def search(self, query: str, top_k: int = 20) -> List[Tuple[str, float]]:
+        """
+        Top `top_k` (node_id, BM25 score) pairs for `query`, best first.
+        """
+        terms = list(dict.fromkeys(_encode_terms(tokenize(query))))
+        with self._lock:
+            if self._manifest_signature() != self._signature:
+                # Another process changed the index.
+                with self._file_lock:
+                    self._refresh()
+            segments = [seg for _, seg in self._segments]
+        if not terms or not segments:
+            return []
+
+        n_docs = sum(int(seg.alive.sum()) for seg in segments)
+        if n_docs == 0:
+            return []
+        avgdl = max(
+            1.0,
+            sum(float(np.asarray(seg.doc_lens)[seg.alive].sum()) for seg in segments) / n_docs,
+        )
+
+        postings = [[seg.lookup(term) for seg in segments] for term in terms]
+        scores = [np.zeros(seg.size, dtype=np.float32) for seg in segments]
+        for per_segment in postings:
+            df = sum(len(p[0]) for p in per_segment if p is not None)
+            if df == 0:
+                continue
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            for seg, seg_scores, hit in zip(segments, scores, per_segment):
+                if hit is None:
+                    continue
+                rows, tf = hit
+                tf = np.asarray(tf, dtype=np.float32)
+                norm = self.k1 * (1.0 - self.b + self.b * np.asarray(seg.doc_lens)[rows] / avgdl)
+                seg_scores[rows] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+        results: List[Tuple[str, float]] = []
+        for seg, seg_scores in zip(segments, scores):
+            seg_scores[~seg.alive] = 0.0
+            hits = np.flatnonzero(seg_scores)
+            if len(hits) > top_k:
+                hits = hits[np.argpartition(seg_scores[hits], -top_k)[-top_k:]]
+            results.extend(
+                (seg.node_ids[i].decode("utf-8"), float(seg_scores[i])) for i in hits
+            )
+        results.sort(key=lambda r: r[1], reverse=True)
+        return results[:top_k]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "chunks": len(self),
+                "segments": len(self._segments),
+                "tombstones": len(self._deleted),
+                "postings": sum(len(seg.postings) for _, seg in self._segments),
+            }
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]], k: int = 60
+) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked id lists: score(id) = Σ 1 / (k + rank), rank starting at 1.
+
+    Returns:
+        (id, fused score) pairs, best first.
+    """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
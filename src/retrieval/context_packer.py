@@ -0,0 +1,283 @@
+import logging
+import math
+import re
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from src.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+# Sentence ends followed by something that can start a sentence (including
+# inline LaTeX and numbered items).
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9$\\(\[\"'])")
+_GAP = "…"
+_LIST_ITEM = re.compile(r"^\d+[.)]\s")
+# Characters matched when looking for the overlap carried between chunks.
+_OVERLAP_ANCHOR = 40
+
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _containment(a: Set[Tuple[str, ...]], b: Set[Tuple[str, ...]]) -> float:
+    """Share of the smaller shingle set found in the other one."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def _strip_overlap(previous: str, following: str) -> str:
+    """`following` without the text it repeats from the end of `previous`."""
+    anchor = previous[-_OVERLAP_ANCHOR:]
+    if len(anchor) < _OVERLAP_ANCHOR:
+        return following
+    at = following.find(anchor)
+    if at < 0 or not previous.endswith(following[:at + len(anchor)]):
+        return following
+    return following[at + len(anchor):].lstrip()
+
+
+def split_units(text: str) -> List[str]:
+    """
+    Sentences of prose lines; headings, table rows, list items and display
+    math lines are kept whole.
+    """
+    units: List[str] = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped[0] in "#|-*$\\" or _LIST_ITEM.match(stripped):
+            units.append(stripped)
+        else:
+            units.extend(s for s in _SENTENCE_END.split(stripped) if s)
+    return units
+
+
+def _source_label(metadata: Dict[str, Any]) -> str:
+    label = str(metadata.get("filename") or "Unknown")
+    section = metadata.get("section")
+    return f"{label} › {section}" if section else label
+
+
+def _span_header(span: Dict[str, Any], number: int) -> str:
+    return f"[{number}] {'; '.join(_source_label(m) for m in span['sources'])}"
+
+
+class ContextPacker:
+    """
+    Packs reranked chunks into the context given to the LLM.
+
+    1. Near-duplicates (word 3-shingle containment above `dedup_threshold`)
+       are dropped; the kept chunk inherits their source attribution.
+    2. Chunks that sit next to each other in the same document are merged
+       into one span, in document order, without the overlap the chunker
+       repeats between them.
+    3. Optionally, spans longer than `compress_min_tokens` keep only their
+       highest-scoring sentences (cross-encoder relevance to the query, all
+       sentences scored in one batched call), in their original order.
+    4. Spans are added by descending relevance until `token_budget` is
+       spent; the last one may be cut at a sentence boundary.
+
+    Every span keeps the metadata of the chunks it came from and is
+    rendered under a numbered source header.
+    """
+
+    def __init__(
+        self,
+        reranker: Optional[Any] = None,
+        token_budget: int = 3000,
+        dedup_threshold: float = 0.8,
+        compress: bool = False,
+        keep_ratio: float = 0.5,
+        compress_min_tokens: int = 160,
+        min_span_tokens: int = 48,
+    ) -> None:
+        """
+        Args:
+            reranker:            Cross-encoder with `score_pairs`, for compression.
+            token_budget:        Max tokens of packed context.
+            dedup_threshold:     Shingle containment above which a chunk is a duplicate.
+            compress:            Enable extractive sentence compression.
+            keep_ratio:          Share of sentences kept in a compressed span.
+            compress_min_tokens: Spans shorter than this are never compressed.
+            min_span_tokens:     Smallest leftover budget worth a truncated span.
+        """
+        if compress and reranker is None:
+            raise ValueError("Context compression needs a reranker.")
+        self.reranker = reranker
+        self.token_budget = token_budget
+        self.dedup_threshold = dedup_threshold
+        self.compress = compress
+        self.keep_ratio = keep_ratio
+        self.compress_min_tokens = compress_min_tokens
+        self.min_span_tokens = min_span_tokens
+
+    # ------------------------------------------------------------------ #
+    #  Stages                                                              #
+    # ------------------------------------------------------------------ #
+
+    def _dedupe(self, docs: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        spans: List[Dict[str, Any]] = []
+        shingles: List[Set[Tuple[str, ...]]] = []
+        for doc in docs:
+            doc_shingles = _shingles(doc["text"])
+            duplicate_of = next(
+                (
+                    i for i, kept in enumerate(shingles)
+                    if _containment(doc_shingles, kept) >= self.dedup_threshold
+                ),
+                None,
+            )
+            if duplicate_of is not None:
+                sources = spans[duplicate_of]["sources"]
+                if doc["metadata"] not in sources:
+                    sources.append(doc["metadata"])
+                continue
+            shingles.append(doc_shingles)
+            spans.append(
+                {
+                    "text": doc["text"],
+                    "score": doc.get("score", 0.0),
+                    "node_ids": [doc.get("id")],
+                    "sources": [doc["metadata"]],
+                }
+            )
+        return spans
+
+    @staticmethod
+    def _merge_adjacent(
+        spans: List[Dict[str, Any]], positions: Dict[str, Tuple[int, int]]
+    ) -> List[Dict[str, Any]]:
+        """Merge spans whose chunks are consecutive in the same document."""
+        located = [
+            (positions[s["node_ids"][0]], s) for s in spans if s["node_ids"][0] in positions
+        ]
+        located.sort(key=lambda item: item[0])
+        merged: Set[int] = set()
+        previous: Optional[Tuple[Tuple[int, int], Dict[str, Any]]] = None
+        for position, span in located:
+            if previous is not None:
+                (doc_id, index), head = previous
+                if position == (doc_id, index + 1):
+                    head["text"] = f"{head['text']}\n{_strip_overlap(head['text'], span['text'])}"
+                    head["score"] = max(head["score"], span["score"])
+                    head["node_ids"].extend(span["node_ids"])
+                    head["sources"].extend(s for s in span["sources"] if s not in head["sources"])
+                    merged.add(id(span))
+                    previous = (position, head)
+                    continue
+            previous = (position, span)
+        result = [s for s in spans if id(s) not in merged]
+        return sorted(result, key=lambda s: s["score"], reverse=True)
+
+    def _compress(self, query: str, spans: List[Dict[str, Any]]) -> None:
+        candidates = [s for s in spans if s["tokens"] > self.compress_min_tokens]
+        units = [split_units(s["text"]) for s in candidates]
+        flat = [u for span_units in units for u in span_units]
+        if not flat:
+            return
+        scores = self.reranker.score_pairs(query, flat)
+
+        offset = 0
+        for span, span_units in zip(candidates, units):
+            span_scores = scores[offset:offset + len(span_units)]
+            offset += len(span_units)
+            keep = max(1, math.ceil(len(span_units) * self.keep_ratio))
+            if keep >= len(span_units):
+                continue
+            best = sorted(range(len(span_units)), key=lambda i: span_scores[i], reverse=True)
+            kept = sorted(best[:keep])
+            parts: List[str] = []
+            for n, i in enumerate(kept):
+                if n and i != kept[n - 1] + 1:
+                    parts.append(_GAP)
+                parts.append(span_units[i])
+            span["text"] = "\n".join(parts)
+            span["tokens"] = count_tokens(span["text"])
+            span["compressed"] = True
+
+    def _truncate(self, text: str, budget: int) -> str:
+        """Leading sentences of `text` within `budget` tokens."""
+        parts: List[str] = []
+        used = 0
+        for unit in split_units(text):
+            tokens = count_tokens(unit)
+            if used + tokens > budget:
+                break
+            parts.append(unit)
+            used += tokens
+        return "\n".join(parts)
+
+    # ------------------------------------------------------------------ #
+    #  Public API                                                          #
+    # ------------------------------------------------------------------ #
+
+    def pack(
+        self,
+        query: str,
+        docs: Sequence[Dict[str, Any]],
+        positions: Optional[Dict[str, Tuple[int, int]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Pack retrieved chunks (RetrievalService dicts, best first).
+
+        Args:
+            query:     The user query (scores sentences for compression).
+            docs:      {"text", "metadata", "score", "id"} dicts.
+            positions: node id → (document id, chunk position); enables
+                       merging of adjacent chunks.
+
+        Returns:
+            Spans, most relevant first: {"text", "score", "node_ids",
+            "sources", "tokens"} (plus "compressed" / "truncated" flags).
+        """
+        spans = self._dedupe(docs)
+        if positions:
+            spans = self._merge_adjacent(spans, positions)
+        for span in spans:
+            span["tokens"] = count_tokens(span["text"])
+        if self.compress:
+            self._compress(query, spans)
+
+        packed: List[Dict[str, Any]] = []
+        remaining = self.token_budget
+        for span in spans:
+            header = count_tokens(_span_header(span, len(packed) + 1))
+            if span["tokens"] + header <= remaining:
+                packed.append(span)
+                remaining -= span["tokens"] + header
+            elif remaining - header >= self.min_span_tokens:
+                text = self._truncate(span["text"], remaining - header)
+                if text:
+                    span.update(text=text, tokens=count_tokens(text), truncated=True)
+                    packed.append(span)
+                    remaining -= span["tokens"] + header
+
+        left_out = len(docs) - sum(len(s["node_ids"]) for s in packed)
+        logger.debug(
+            f"Packed {len(docs)} chunks into {len(packed)} spans "
+            f"({self.token_budget - remaining} tokens, {left_out} chunks deduplicated or left out)."
+        )
+        return packed
+
+    @staticmethod
+    def render(spans: Sequence[Dict[str, Any]]) -> str:
+        """Context string with a numbered source header per span."""
+        return "\n\n".join(
+            f"{_span_header(span, n)}\n{span['text']}" for n, span in enumerate(spans, start=1)
+        )
+
+    @staticmethod
+    def attributed_sources(spans: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Source metadata of every packed span, tagged with its span number."""
+        return [
+            {**metadata, "span": n}
+            for n, span in enumerate(spans, start=1)
+            for metadata in span["sources"]
+        ]
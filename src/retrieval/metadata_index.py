@@ -0,0 +1,256 @@
+import difflib
+import logging
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from llama_index.core.schema import BaseNode
+
+logger = logging.getLogger(__name__)
+
+# Leading section numbering: "3.", "3.1.2", "IV.", "A)".
+_NUMBERING = re.compile(r"^(?:\d+(?:\.\d+)*|[ivxlc]+|[a-z])[.)]?\s+")
+_PUNCT = re.compile(r"[^\w.\-]+")
+_EXTENSION = re.compile(r"\.[a-z0-9]{1,5}$")
+
+# Header paths written by TokenBoundedChunker.
+_HEADER_PATH_SEPARATOR = " > "
+
+FILTER_KEYS = ("filename", "section")
+
+
+def normalize_filename(value: str) -> str:
+    return " ".join(_PUNCT.sub(" ", Path(value.strip()).name.lower()).split())
+
+
+def normalize_section(value: str) -> str:
+    text = " ".join(_PUNCT.sub(" ", value.lower()).split())
+    return _NUMBERING.sub("", text).strip(" .-")
+
+
+def _stem(filename: str) -> str:
+    return _EXTENSION.sub("", filename)
+
+
+class MetadataIndex:
+    """
+    Local pre-index of filename / section → node ids.
+
+    QueryAnalyzer extracts filter values with an LLM, so they are often
+    slightly off ("safety" for "3. Safety Considerations", "report" for
+    "Report_2023.pdf"). Exact-match filters in the vector store then return
+    nothing. This index resolves each extracted value to the canonical
+    values actually present (exact → prefix / word containment → difflib
+    fuzzy match) and hands the retriever the matching node ids directly.
+
+    Sections match at any depth of a chunk's header path, so a filter on a
+    chapter also covers its subsections. Rows live in SQLite; the distinct
+    values used for resolution are kept in memory and reloaded when another
+    process (UI, ingestion CLI) has written to the database.
+    """
+
+    def __init__(self, db_path: Path, fuzzy_cutoff: float = 0.75) -> None:
+        """
+        Args:
+            db_path:      SQLite file holding the index.
+            fuzzy_cutoff: Minimum difflib ratio for a fuzzy match.
+        """
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._lock = threading.Lock()
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS node_meta ("
+            " node_id TEXT NOT NULL, document_id INTEGER NOT NULL,"
+            " key TEXT NOT NULL, value TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS ix_node_meta_value ON node_meta (key, value);"
+            "CREATE INDEX IF NOT EXISTS ix_node_meta_node ON node_meta (node_id);"
+            "CREATE INDEX IF NOT EXISTS ix_node_meta_document ON node_meta (document_id);"
+        )
+        self._db.commit()
+
+        # key → canonical value → number of rows (for resolution).
+        self._values: Dict[str, Counter] = {key: Counter() for key in FILTER_KEYS}
+        self._data_version = -1
+        self._sync()
+
+    def _sync(self) -> None:
+        """
+        Reload `_values` if another connection committed since the last
+        load. `PRAGMA data_version` ignores this connection's own commits,
+        which `add` / `delete_*` already apply to `_values`.
+        """
+        with self._lock:
+            data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            values: Dict[str, Counter] = {key: Counter() for key in FILTER_KEYS}
+            for key, value, count in self._db.execute(
+                "SELECT key, value, COUNT(*) FROM node_meta GROUP BY key, value"
+            ):
+                values.setdefault(key, Counter())[value] = count
+            self._values = values
+            self._data_version = data_version
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(DISTINCT node_id) FROM node_meta").fetchone()[0]
+
+    # ------------------------------------------------------------------ #
+    #  Maintenance                                                         #
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def _rows(node: BaseNode) -> List[Tuple[str, int, str, str]]:
+        metadata = node.metadata
+        document_id = int(metadata.get("document_id", 0))
+        rows: List[Tuple[str, int, str, str]] = []
+
+        filename = normalize_filename(str(metadata.get("filename", "")))
+        if filename:
+            rows.append((node.node_id, document_id, "filename", filename))
+
+        headings = str(metadata.get("header_path", "")).split(_HEADER_PATH_SEPARATOR)
+        headings.append(str(metadata.get("section", "")))
+        for section in dict.fromkeys(normalize_section(h) for h in headings):
+            if section:
+                rows.append((node.node_id, document_id, "section", section))
+        return rows
+
+    def add(self, nodes: Sequence[BaseNode]) -> None:
+        rows = [row for node in nodes for row in self._rows(node)]
+        if not rows:
+            return
+        with self._lock:
+            # Re-adding a node replaces its previous rows.
+            self._delete_where(
+                "node_id IN ({})", list(dict.fromkeys(r[0] for r in rows))
+            )
+            self._db.executemany(
+                "INSERT INTO node_meta (node_id, document_id, key, value) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+            for _, _, key, value in rows:
+                self._values[key][value] += 1
+
+    def delete_nodes(self, node_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._delete_where("node_id IN ({})", list(node_ids))
+            self._db.commit()
+
+    def delete_document(self, document_id: int) -> None:
+        with self._lock:
+            self._delete_where("document_id IN ({})", [document_id])
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM node_meta")
+            self._db.commit()
+            for values in self._values.values():
+                values.clear()
+
+    def _delete_where(self, clause: str, params: List[Any]) -> None:
+        for start in range(0, len(params), 500):
+            chunk = params[start:start + 500]
+            where = clause.format(",".join("?" * len(chunk)))
+            removed = self._db.execute(
+                f"SELECT key, value, COUNT(*) FROM node_meta WHERE {where} GROUP BY key, value",
+                chunk,
+            ).fetchall()
+            self._db.execute(f"DELETE FROM node_meta WHERE {where}", chunk)
+            for key, value, count in removed:
+                self._values[key][value] -= count
+                if self._values[key][value] <= 0:
+                    del self._values[key][value]
+
+    # ------------------------------------------------------------------ #
+    #  Resolution                                                          #
+    # ------------------------------------------------------------------ #
+
+    def resolve_value(self, key: str, value: str) -> List[str]:
+        """
+        Canonical values of `key` that an LLM-extracted `value` refers to.
+
+        Exact (normalized), prefix and whole-word containment matches are
+        returned together; difflib fuzzy matching is only tried when there
+        are none.
+        Returns [] if nothing plausible exists.
+        """
+        self._sync()
+        if key == "filename":
+            target = normalize_filename(value)
+            candidates = list(self._values["filename"])
+            comparable = {c: _stem(c) for c in candidates}
+            target_cmp = _stem(target)
+        else:
+            target = normalize_section(value)
+            candidates = list(self._values.get(key, ()))
+            comparable = {c: c for c in candidates}
+            target_cmp = target
+        if not target_cmp:
+            return []
+
+        words = set(target_cmp.split())
+        matches = [
+            c for c in candidates
+            if c == target
+            or comparable[c].startswith(target_cmp)
+            or words <= set(comparable[c].split())
+        ]
+        if matches:
+            return matches
+
+        close = difflib.get_close_matches(
+            target_cmp, list(set(comparable.values())), n=3, cutoff=self.fuzzy_cutoff
+        )
+        return [c for c in candidates if comparable[c] in close]
+
+    def resolve(self, filters: Dict[str, Any]) -> Tuple[Dict[str, List[str]], List[str]]:
+        """
+        Resolve a flat {key: value} filter dict.
+
+        Returns:
+            (resolved, unresolved) — canonical values per resolvable key, and
+            the keys whose value matched nothing (callers should drop them).
+        """
+        resolved: Dict[str, List[str]] = {}
+        unresolved: List[str] = []
+        for key, value in filters.items():
+            if key not in self._values:
+                unresolved.append(key)
+                continue
+            values = self.resolve_value(key, str(value))
+            if values:
+                resolved[key] = values
+            else:
+                unresolved.append(key)
+        return resolved, unresolved
+
+    def node_ids(self, resolved: Dict[str, List[str]]) -> Set[str]:
+        """Ids of nodes matching every key (any of its canonical values)."""
+        result: Optional[Set[str]] = None
+        with self._lock:
+            for key, values in resolved.items():
+                placeholders = ",".join("?" * len(values))
+                ids = {
+                    row[0]
+                    for row in self._db.execute(
+                        f"SELECT DISTINCT node_id FROM node_meta"
+                        f" WHERE key = ? AND value IN ({placeholders})",
+                        (key, *values),
+                    )
+                }
+                result = ids if result is None else result & ids
+                if not result:
+                    break
+        return result or set()
+
+    def stats(self) -> Dict[str, int]:
+        self._sync()
+        return {f"{key}_values": len(values) for key, values in self._values.items()}
@@ -1,18 +1,42 @@
 import json
-from typing import Any, Dict
+import logging
+from typing import Any, Dict, List, Optional
 
+from src.documents.catalog import DocumentCatalog
 from src.infra.llm.local import OllamaLLM
+from src.retrieval.analysis_cache import QueryAnalysisCache
 
+logger = logging.getLogger(__name__)
 
-class QueryAnalyzer:
-    def __init__(self, llm: OllamaLLM):
-        self.llm = llm
 
-    def analyze(self, query: str) -> Dict[str, Any]:
+class QueryAnalyzer:
+    def __init__(
+        self,
+        llm: OllamaLLM,
+        cache: Optional[QueryAnalysisCache] = None,
+        catalog: Optional[DocumentCatalog] = None,
+    ):
         """
-        Analyzes the user query to extract metadata filters.
-        Returns a dictionary suitable for ChromaDB's `where` clause.
+        Args:
+            llm:     Ollama LLM used for filter extraction.
+            cache:   Optional cache of parsed filters. Only used together
+                     with `catalog`, whose version is part of the cache key.
+            catalog: Document catalog providing the version stamp.
         """
+        self.llm = llm
+        self.cache = cache if catalog is not None else None
+        self.catalog = catalog
+
+    def _cache_lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        if self.cache is None:
+            return None
+        return self.cache.get(query, self.catalog.version)
+
+    def _cache_store(self, query: str, filters: Dict[str, Any]) -> None:
+        if self.cache is not None:
+            self.cache.put(query, self.catalog.version, filters)
+
+    def _build_messages(self, query: str) -> List[Dict[str, str]]:
         system_prompt = (
             "You are a query analysis expert. Your task is to extract metadata filters from a user query.\n"
             "We have the following metadata fields available for documents:\n"
@@ -33,27 +57,63 @@ class QueryAnalyzer:
             "- ONLY output the JSON."
         )
 
-        messages = [
+        return [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": query},
         ]
 
+    @staticmethod
+    def _parse_filters(response: str) -> Dict[str, Any]:
+        # Basic cleanup if the LLM adds markdown blocks
+        response = response.strip()
+        if response.startswith("```json"):
+            response = response[7:]
+        if response.endswith("```"):
+            response = response[:-3]
+
+        filters = json.loads(response.strip())
+
+        # ChromaDB requires explicit $and for multiple conditions
+        if len(filters) > 1:
+            return {"$and": [{k: v} for k, v in filters.items()]}
+
+        return filters
+
+    def analyze(self, query: str) -> Dict[str, Any]:
+        """
+        Analyzes the user query to extract metadata filters.
+        Returns a dictionary suitable for ChromaDB's `where` clause.
+        """
+        cached = self._cache_lookup(query)
+        if cached is not None:
+            return cached
+
         try:
-            response = self.llm.generate(messages, temperature=0.1)
-            # Basic cleanup if the LLM adds markdown blocks
-            response = response.strip()
-            if response.startswith("```json"):
-                response = response[7:]
-            if response.endswith("```"):
-                response = response[:-3]
+            response = self.llm.generate(self._build_messages(query), temperature=0.1)
+            filters = self._parse_filters(response)
+        except Exception as e:
+            logger.warning(f"Error parsing query filters: {e}")
+            return {}
 
-            filters = json.loads(response.strip())
+        # Failures are not cached, so a transient LLM error is retried next time.
+        self._cache_store(query, filters)
+        return filters
 
-            # ChromaDB requires explicit $and for multiple conditions
-            if len(filters) > 1:
-                return {"$and": [{k: v} for k, v in filters.items()]}
+    async def aanalyze(self, query: str) -> Dict[str, Any]:
+        """Async version of `analyze`; the LLM round trip does not block the loop."""
+        cached = self._cache_lookup(query)
+        if cached is not None:
+            return cached
 
-            return filters
+        try:
+            response = await self.llm.agenerate(
+                self._build_messages(query), temperature=0.1
+            )
+            filters = self._parse_filters(response)
         except Exception as e:
-            print(f"Error parsing query filters: {e}")
+            logger.warning(f"Error parsing query filters: {e}")
             return {}
+
+        # Failures are not cached, so a transient LLM error is retried next time.
+        self._cache_store(query, filters)
+        return filters
@@ -0,0 +1,59 @@
+import re
+from pathlib import Path
+
+from src.documents.catalog import DocumentCatalog
+
+# Words that signal the user is pointing at a specific part of a document.
+_SECTION_CUES = re.compile(
+    r"\b(section|sections|chapter|appendix|heading|paragraph|table|figure|"
+    r"introduction|abstract|conclusion|conclusions|discussion|methodology|"
+    r"methods|references|bibliography)\b"
+)
+
+# Anything that looks like a file name, e.g. "report.pdf", "notes_v2.txt".
+_FILENAME_LIKE = re.compile(r"\b[\w\-]+\.(pdf|txt|md|docx?|pptx?|html?|csv|xlsx?)\b")
+
+# Catalog entries shorter than this are too generic to match reliably.
+_MIN_TERM_LENGTH = 4
+
+
+def _normalize(text: str) -> str:
+    tokens = re.sub(r"[^\w.\-]+", " ", text.lower()).split()
+    return " ".join(t for t in (tok.strip(".-") for tok in tokens) if t)
+
+
+class QueryPreClassifier:
+    """
+    Cheap, rule-based gate in front of the LLM QueryAnalyzer.
+
+    Decides whether a query could plausibly carry a filename or section
+    filter. Most questions reference neither, and for those the LLM round
+    trip is skipped entirely. The classifier is deliberately conservative:
+    when in doubt it answers True and lets the analyzer decide.
+    """
+
+    def __init__(self, catalog: DocumentCatalog) -> None:
+        self.catalog = catalog
+
+    def needs_filter(self, query: str) -> bool:
+        text = _normalize(query)
+        if not text:
+            return False
+
+        if _FILENAME_LIKE.search(text) or _SECTION_CUES.search(text):
+            return True
+
+        padded = f" {text} "
+        for filename in self.catalog.filenames:
+            name = _normalize(filename)
+            stem = _normalize(Path(filename).stem)
+            for term in (name, stem):
+                if len(term) >= _MIN_TERM_LENGTH and f" {term} " in padded:
+                    return True
+
+        for section in self.catalog.sections:
+            term = _normalize(section)
+            if len(term) >= _MIN_TERM_LENGTH and f" {term} " in padded:
+                return True
+
+        return False
@@ -1,17 +1,32 @@
-from typing import List
+import hashlib
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from llama_index.core.postprocessor import SentenceTransformerRerank
-from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.schema import MetadataMode, NodeWithScore
+from sentence_transformers import CrossEncoder
 
 from src.config.settings import DEVICE
+from src.utils.batching import MicroBatcher
+from src.utils.cache import LRUCache
+
+
+def _query_hash(query: str) -> str:
+    return hashlib.sha1(query.encode("utf-8")).hexdigest()
 
 
 class Reranker:
     """
-    Cross-encoder reranker using LlamaIndex's SentenceTransformerRerank.
+    Cross-encoder reranking engine, safe to share across concurrent requests.
 
-    Replaces the previous raw CrossEncoder implementation with LlamaIndex's
-    native postprocessor, which integrates cleanly with NodeWithScore objects.
+    Earlier versions wrapped LlamaIndex's SentenceTransformerRerank, whose
+    `top_n` had to be mutated per call. This engine drives the
+    sentence-transformers CrossEncoder directly so that:
+
+      - (query, passage) pairs from concurrent requests are micro-batched
+        into one forward pass, bounded by a max-wait deadline;
+      - `top_k` is a per-call argument and no shared state is mutated;
+      - pair scores are memoized by (query hash, node_id), so follow-up
+        queries over the same chunks skip the model entirely.
 
     Default model: cross-encoder/ms-marco-MiniLM-L-6-v2
       - Trained on MS MARCO (passage retrieval)
@@ -23,18 +38,54 @@ class Reranker:
         self,
         model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
         top_n: int = 5,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        score_cache_size: int = 50_000,
+        model: Optional[Any] = None,
     ) -> None:
-        self._reranker = SentenceTransformerRerank(
-            model=model_name,
-            top_n=top_n,
-            device=DEVICE,
+        """
+        Args:
+            model_name:       HuggingFace cross-encoder checkpoint.
+            top_n:            Default number of nodes returned by `rerank`.
+            max_batch_size:   Max pairs scored in one forward pass.
+            max_wait_ms:      Max time a pair waits for others to join its batch.
+            score_cache_size: Max memoized (query, node) scores.
+            model:            Preloaded cross-encoder (anything with a
+                              CrossEncoder-style `predict`); loaded from
+                              `model_name` when omitted.
+        """
+        self.model_name = model_name
+        self.top_n = top_n
+        self._model = model if model is not None else CrossEncoder(model_name, device=DEVICE)
+        self._scores: LRUCache[Tuple[str, str], float] = LRUCache(score_cache_size)
+        self._batcher: MicroBatcher[Tuple[str, str], float] = MicroBatcher(
+            self._score_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name="rerank",
+        )
+
+    def _score_batch(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        scores = self._model.predict(
+            pairs, batch_size=len(pairs), show_progress_bar=False
         )
+        return [float(s) for s in scores]
+
+    def score_pairs(self, query: str, passages: Sequence[str]) -> List[float]:
+        """
+        Cross-encoder relevance of each passage to the query (uncached).
+
+        All pairs are submitted at once, so they share a batch with each
+        other and with any concurrent requests.
+        """
+        futures = [self._batcher.submit((query, p)) for p in passages]
+        return [f.result() for f in futures]
 
     def rerank(
         self,
         query: str,
         nodes: List[NodeWithScore],
-        top_k: int = 5,
+        top_k: Optional[int] = None,
     ) -> List[NodeWithScore]:
         """
         Rerank a list of retrieved nodes by cross-encoder relevance score.
@@ -42,14 +93,40 @@ class Reranker:
         Args:
             query:  The original user query string.
             nodes:  Candidate nodes from the vector retriever.
-            top_k:  Number of top nodes to return after reranking.
+            top_k:  Number of top nodes to return after reranking
+                    (defaults to `top_n`).
 
         Returns:
             Top-k NodeWithScore objects, sorted by descending rerank score.
+            The input nodes are not modified.
         """
         if not nodes:
             return []
-        self._reranker.top_n = top_k
-        return self._reranker.postprocess_nodes(
-            nodes, query_bundle=QueryBundle(query_str=query)
+        top_k = self.top_n if top_k is None else top_k
+
+        qhash = _query_hash(query)
+        scores: List[Optional[float]] = []
+        pending: List[Tuple[int, Future]] = []
+        for i, n in enumerate(nodes):
+            cached = self._scores.get((qhash, n.node.node_id))
+            scores.append(cached)
+            if cached is None:
+                passage = n.node.get_content(metadata_mode=MetadataMode.EMBED)
+                pending.append((i, self._batcher.submit((query, passage))))
+
+        for i, future in pending:
+            score = future.result()
+            scores[i] = score
+            self._scores.put((qhash, nodes[i].node.node_id), score)
+
+        ranked = sorted(
+            (NodeWithScore(node=n.node, score=s) for n, s in zip(nodes, scores)),
+            key=lambda n: n.score,
+            reverse=True,
         )
+        return ranked[:top_k]
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._scores.stats()
+        stats["batching"] = self._batcher.stats()
+        return stats
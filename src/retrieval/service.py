@@ -1,14 +1,28 @@
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from llama_index.core.schema import NodeWithScore
+from llama_index.core.schema import BaseNode, MetadataMode, NodeWithScore
 from llama_index.core.vector_stores import MetadataFilter, MetadataFilters
 
+from src.config.settings import (
+    RETRIEVAL_COARSE_K,
+    RETRIEVAL_LIMIT,
+    RETRIEVAL_TOP_K,
+    RRF_K,
+    SPECULATIVE_RETRIEVAL,
+)
+from src.documents.catalog import DocumentCatalog
 from src.infra.llm.local import OllamaLLM
 from src.infra.vectorstore.base import BaseVectorStore
 from src.infra.vectorstore.chroma import ChromaVectorStore
+from src.retrieval.analysis_cache import QueryAnalysisCache
+from src.retrieval.bm25 import BM25Index, reciprocal_rank_fusion
+from src.retrieval.metadata_index import MetadataIndex
 from src.retrieval.query_analyzer import QueryAnalyzer
+from src.retrieval.query_classifier import QueryPreClassifier
 from src.retrieval.reranker import Reranker
+from src.utils.concurrency import run_blocking
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +55,18 @@ def _chromadb_to_metadata_filters(
     return MetadataFilters(filters=filter_list) if filter_list else None
 
 
+def _matches_filters(node: BaseNode, filters: Optional[MetadataFilters]) -> bool:
+    """Python-side equivalent of the exact-match filters sent to the vector store."""
+    if filters is None:
+        return True
+    return all(str(node.metadata.get(f.key)) == str(f.value) for f in filters.filters)
+
+
+def _lexical_text(node: BaseNode) -> str:
+    # Filename, section and header path are searchable terms too.
+    return node.get_content(metadata_mode=MetadataMode.EMBED)
+
+
 def _node_to_dict(node: NodeWithScore) -> Dict[str, Any]:
     """Convert a LlamaIndex NodeWithScore to the dict format expected by the orchestrator."""
     return {
@@ -56,43 +82,173 @@ class RetrievalService:
         self,
         llm: OllamaLLM,
         vector_store: Optional[BaseVectorStore] = None,
+        reranker: Optional[Reranker] = None,
+        catalog: Optional[DocumentCatalog] = None,
+        analysis_cache: Optional[QueryAnalysisCache] = None,
+        lexical_index: Optional[BM25Index] = None,
+        metadata_index: Optional[MetadataIndex] = None,
     ) -> None:
         """
         Args:
             llm:          Ollama LLM used by QueryAnalyzer for filter extraction.
             vector_store: Vector store backend. Defaults to ChromaVectorStore.
                           Pass any BaseVectorStore subclass to swap backends.
+            reranker:     Cross-encoder reranker. Pass the shared instance from
+                          the service registry to avoid reloading the model.
+            catalog:      Known filenames/sections, used to skip the LLM query
+                          analysis when a query obviously needs no filter.
+            analysis_cache: Cache of QueryAnalyzer results, keyed on the
+                          normalized query and the catalog version.
+            lexical_index: Optional BM25 index. When set, it is kept in sync
+                          with the vector store and fused into every search.
+            metadata_index: Optional filename/section → node id pre-index
+                          used to resolve analyzer filters fuzzily.
         """
         self.vector_store = vector_store or ChromaVectorStore()
-        self.query_analyzer = QueryAnalyzer(llm)
-        self.reranker = Reranker()
+        self.reranker = reranker or Reranker()
+        self.catalog = catalog or DocumentCatalog()
+        self.query_analyzer = QueryAnalyzer(
+            llm, cache=analysis_cache, catalog=self.catalog
+        )
+        self.pre_classifier = QueryPreClassifier(self.catalog)
+        self.lexical_index = lexical_index
+        self.metadata_index = metadata_index
 
-    def retrieve(
-        self, query: str, limit: int = 20, top_k: int = 5
-    ) -> List[Dict[str, Any]]:
+    def _search(
+        self,
+        query: str,
+        filters_dict: Dict[str, Any],
+        limit: int,
+        coarse_k: Optional[int] = None,
+    ) -> List[NodeWithScore]:
         """
-        Full retrieval pipeline: Analyze → Search → Rerank.
-
-        1. QueryAnalyzer extracts metadata filters from the query via LLM.
-        2. VectorIndexRetriever fetches `limit` candidate nodes from ChromaDB.
-        3. SentenceTransformerRerank scores and returns top `top_k` nodes.
-        4. Results are converted to dicts for the orchestrator.
+        Vector search for `limit` candidates, honouring analyzer filters.
+        Backends with a reduced-dimension pass shortlist `coarse_k` first.
         """
-        # 1. Extract metadata filters (LLM-powered)
-        filters_dict = self.query_analyzer.analyze(query)
         lm_filters = _chromadb_to_metadata_filters(filters_dict)
+        node_ids: Optional[Set[str]] = None
+
+        if lm_filters and self.metadata_index is not None:
+            # Resolve fuzzy filter values to an id set; filters that match
+            # nothing are dropped rather than emptying the result.
+            node_ids = self._resolve_node_ids(filters_dict)
+            lm_filters = None
 
         if lm_filters:
             logger.debug(f"Applying metadata filters: {filters_dict}")
 
-        # 2. Retrieve candidates
         retriever = self.vector_store.as_retriever(
             similarity_top_k=limit,
             filters=lm_filters,
+            node_ids=node_ids,
+            coarse_k=coarse_k,
         )
         candidates: List[NodeWithScore] = retriever.retrieve(query)
         logger.debug(f"Retrieved {len(candidates)} candidates from vector store.")
 
+        if not candidates and (lm_filters or node_ids is not None):
+            logger.warning(
+                f"Filters {filters_dict} matched no chunks; searching unfiltered."
+            )
+            return self._search(query, {}, limit, coarse_k)
+
+        if self.lexical_index is None:
+            return candidates
+        return self._fuse_lexical(query, candidates, limit, lm_filters, node_ids)
+
+    def _resolve_node_ids(self, filters_dict: Dict[str, Any]) -> Optional[Set[str]]:
+        """
+        Node ids matching the analyzer's filters, via the metadata pre-index.
+
+        Returns None (search unfiltered) if no filter value can be resolved.
+        """
+        flat = {f.key: f.value for f in _chromadb_to_metadata_filters(filters_dict).filters}
+        resolved, unresolved = self.metadata_index.resolve(flat)
+        if unresolved:
+            logger.info(f"Dropping unresolvable filters: {[(k, flat[k]) for k in unresolved]}")
+        if not resolved:
+            return None
+
+        node_ids = self.metadata_index.node_ids(resolved)
+        if not node_ids and len(resolved) > 1 and "filename" in resolved:
+            # e.g. the section exists, just not in that file: keep the file.
+            logger.info("Filters do not intersect; keeping the filename filter only.")
+            node_ids = self.metadata_index.node_ids({"filename": resolved["filename"]})
+        logger.debug(f"Resolved filters {flat} → {resolved} ({len(node_ids)} chunks).")
+        return node_ids or None
+
+    def _fuse_lexical(
+        self,
+        query: str,
+        dense: List[NodeWithScore],
+        limit: int,
+        filters: Optional[MetadataFilters] = None,
+        node_ids: Optional[Set[str]] = None,
+    ) -> List[NodeWithScore]:
+        """
+        Reciprocal-rank fusion of the dense candidates with BM25 hits.
+
+        Exact terms (equation names, acronyms, identifiers) that embeddings
+        miss are pulled in by BM25, so `limit` can stay small.
+        """
+        # Filters are applied after BM25, so over-fetch when they are set.
+        filtered = filters is not None or node_ids is not None
+        hits = self.lexical_index.search(query, top_k=limit * 4 if filtered else limit)
+        if node_ids is not None:
+            hits = [hit for hit in hits if hit[0] in node_ids]
+        if not hits:
+            return dense
+
+        nodes: Dict[str, BaseNode] = {n.node.node_id: n.node for n in dense}
+        missing = [node_id for node_id, _ in hits if node_id not in nodes]
+        for node in self.vector_store.get_nodes(missing):
+            nodes[node.node_id] = node
+
+        lexical = [
+            node_id for node_id, _ in hits
+            if node_id in nodes and _matches_filters(nodes[node_id], filters)
+        ][:limit]
+        fused = reciprocal_rank_fusion(
+            [[n.node.node_id for n in dense], lexical], k=RRF_K
+        )[:limit]
+        logger.debug(
+            f"Hybrid search: {len(dense)} dense + {len(lexical)} BM25 → {len(fused)} fused."
+        )
+        return [NodeWithScore(node=nodes[node_id], score=score) for node_id, score in fused]
+
+    def retrieve(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        top_k: Optional[int] = None,
+        coarse_k: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Full retrieval pipeline: Analyze → Search → Rerank.
+
+        1. QueryAnalyzer extracts metadata filters from the query via LLM,
+           unless the rule-based pre-classifier rules filters out.
+        2. The vector store fetches `limit` candidate nodes (after a
+           `coarse_k` reduced-dimension shortlist where supported), fused
+           with BM25 hits by reciprocal rank when hybrid is enabled.
+        3. The cross-encoder Reranker scores and returns top `top_k` nodes.
+        4. Results are converted to dicts for the orchestrator.
+
+        Stage sizes default to RETRIEVAL_LIMIT / RETRIEVAL_TOP_K /
+        RETRIEVAL_COARSE_K.
+        """
+        limit, top_k, coarse_k = self._stage_sizes(limit, top_k, coarse_k)
+
+        # 1. Extract metadata filters (LLM-powered)
+        if self.pre_classifier.needs_filter(query):
+            filters_dict = self.query_analyzer.analyze(query)
+        else:
+            logger.debug("Pre-classifier: no filter needed, skipping query analysis.")
+            filters_dict = {}
+
+        # 2. Retrieve candidates
+        candidates = self._search(query, filters_dict, limit, coarse_k)
+
         # 3. Rerank
         final_nodes = self.reranker.rerank(query, candidates, top_k=top_k)
         logger.debug(f"Reranked to top {len(final_nodes)} nodes.")
@@ -100,10 +256,135 @@ class RetrievalService:
         # 4. Convert to dicts for orchestrator
         return [_node_to_dict(n) for n in final_nodes]
 
+    @staticmethod
+    def _stage_sizes(
+        limit: Optional[int], top_k: Optional[int], coarse_k: Optional[int]
+    ) -> Tuple[int, int, int]:
+        """Fill in defaults; each stage keeps at least as many as the next."""
+        top_k = top_k or RETRIEVAL_TOP_K
+        limit = max(limit or RETRIEVAL_LIMIT, top_k)
+        coarse_k = max(coarse_k or RETRIEVAL_COARSE_K, limit)
+        return limit, top_k, coarse_k
+
+    async def _asearch_with_analysis(
+        self, query: str, limit: int, speculative: bool, coarse_k: Optional[int] = None
+    ) -> List[NodeWithScore]:
+        """
+        Resolve filters and fetch candidates, overlapping the two when possible.
+
+        - Pre-classifier says no filter: search unfiltered, no LLM call.
+        - Speculative: start the unfiltered search alongside the analysis;
+          keep it if the analysis finds no filters, otherwise re-query.
+        - Otherwise: analyze, then search.
+        """
+        if not self.pre_classifier.needs_filter(query):
+            logger.debug("Pre-classifier: no filter needed, skipping query analysis.")
+            return await run_blocking(self._search, query, {}, limit, coarse_k)
+
+        if not speculative:
+            filters_dict = await self.query_analyzer.aanalyze(query)
+            return await run_blocking(self._search, query, filters_dict, limit, coarse_k)
+
+        unfiltered = asyncio.ensure_future(
+            run_blocking(self._search, query, {}, limit, coarse_k)
+        )
+        try:
+            filters_dict = await self.query_analyzer.aanalyze(query)
+        except BaseException:
+            unfiltered.cancel()
+            raise
+
+        if not filters_dict:
+            return await unfiltered
+
+        logger.debug("Speculative search discarded: analysis returned filters.")
+        unfiltered.cancel()
+        return await run_blocking(self._search, query, filters_dict, limit, coarse_k)
+
+    async def aretrieve(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        top_k: Optional[int] = None,
+        speculative: Optional[bool] = None,
+        coarse_k: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Async version of `retrieve`.
+
+        The analyzer's LLM call is awaited natively (and, in speculative mode,
+        overlapped with the unfiltered vector search); query embedding,
+        vector search and cross-encoder scoring are offloaded to the bounded
+        CPU executor so the event loop keeps serving other requests.
+        """
+        if speculative is None:
+            speculative = SPECULATIVE_RETRIEVAL
+        limit, top_k, coarse_k = self._stage_sizes(limit, top_k, coarse_k)
+
+        candidates = await self._asearch_with_analysis(query, limit, speculative, coarse_k)
+        final_nodes = await run_blocking(
+            self.reranker.rerank, query, candidates, top_k=top_k
+        )
+        logger.debug(f"Reranked to top {len(final_nodes)} nodes.")
+        return [_node_to_dict(n) for n in final_nodes]
+
     def add_nodes(self, nodes: List[Any]) -> None:
-        """Persist nodes (List[TextNode]) to the vector store."""
+        """Persist nodes (List[TextNode]) to the vector store and side indexes."""
         self.vector_store.add_nodes(nodes)
+        self._index_nodes(nodes)
+        self.catalog.invalidate()
+
+    def _index_nodes(self, nodes: List[Any]) -> None:
+        if self.lexical_index is not None:
+            self.lexical_index.add(
+                [
+                    (n.node_id, int(n.metadata.get("document_id", 0)), _lexical_text(n))
+                    for n in nodes
+                ]
+            )
+        if self.metadata_index is not None:
+            self.metadata_index.add(nodes)
 
     def delete_document(self, document_id: int) -> None:
         """Remove all nodes for the given document from the vector store."""
         self.vector_store.delete_document(document_id)
+        for index in (self.lexical_index, self.metadata_index):
+            if index is not None:
+                index.delete_document(document_id)
+        self.catalog.invalidate()
+
+    def delete_nodes(self, node_ids: List[str]) -> None:
+        """Remove individual nodes from the vector store."""
+        self.vector_store.delete_nodes(node_ids)
+        for index in (self.lexical_index, self.metadata_index):
+            if index is not None:
+                index.delete_nodes(node_ids)
+        self.catalog.invalidate()
+
+    def document_node_ids(self, document_id: int) -> List[str]:
+        """
+        Ids of every stored node of a document. Scans the whole store; only
+        needed for documents ingested before chunks were tracked.
+        """
+        key = str(document_id)
+        return [
+            node.node_id
+            for batch in self.vector_store.iter_nodes()
+            for node in batch
+            if str(node.metadata.get("document_id")) == key
+        ]
+
+    def rebuild_indexes(self) -> int:
+        """
+        Rebuild the BM25 and metadata indexes from every node in the vector
+        store. Returns the number of nodes indexed.
+        """
+        for index in (self.lexical_index, self.metadata_index):
+            if index is not None:
+                index.clear()
+        count = 0
+        for batch in self.vector_store.iter_nodes():
+            self._index_nodes(batch)
+            count += len(batch)
+        logger.info(f"Rebuilt side indexes from {count} stored nodes.")
+        return count
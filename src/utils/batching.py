@@ -0,0 +1,111 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+I = TypeVar("I")
+O = TypeVar("O")
+
+
+class MicroBatcher(Generic[I, O]):
+    """
+    Coalesces concurrent single-item calls into one batched call.
+
+    Callers on any thread `submit` an item and receive a Future. A single
+    worker thread collects items until either `max_batch_size` is reached or
+    `max_wait_ms` has elapsed since the first item of the batch arrived, then
+    runs `batch_fn` once over the whole batch. Parallel requests therefore
+    share one model forward pass instead of competing for the CPU with many
+    small ones.
+
+    `batch_fn` must return exactly one output per input, in order.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[I]], List[O]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        name: str = "batcher",
+    ) -> None:
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue: "queue.Queue[Tuple[I, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item: I) -> "Future[O]":
+        self._ensure_worker()
+        future: "Future[O]" = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item: I) -> O:
+        return self.submit(item).result()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name=f"rag-{self.name}", daemon=True
+                )
+                self._worker.start()
+
+    def _collect(self) -> List[Tuple[I, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    # Past the deadline: still sweep up anything already queued.
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            pending = [
+                (item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()
+            ]
+            if not pending:
+                continue
+
+            try:
+                outputs = self.batch_fn([item for item, _ in pending])
+                if len(outputs) != len(pending):
+                    raise RuntimeError(
+                        f"{self.name}: batch_fn returned {len(outputs)} results "
+                        f"for {len(pending)} inputs."
+                    )
+            except Exception as e:
+                logger.exception(f"{self.name}: batch of {len(pending)} failed.")
+                for _, fut in pending:
+                    fut.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(pending)
+            for (_, fut), output in zip(pending, outputs):
+                fut.set_result(output)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
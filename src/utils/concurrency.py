@@ -0,0 +1,65 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from src.config.settings import CPU_WORKERS
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Process-wide bounded pool for blocking / CPU-bound work."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=CPU_WORKERS, thread_name_prefix="rag-cpu"
+                )
+    return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking callable on the bounded executor without stalling the
+    event loop. Torch, Chroma and Docling release the GIL for their heavy
+    lifting, so offloaded calls from concurrent requests run in parallel.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """
+    A single event loop running in a daemon thread, for synchronous callers
+    (the UIs) that need to drive async services. Async DB connections are
+    bound to the loop that opened them, so everything shares this one.
+    """
+    global _background_loop
+    if _background_loop is None:
+        with _executor_lock:
+            if _background_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="rag-async", daemon=True
+                ).start()
+                _background_loop = loop
+    return _background_loop
@@ -0,0 +1,53 @@
+import logging
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio of WordPiece/BPE vocabularies on English
+# prose; only used when no tokenizer is available.
+_CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def get_tokenizer(model_name: str) -> Optional[Any]:
+    """
+    The HuggingFace tokenizer for `model_name`, loaded once per process.
+
+    Returns None (callers fall back to an estimate) if transformers is not
+    installed or the tokenizer cannot be loaded.
+    """
+    try:
+        from transformers import AutoTokenizer
+
+        return AutoTokenizer.from_pretrained(model_name)
+    except Exception as e:
+        logger.warning(f"No tokenizer for '{model_name}', estimating token counts: {e}")
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token count estimate from the character length."""
+    return max(1, (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN)
+
+
+def count_tokens(text: str, tokenizer: Optional[Any] = None) -> int:
+    """Token count of `text` (special tokens excluded)."""
+    return count_tokens_batch([text], tokenizer)[0]
+
+
+def count_tokens_batch(texts: Sequence[str], tokenizer: Optional[Any] = None) -> List[int]:
+    """
+    Token counts of many texts at once (special tokens excluded).
+
+    Fast tokenizers encode a list in one call, which is much cheaper than
+    tokenizing texts one by one.
+    """
+    if not texts:
+        return []
+    if tokenizer is None:
+        return [estimate_tokens(t) for t in texts]
+    encoded = tokenizer(
+        list(texts), add_special_tokens=False, truncation=False, verbose=False
+    )["input_ids"]
+    return [len(ids) for ids in encoded]
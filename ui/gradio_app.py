@@ -41,11 +41,22 @@ def add_user_message(message, history):
     return "", history
 
 
+def format_sources(sources):
+    """Renders the distinct source filenames as an HTML citation block."""
+    sources_list = list(set(s.get("filename", "Unknown") for s in sources))
+    return (
+        "<div class='source-citation'><strong>📚 Sources:</strong><br>"
+        + "<br>".join([f"• {s}" for s in sources_list])
+        + "</div>"
+    )
+
+
 def get_rag_response(history, conversation_id_state):
-    """Queries RAG backend and updates UI."""
+    """Streams the RAG answer into the UI token by token."""
     try:
         if not history or history[-1]["role"] != "user":
-            return history, conversation_id_state
+            yield history, conversation_id_state
+            return
 
         last_user_content = history[-1]["content"]
 
@@ -54,36 +65,41 @@ def get_rag_response(history, conversation_id_state):
         else:
             last_user_message = str(last_user_content)
 
-        result = app.chat(last_user_message, conversation_id_state)
-
-        raw_msg = result.get("response", "No response received!")
-        bot_msg = preprocess_latex(raw_msg)
-        new_cov_id = result.get("conversation_id")
-
-        # Format sources nicely
-        if result.get("sources"):
-            sources_list = list(
-                set(s.get("filename", "Unknown") for s in result["sources"])
-            )
-            sources_html = (
-                "<div class='source-citation'><strong>📚 Sources:</strong><br>"
-                + "<br>".join([f"• {s}" for s in sources_list])
-                + "</div>"
-            )
-            bot_msg += "\n" + sources_html
-
         history.append({
             "role": "assistant",
-            "content": [{"type": "text", "text": bot_msg}],
+            "content": [{"type": "text", "text": ""}],
         })
-        return history, new_cov_id
+        new_cov_id = conversation_id_state
+        sources = []
+        raw_msg = ""
+
+        for event in app.chat_stream(last_user_message, conversation_id_state):
+            if event["type"] == "sources":
+                sources = event.get("sources") or []
+                new_cov_id = event.get("conversation_id", new_cov_id)
+            elif event["type"] == "token":
+                raw_msg += event["content"]
+                history[-1]["content"][0]["text"] = preprocess_latex(raw_msg)
+                yield history, new_cov_id
+            elif event["type"] == "done":
+                raw_msg = event.get("response") or raw_msg
+
+        bot_msg = preprocess_latex(raw_msg or "No response received!")
+
+        # Format sources nicely
+        if sources:
+            bot_msg += "\n" + format_sources(sources)
+
+        history[-1]["content"][0]["text"] = bot_msg
+        yield history, new_cov_id
 
     except Exception as e:
-        history.append({
-            "role": "assistant",
-            "content": [{"type": "text", "text": f"⚠️ **Error:** {str(e)}"}],
-        })
-        return history, conversation_id_state
+        error = {"type": "text", "text": f"⚠️ **Error:** {str(e)}"}
+        if history and history[-1]["role"] == "assistant":
+            history[-1]["content"] = [error]
+        else:
+            history.append({"role": "assistant", "content": [error]})
+        yield history, conversation_id_state
 
 
 def upload_file(files):
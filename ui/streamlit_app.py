@@ -109,29 +109,37 @@ if prompt := st.chat_input("Ask a question about your documents..."):
     with st.chat_message("user", avatar="👤"):
         st.markdown(prompt)
 
-    # Generate response
+    # Generate response (streamed token by token)
     with st.chat_message("assistant", avatar="🤖"):
-        with st.spinner("Thinking..."):
-            try:
-                result = app.chat(prompt, st.session_state.conversation_id)
-                
-                raw_msg = result.get("response", "No response received!")
-                st.session_state.conversation_id = result.get("conversation_id")
-                
-                # Format sources nicely
-                bot_msg = raw_msg
-                if result.get("sources"):
-                    sources_list = list(set(s.get("filename", "Unknown") for s in result["sources"]))
-                    sources_html = (
-                        "\n\n**📚 Sources:**\n" + 
-                        "\n".join([f"- {s}" for s in sources_list])
-                    )
-                    bot_msg += sources_html
-                
-                st.markdown(bot_msg, unsafe_allow_html=True)
-                st.session_state.messages.append({"role": "assistant", "content": bot_msg})
-                
-            except Exception as e:
-                error_msg = f"⚠️ **Error:** {str(e)}"
-                st.error(error_msg)
-                st.session_state.messages.append({"role": "assistant", "content": error_msg})
+        placeholder = st.empty()
+        placeholder.markdown("_Thinking..._")
+        try:
+            raw_msg = ""
+            sources = []
+            for event in app.chat_stream(prompt, st.session_state.conversation_id):
+                if event["type"] == "sources":
+                    sources = event.get("sources") or []
+                    st.session_state.conversation_id = event.get("conversation_id")
+                elif event["type"] == "token":
+                    raw_msg += event["content"]
+                    placeholder.markdown(raw_msg + "▌", unsafe_allow_html=True)
+                elif event["type"] == "done":
+                    raw_msg = event.get("response") or raw_msg
+
+            # Format sources nicely
+            bot_msg = raw_msg or "No response received!"
+            if sources:
+                sources_list = list(set(s.get("filename", "Unknown") for s in sources))
+                sources_html = (
+                    "\n\n**📚 Sources:**\n" + 
+                    "\n".join([f"- {s}" for s in sources_list])
+                )
+                bot_msg += sources_html
+
+            placeholder.markdown(bot_msg, unsafe_allow_html=True)
+            st.session_state.messages.append({"role": "assistant", "content": bot_msg})
+
+        except Exception as e:
+            error_msg = f"⚠️ **Error:** {str(e)}"
+            placeholder.error(error_msg)
+            st.session_state.messages.append({"role": "assistant", "content": error_msg})